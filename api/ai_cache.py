@@ -0,0 +1,263 @@
+"""
+Two-tier cache for AI responses
+
+- memory tier: a small LRU per process, so repeated prompts in a warm process
+  never touch the filesystem
+- disk tier: one JSON file per key under .cache/ai_cache (the layout the
+  advisor always used), with an in-memory index of file ages and sizes.
+  Entries older than AI_CACHE_MAX_AGE_SECONDS are swept and the oldest files
+  are evicted once the directory exceeds AI_CACHE_MAX_BYTES.
+
+The caller passes the TTL on lookup (CACHE_TTL_SECONDS for chat), so the same
+store can serve callers with different freshness needs.
+
+SingleFlight covers the gap before an entry exists: identical prompts that
+arrive while the first one is still being generated wait for its answer.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+DEFAULT_CACHE_DIR = Path('.cache') / 'ai_cache'
+
+# How many writes between two sweeps of the disk tier
+SWEEP_EVERY_WRITES = 50
+
+
+class TwoTierCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, memory_entries: int = 512,
+                 max_disk_bytes: int = 50 * 1024 * 1024, max_age: float = 24 * 3600):
+        self.directory = Path(directory)
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.max_age = max_age
+
+        self._memory = OrderedDict()  # key -> (ts, value)
+        self._index = None            # key -> (ts, size) of files on disk
+        self._disk_bytes = 0
+        self._writes_since_sweep = 0
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0,
+                      'evicted': 0, 'expired': 0}
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+    def get(self, key: str, ttl: float) -> Any:
+        """Cached value for `key` if it is younger than `ttl` seconds, else None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[0] <= ttl:
+                    self._memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return entry[1]
+                del self._memory[key]
+
+            indexed = self._load_index().get(key)
+            if indexed is None or now - indexed[0] > ttl:
+                # another process may have written the file since the index was built
+                indexed = self._reindex(key)
+            if indexed is None or now - indexed[0] > ttl:
+                self.stats['misses'] += 1
+                return None
+
+        try:
+            meta = json.loads(self._path(key).read_text())
+        except Exception:
+            with self._lock:
+                self._forget(key)
+                self.stats['misses'] += 1
+            return None
+
+        ts = meta.get('ts', 0)
+        with self._lock:
+            if now - ts > ttl:
+                self.stats['misses'] += 1
+                return None
+            self._remember(key, ts, meta.get('response'))
+            self.stats['disk_hits'] += 1
+        return meta.get('response')
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        data = json.dumps({'ts': now, 'response': value})
+        with self._lock:
+            self._remember(key, now, value)
+            self.stats['writes'] += 1
+
+        path = self._path(key)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(data)
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"AI cache write failed: {e}")
+            return
+
+        with self._lock:
+            index = self._load_index()
+            self._forget(key, memory=False)
+            index[key] = (now, len(data.encode('utf-8')))
+            self._disk_bytes += index[key][1]
+            self._writes_since_sweep += 1
+            if self._writes_since_sweep >= SWEEP_EVERY_WRITES or self._disk_bytes > self.max_disk_bytes:
+                self._sweep_locked(now)
+
+    def sweep(self):
+        """Drop expired entries and evict the oldest until under the size cap"""
+        with self._lock:
+            self._sweep_locked(time.time())
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    # ---------------------------
+    # Internals (called with the lock held)
+    # ---------------------------
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _remember(self, key, ts, value):
+        self._memory[key] = (ts, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _forget(self, key, memory=True):
+        if memory:
+            self._memory.pop(key, None)
+        entry = self._index.pop(key, None) if self._index is not None else None
+        if entry is not None:
+            self._disk_bytes -= entry[1]
+
+    def _load_index(self):
+        """Scan the cache directory once per process"""
+        if self._index is None:
+            self._index = {}
+            self._disk_bytes = 0
+            try:
+                with os.scandir(self.directory) as entries:
+                    for entry in entries:
+                        if entry.name.endswith('.json') and entry.is_file():
+                            st = entry.stat()
+                            self._index[entry.name[:-5]] = (st.st_mtime, st.st_size)
+                            self._disk_bytes += st.st_size
+            except FileNotFoundError:
+                pass
+        return self._index
+
+    def _reindex(self, key):
+        """Index entry for `key` from the file on disk (None if there is none)"""
+        self._forget(key, memory=False)
+        try:
+            st = self._path(key).stat()
+        except OSError:
+            return None
+        self._index[key] = (st.st_mtime, st.st_size)
+        self._disk_bytes += st.st_size
+        return self._index[key]
+
+    def _sweep_locked(self, now: float):
+        self._writes_since_sweep = 0
+        index = self._load_index()
+        expired = [key for key, (ts, _) in index.items() if now - ts > self.max_age]
+        for key in expired:
+            self._remove_file(key)
+            self.stats['expired'] += 1
+
+        if self._disk_bytes > self.max_disk_bytes:
+            # Evict down to 90% of the cap so we don't sweep on every write
+            target = self.max_disk_bytes * 0.9
+            for key, _ in sorted(index.items(), key=lambda item: item[1][0]):
+                if self._disk_bytes <= target:
+                    break
+                self._remove_file(key)
+                self.stats['evicted'] += 1
+
+    def _remove_file(self, key):
+        self._forget(key, memory=False)
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"AI cache eviction failed for {key}: {e}")
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key.
+
+    The first caller (the leader) runs the function; callers arriving while
+    it is still running wait for and share its result (or exception). Once
+    the leader returns the key is released, so later calls run again.
+
+    timeout bounds how long a follower waits (the leader itself is not cut
+    short); a follower that gives up raises TimeoutError.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {'leaders': 0, 'followers': 0}
+
+    def do(self, key: str, fn, timeout: float = None):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats['leaders'] += 1
+            else:
+                self.stats['followers'] += 1
+
+        if not leader:
+            if not call.event.wait(timeout):
+                raise TimeoutError(f"gave up waiting for in-flight call {key}")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_ai_cache() -> TwoTierCache:
+    """Process-wide AI response cache configured from the environment"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TwoTierCache(
+                memory_entries=int(os.getenv('AI_CACHE_MEMORY_ENTRIES', '512')),
+                max_disk_bytes=int(os.getenv('AI_CACHE_MAX_BYTES', str(50 * 1024 * 1024))),
+                max_age=float(os.getenv('AI_CACHE_MAX_AGE_SECONDS', str(24 * 3600))),
+            )
+        return _cache
@@ -0,0 +1,158 @@
+"""
+Async financial advisor for batch tools and the self-hosted server
+
+AsyncFinancialAdvisor wraps a FinancialAdvisor (prompts, settings, routing
+profiles, AI cache and rule-based fallback are all shared) and awaits Groq
+completions instead of blocking a thread per call, so a tool can run dozens
+of analyses with asyncio.gather():
+
+- at most AI_ASYNC_MAX_CONCURRENCY completions are in flight per event loop
+- transient errors are retried with GROQ_RETRY, the policy the sync path uses
+- identical prompts awaited at the same time share one completion
+- outcomes are reported to GROQ_BREAKER, so an open circuit (or a passed
+  deadline) gives the rule-based answer right away
+
+Completions use groq.AsyncGroq. Without it the sync advisor runs in a
+worker thread (asyncio.to_thread), still bounded by the same cap.
+"""
+import asyncio
+import functools
+import os
+from typing import Dict
+
+from api.financial_advisor import GROQ_BREAKER, GROQ_RETRY, FinancialAdvisor, get_advisor
+from api.resilience import deadline_timeout
+
+
+def _make_async_client(api_key: str = None):
+    """groq.AsyncGroq client (None if the SDK is not installed)"""
+    try:
+        from groq import AsyncGroq
+    except Exception:
+        return None
+    try:
+        return AsyncGroq(api_key=api_key) if api_key else AsyncGroq()
+    except Exception as e:
+        print(f"AsyncGroq unavailable: {e}")
+        return None
+
+
+class AsyncFinancialAdvisor:
+    def __init__(self, advisor: FinancialAdvisor = None, max_concurrency: int = None, client=None):
+        self.advisor = advisor or get_advisor()
+        self.max_concurrency = max_concurrency or int(os.getenv('AI_ASYNC_MAX_CONCURRENCY', '16'))
+        self._given_client = client
+
+        # Created on first use inside the running loop (asyncio primitives
+        # and the SDK's connection pool belong to one loop; a later
+        # asyncio.run() gets fresh ones)
+        self._loop = None
+        self._client = None
+        self._slots = None
+        self._in_flight = {}
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._in_flight = {}
+            self._client = self._given_client
+            if self._client is None and self.advisor.selected_provider == 'groq':
+                self._client = _make_async_client(self.advisor.groq_api_key)
+
+    async def get_monthly_analysis(self, user_data: Dict, deadline=None, cache_key: str = None) -> str:
+        prompt = self.advisor._monthly_analysis_prompt(user_data)
+        return await self._get_ai_response(prompt, deadline=deadline, cache_key=cache_key, route='monthly_analysis')
+
+    async def get_budget_recommendation(self, monthly_income: float, user_data: Dict, deadline=None,
+                                        cache_key: str = None) -> str:
+        prompt = self.advisor._budget_recommendation_prompt(monthly_income, user_data)
+        return await self._get_ai_response(prompt, deadline=deadline, cache_key=cache_key,
+                                           route='budget_recommendation')
+
+    async def check_budget_feasibility(self, budget_amount: float, duration_days: int, user_data: Dict = None,
+                                       deadline=None) -> str:
+        prompt = self.advisor._budget_feasibility_prompt(budget_amount, duration_days, user_data)
+        return await self._get_ai_response(prompt, deadline=deadline, route='budget_feasibility')
+
+    async def advanced_budget_plan(self, monthly_income: int, user_data: Dict, savings_goal: int = None,
+                                   with_reasoning: bool = False, deadline=None) -> str:
+        if self.advisor.selected_provider != 'groq':
+            return self.advisor._local_budget_plan(monthly_income, user_data, savings_goal)
+        return await self._get_ai_response(self.advisor._budget_plan_prompt(user_data), verbose=True,
+                                           with_reasoning=with_reasoning, deadline=deadline,
+                                           route='advanced_budget_plan')
+
+    async def _get_ai_response(self, prompt: str, verbose: bool = False, with_reasoning: bool = False, deadline=None,
+                               max_tokens: int = None, cache_key: str = None, route: str = None) -> str:
+        """Async counterpart of FinancialAdvisor._get_ai_response (same arguments
+        except on_update; answers are not streamed)"""
+        advisor = self.advisor
+        self._bind_loop()
+
+        def fallback():
+            return advisor._get_rule_based_advice(prompt, verbose=verbose, with_reasoning=with_reasoning)
+
+        if advisor.selected_provider != 'groq':
+            return fallback()
+        if self._client is None:
+            async with self._slots:
+                return await asyncio.to_thread(functools.partial(
+                    advisor._get_ai_response, prompt, verbose=verbose, with_reasoning=with_reasoning,
+                    deadline=deadline, max_tokens=max_tokens, cache_key=cache_key, route=route))
+
+        if deadline is not None and deadline.expired():
+            print("AI deadline passed, using rule-based advice")
+            return fallback()
+        if not GROQ_BREAKER.allow():
+            print("Groq circuit open, using rule-based advice")
+            return fallback()
+
+        profile = advisor._routing_profile(route)
+        key = f"{advisor._cache_key(prompt)}:{int(bool(with_reasoning))}:{profile['model']}"
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._complete(prompt, with_reasoning, deadline, max_tokens, profile))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        text = await asyncio.shield(task)
+        if not text:
+            return fallback()
+        if cache_key:
+            advisor._set_cached_response(cache_key, text)
+        return text
+
+    async def _complete(self, prompt: str, include_reasoning: bool, deadline, max_tokens: int, profile: Dict):
+        """One Groq completion under the concurrency cap; the answer text, or
+        None when there is none (the breaker is updated here)"""
+        advisor = self.advisor
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=None if deadline is None else deadline.remaining())
+        except asyncio.TimeoutError:
+            print("No free AI slot before the deadline, using rule-based advice")
+            return None
+
+        try:
+            completion = await GROQ_RETRY.acall(lambda: self._client.chat.completions.create(
+                model=advisor._groq_model(profile),
+                messages=advisor._groq_messages(prompt, include_reasoning),
+                temperature=float(advisor.groq_temperature),
+                max_completion_tokens=int(max_tokens or profile['max_tokens']),
+                top_p=float(advisor.groq_top_p),
+                reasoning_effort=profile['reasoning_effort'],
+                timeout=deadline_timeout(deadline, profile['timeout']),
+            ), deadline=deadline)
+            text = (completion.choices[0].message.content or '').strip()
+        except Exception as e:
+            print(f"Groq async error: {e}")
+            text = ''
+        finally:
+            self._slots.release()
+
+        if text:
+            GROQ_BREAKER.record_success()
+            return text
+        GROQ_BREAKER.record_failure()
+        return None
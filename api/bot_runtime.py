@@ -0,0 +1,63 @@
+"""
+Runtime helpers for running the Telegram webhook logic outside Vercel
+(self-hosted server, long-polling worker).
+
+The webhook lives in api/telegram-webhook.py, which cannot be imported with a
+normal import statement because of the hyphen, so it is loaded once here and
+shared by every entry point in the process.
+"""
+import importlib.util
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+WEBHOOK_PATH = Path(__file__).resolve().with_name('telegram-webhook.py')
+WEBHOOK_MODULE_NAME = 'api.telegram_webhook'
+
+_module_lock = threading.Lock()
+_executor_lock = threading.Lock()
+_update_executor = None
+
+
+def load_webhook_module():
+    """Import api/telegram-webhook.py once per process and return the module"""
+    with _module_lock:
+        module = sys.modules.get(WEBHOOK_MODULE_NAME)
+        if module is None:
+            spec = importlib.util.spec_from_file_location(WEBHOOK_MODULE_NAME, WEBHOOK_PATH)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[WEBHOOK_MODULE_NAME] = module
+            try:
+                spec.loader.exec_module(module)
+            except Exception:
+                sys.modules.pop(WEBHOOK_MODULE_NAME, None)
+                raise
+        return module
+
+
+def new_handler():
+    """Create a webhook handler that is not bound to an HTTP request.
+
+    BaseHTTPRequestHandler.__init__ immediately serves a socket, so it is
+    skipped; the command/expense methods only need the instance.
+    """
+    handler_cls = load_webhook_module().handler
+    return handler_cls.__new__(handler_cls)
+
+
+def get_update_executor():
+    """Bounded thread pool that runs the blocking update processing
+    (Sheets + LLM calls). Size via SERVER_UPDATE_WORKERS."""
+    global _update_executor
+    with _executor_lock:
+        if _update_executor is None:
+            workers = int(os.getenv('SERVER_UPDATE_WORKERS', '16'))
+            _update_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='catatuang-update')
+        return _update_executor
+
+
+def process_update(update):
+    """Process one Telegram update synchronously (reply is sent to the chat)"""
+    return new_handler()._process_telegram_webhook(update)
@@ -8,105 +8,324 @@ try:
     import requests
 except Exception:
     requests = None
-from datetime import datetime, timedelta
 from typing import Dict, List, Any
 import hashlib
-import time
-from pathlib import Path
+import queue
+import re
+import threading
 
 # Load environment variables from .env file if python-dotenv is installed
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except Exception:
-    # dotenv not installed in this environment; rely on OS environment variables
-    pass
-
-class FinancialAdvisor:
-    def __init__(self):
+# (skipped on Vercel: the variables are already in the environment there)
+if not os.getenv('VERCEL'):
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except Exception:
+        # dotenv not installed in this environment; rely on OS environment variables
+        pass
+
+from api.ai_cache import SingleFlight, get_ai_cache
+from api.session_store import get_session_store
+from api.semantic_cache import get_semantic_cache, is_follow_up
+from api.resilience import CircuitBreaker, RetryPolicy, deadline_timeout
+from api import rule_engine
+
+# Caps concurrent LLM requests per process (matters for the self-hosted
+# server, where many updates are handled in parallel threads)
+AI_CALL_SLOTS = threading.BoundedSemaphore(int(os.getenv('AI_MAX_CONCURRENCY', '8')))
+
+# Identical prompts requested concurrently (double taps, /tips bursts) share
+# one LLM call; keyed on the same hash as the response cache
+AI_SINGLE_FLIGHT = SingleFlight()
+
+# Skips Groq entirely (rule-based answers) while most recent calls fail
+GROQ_BREAKER = CircuitBreaker(
+    'groq',
+    window=int(os.getenv('GROQ_BREAKER_WINDOW', '20')),
+    failure_rate=float(os.getenv('GROQ_BREAKER_FAILURE_RATE', '0.5')),
+    min_calls=int(os.getenv('GROQ_BREAKER_MIN_CALLS', '5')),
+    cooldown=float(os.getenv('GROQ_BREAKER_COOLDOWN_SECONDS', '30')),
+)
+
+# Retries rate-limited / overloaded Groq SDK calls; shared with api/async_advisor.py
+GROQ_RETRY = RetryPolicy(
+    attempts=int(os.getenv('GROQ_RETRY_ATTEMPTS', '2')),
+    base_delay=float(os.getenv('GROQ_RETRY_BASE_DELAY', '0.5')),
+)
+
+# Whether the last Groq completion on this thread produced a real model
+# answer (as opposed to a rule-based fallback); see _get_ai_response(cache_key=...)
+_completion_outcome = threading.local()
+
+# Process-wide state: env settings are parsed once, and the Groq SDK client /
+# HTTP session (and their connection pools) are shared by every advisor.
+# Call reload_settings() after changing the environment.
+_settings = None
+_groq_clients = {}
+_http_session = None
+_advisor = None
+_state_lock = threading.Lock()
+
+
+def _env_number(name: str, cast, default):
+    try:
+        return cast(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+# Which routing profile each advisor call uses; override with e.g.
+# GROQ_ROUTES="chat=fast,monthly_analysis=default". Unlisted routes use "default".
+DEFAULT_ROUTES = {
+    'transaction_advice': 'fast',
+    'personalized_advice': 'fast',
+    'monthly_analysis': 'deep',
+    'budget_recommendation': 'deep',
+}
+
+
+def _read_profile(name: str, model: str, reasoning_effort: str, max_tokens: int, timeout: float) -> Dict:
+    """Routing profile `name`, overridable with GROQ_PROFILE_<NAME>_* variables"""
+    prefix = f"GROQ_PROFILE_{name.upper()}_"
+    return {
+        'model': os.getenv(prefix + 'MODEL', model),
+        'reasoning_effort': os.getenv(prefix + 'REASONING_EFFORT', reasoning_effort),
+        'max_tokens': _env_number(prefix + 'MAX_TOKENS', int, max_tokens),
+        'timeout': _env_number(prefix + 'TIMEOUT_SECONDS', float, timeout),
+    }
+
+
+def _read_routes(spec: str) -> Dict:
+    routes = dict(DEFAULT_ROUTES)
+    for item in (spec or '').split(','):
+        route, _, profile = item.partition('=')
+        if route.strip() and profile.strip():
+            routes[route.strip()] = profile.strip()
+    return routes
+
+
+def _read_settings() -> Dict:
+    settings = {
         # Only Groq is supported in this project (self-use)
-        self.groq_api_key = os.getenv('GROQ_API_KEY')
+        'groq_api_key': os.getenv('GROQ_API_KEY'),
         # Allow selecting Groq model via env var, default to Groq's gpt-120b-oss
-        self.groq_model = os.getenv('GROQ_MODEL', 'gpt-oss-120b')
+        'groq_model': os.getenv('GROQ_MODEL', 'gpt-oss-120b'),
         # Groq runtime tuning (can override for robust responses)
+        'groq_temperature': _env_number('GROQ_TEMPERATURE', float, 1),
+        'groq_max_tokens': _env_number('GROQ_MAX_TOKENS', int, 500),
+        'groq_top_p': _env_number('GROQ_TOP_P', float, 1.0),
+        # default toggle: include a short, user-facing rationale with responses
+        'include_reasoning_default': os.getenv('GROQ_INCLUDE_REASONING', 'false').lower() in ('1', 'true', 'yes'),
+        'groq_api_url': os.getenv('GROQ_API_BASE', 'https://api.groq.com').rstrip('/') +
+                        os.getenv('GROQ_API_PATH', '/openai/v1/chat/completions'),
+        # streamed replies give up (rule-based fallback) after this many silent seconds
+        'stream_stall_seconds': _env_number('GROQ_STREAM_STALL_SECONDS', float, 8.0),
+        # upper bound for one SDK call when the caller has no deadline
+        'groq_timeout_seconds': _env_number('GROQ_TIMEOUT_SECONDS', float, 20.0),
+        # chat prompt budgets (estimated tokens): raw history, and the running summary of older turns
+        'chat_history_token_budget': _env_number('CHAT_HISTORY_TOKEN_BUDGET', int, 600),
+        'chat_summary_token_budget': _env_number('CHAT_SUMMARY_TOKEN_BUDGET', int, 250),
+        # answer everything with the local rule engine, even when a Groq key is set
+        'fast_mode': os.getenv('AI_FAST_MODE', 'false').lower() in ('1', 'true', 'yes'),
+    }
+    # Per-call routing: short tips go to a small low-effort model, full
+    # analyses get the large model and a bigger answer budget
+    model, max_tokens, timeout = settings['groq_model'], settings['groq_max_tokens'], settings['groq_timeout_seconds']
+    settings['routing_profiles'] = {
+        'fast': _read_profile('fast', 'gpt-oss-20b', 'low', min(max_tokens, 300), min(timeout, 8.0)),
+        'default': _read_profile('default', model, 'medium', max_tokens, timeout),
+        'deep': _read_profile('deep', model, 'medium', max(max_tokens, 900), timeout),
+    }
+    settings['routes'] = _read_routes(os.getenv('GROQ_ROUTES', ''))
+    return settings
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for prompt budgeting"""
+    return (len(text or '') + 3) // 4
+
+
+def _clip(text: str, limit: int) -> str:
+    text = ' '.join((text or '').split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + '…'
+
+
+def get_settings() -> Dict:
+    """Advisor settings parsed from the environment (once per process)"""
+    global _settings
+    with _state_lock:
+        if _settings is None:
+            _settings = _read_settings()
+        return _settings
+
+
+def reload_settings() -> Dict:
+    """Re-read the environment and drop the shared client and advisor"""
+    global _settings, _advisor, _http_session
+    with _state_lock:
+        _settings = _read_settings()
+        _groq_clients.clear()
+        _advisor = None
+        _http_session = None
+        return _settings
+
+
+def get_groq_client(api_key: str = None):
+    """Shared Groq SDK client for `api_key` (None if the SDK is not installed)"""
+    with _state_lock:
+        if api_key in _groq_clients:
+            return _groq_clients[api_key]
+    try:
+        from groq import Groq
+    except Exception:
+        Groq = None
+
+    client = None
+    if Groq is not None:
         try:
-            self.groq_temperature = float(os.getenv('GROQ_TEMPERATURE', '1'))
-        except Exception:
-            self.groq_temperature = 1
-        try:
-            self.groq_max_tokens = int(os.getenv('GROQ_MAX_TOKENS', '500'))
-        except Exception:
-            self.groq_max_tokens = 500
-        try:
-            self.groq_top_p = float(os.getenv('GROQ_TOP_P', '1.0'))
-        except Exception:
-            self.groq_top_p = 1.0
+            client = Groq(api_key=api_key) if api_key else Groq()
+        except TypeError:
+            # Some SDK versions use env var only
+            client = Groq()
+    with _state_lock:
+        return _groq_clients.setdefault(api_key, client)
+
+
+def get_http_session():
+    """Shared requests.Session for the HTTP fallback (keeps connections alive)"""
+    global _http_session
+    with _state_lock:
+        if _http_session is None and requests:
+            _http_session = requests.Session()
+        return _http_session
+
+
+def get_advisor() -> 'FinancialAdvisor':
+    """Process-wide FinancialAdvisor (the advisor holds no per-user state)"""
+    global _advisor
+    if _advisor is None:
+        advisor = FinancialAdvisor()
+        with _state_lock:
+            if _advisor is None:
+                _advisor = advisor
+    return _advisor
+
+
+def set_advisor(advisor: 'FinancialAdvisor' = None):
+    """Replace the process-wide advisor (tests inject fakes here); None makes
+    the next get_advisor() build a fresh one from the current settings"""
+    global _advisor
+    with _state_lock:
+        _advisor = advisor
 
-        # default toggle: include a short, user-facing rationale with responses
-        self.include_reasoning_default = os.getenv('GROQ_INCLUDE_REASONING', 'false').lower() in ('1', 'true', 'yes')
+
+class FinancialAdvisor:
+    def __init__(self):
+        settings = get_settings()
+        self.groq_api_key = settings['groq_api_key']
+        self.groq_model = settings['groq_model']
+        self.groq_temperature = settings['groq_temperature']
+        self.groq_max_tokens = settings['groq_max_tokens']
+        self.groq_top_p = settings['groq_top_p']
+        self.include_reasoning_default = settings['include_reasoning_default']
+        self.groq_api_url = settings['groq_api_url']
+        self.stream_stall_seconds = settings['stream_stall_seconds']
+        self.groq_timeout_seconds = settings['groq_timeout_seconds']
+        self.chat_history_token_budget = settings['chat_history_token_budget']
+        self.chat_summary_token_budget = settings['chat_summary_token_budget']
+        self.fast_mode = settings['fast_mode']
+        self.routing_profiles = settings['routing_profiles']
+        self.routes = settings['routes']
 
         # Default provider selection
         self.selected_provider = self._select_provider()
         
     def _select_provider(self):
-        """Select provider: only Groq or local fallback"""
-        if self.groq_api_key:
+        """Select provider: only Groq or local fallback (always local in fast mode)"""
+        if self.groq_api_key and not self.fast_mode:
             return 'groq'
         return 'local'
 
+    def _routing_profile(self, route: str = None) -> Dict:
+        """Model, reasoning effort, token cap and timeout for an advisor call"""
+        name = self.routes.get(route, 'default') if route else 'default'
+        profile = self.routing_profiles.get(name)
+        if profile is None:
+            print(f"Unknown routing profile '{name}' for route '{route}', using default")
+            profile = self.routing_profiles['default']
+        return profile
+
     # ---------------------------
     # Session & Cache utilities
     # ---------------------------
-    def _ensure_cache_dirs(self):
-        base = Path('.cache')
-        (base / 'chat_sessions').mkdir(parents=True, exist_ok=True)
-        (base / 'ai_cache').mkdir(parents=True, exist_ok=True)
-        return base
-
     def _cache_key(self, prompt: str) -> str:
         return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
 
     def _get_cached_response(self, key: str, ttl: int) -> Any:
-        cache_dir = self._ensure_cache_dirs() / 'ai_cache'
-        cache_file = cache_dir / f"{key}.json"
-        if not cache_file.exists():
-            return None
-        try:
-            meta = json.loads(cache_file.read_text())
-            if time.time() - meta.get('ts', 0) > ttl:
-                return None
-            return meta.get('response')
-        except Exception:
-            return None
+        return get_ai_cache().get(key, ttl)
 
     def _set_cached_response(self, key: str, response: Any):
-        cache_dir = self._ensure_cache_dirs() / 'ai_cache'
-        cache_file = cache_dir / f"{key}.json"
-        meta = {'ts': time.time(), 'response': response}
         try:
-            cache_file.write_text(json.dumps(meta))
+            get_ai_cache().set(key, response)
         except Exception:
             pass
 
-    def _load_session(self, user_id: str) -> Dict:
-        base = self._ensure_cache_dirs() / 'chat_sessions'
-        f = base / f"{user_id}.json"
-        if not f.exists():
-            session = {'messages': [], 'memory': ''}
-            f.write_text(json.dumps(session))
-            return session
+    def _load_session(self, user_id: str, limit: int = None) -> Dict:
         try:
-            return json.loads(f.read_text())
-        except Exception:
-            return {'messages': [], 'memory': ''}
+            return get_session_store().load(user_id, limit=limit)
+        except Exception as e:
+            print(f"Session load error: {e}")
+            return {'messages': [], 'message_ids': [], 'memory': '', 'summary': ''}
 
-    def _save_session(self, user_id: str, session: Dict):
-        base = self._ensure_cache_dirs() / 'chat_sessions'
-        f = base / f"{user_id}.json"
+    def _append_session_turn(self, user_id: str, message: str, response: str, memory: str = None, **fields):
+        """Append one user/assistant exchange (and a new memory, summary, etc. if any)"""
         try:
-            f.write_text(json.dumps(session))
-        except Exception:
-            pass
+            get_session_store().append(user_id, [
+                {'role': 'user', 'content': message},
+                {'role': 'assistant', 'content': response},
+            ], memory=memory, **fields)
+        except Exception as e:
+            print(f"Session save error: {e}")
+
+    def _compact_history(self, session: Dict, max_history: int) -> Dict:
+        """Fold turns older than the last `max_history` messages (and more,
+        while the rest is over the history token budget) into the running
+        summary. The summary is extractive, one line per exchange, so it costs
+        no extra LLM call; its oldest lines drop out past the summary budget.
+
+        Returns {'history', 'summary', 'summarized_through'}; the last one is
+        None when nothing was folded.
+        """
+        messages = session.get('messages', [])
+        ids = session.get('message_ids') or []
+        summary = session.get('summary') or ''
+
+        keep = max(0, len(messages) - max_history)
+        while keep < len(messages) - 2 and sum(
+                estimate_tokens(m.get('content', '')) for m in messages[keep:]) > self.chat_history_token_budget:
+            keep += 2
+        # never split an exchange: the kept history starts with a user message
+        while keep < len(messages) and messages[keep].get('role') != 'user':
+            keep += 1
+        if keep == 0 or len(ids) != len(messages):
+            return {'history': messages, 'summary': summary, 'summarized_through': None}
+
+        lines = summary.splitlines() if summary else []
+        for m in messages[:keep]:
+            content = m.get('content', '')
+            if m.get('role') == 'user':
+                lines.append(f"- User: {_clip(content, 80)}")
+            else:
+                first_sentence = re.split(r'(?<=[.!?])\s', ' '.join(content.split()), maxsplit=1)[0]
+                answer = f"Asisten: {_clip(first_sentence, 120)}"
+                if lines and lines[-1].startswith('- User: ') and ' → ' not in lines[-1]:
+                    lines[-1] += f" → {answer}"
+                else:
+                    lines.append(f"- {answer}")
+        while len(lines) > 1 and estimate_tokens('\n'.join(lines)) > self.chat_summary_token_budget:
+            lines.pop(0)
+
+        return {'history': messages[keep:], 'summary': '\n'.join(lines), 'summarized_through': ids[keep - 1]}
 
     # Public chat API: stateful, multi-turn, with caching
     def chat_with_user(self, user_id: str, message: str, user_profile: Dict = None, *, cache_enabled: bool = True, verbose: bool = False, with_reasoning: bool = False) -> str:
@@ -117,25 +336,34 @@ class FinancialAdvisor:
         - user_profile: optional financial data to build memory
         - cache_enabled: whether to use rate-limited cache
         """
-        # Load session and possibly populate memory
-        session = self._load_session(user_id)
-
-        if not session.get('memory') and user_profile:
-            # create a short profile summary as memory
-            try:
-                memory = self._prepare_user_context(user_profile)
-            except Exception:
-                memory = ''
-            session['memory'] = memory
-
-        # Keep only last N messages
+        # Load the unsummarized messages; older turns live in session['summary']
         max_history = 8
-        history = session.get('messages', [])[-max_history:]
+        session = self._load_session(user_id)
+        session_fields = {}
 
-        # Build a single prompt combining memory, history and new message
+        if user_profile:
+            # (re)build the profile memory only when the ledger changed
+            memory_version = self._cache_key(json.dumps(user_profile, sort_keys=True, default=str))
+            if not session.get('memory') or session.get('memory_version') != memory_version:
+                try:
+                    session['memory'] = self._prepare_user_context(user_profile)
+                except Exception:
+                    session['memory'] = ''
+                session_fields['memory'] = session['memory']
+                session_fields['memory_version'] = memory_version
+
+        compacted = self._compact_history(session, max_history)
+        history = compacted['history']
+        if compacted['summarized_through'] is not None:
+            session_fields['summary'] = compacted['summary']
+            session_fields['summarized_through'] = compacted['summarized_through']
+
+        # Build a single prompt combining memory, summary, history and new message
         system_prompt = ''
         if session.get('memory'):
             system_prompt = f"Memory user:\n{session['memory']}\n---\n"
+        if compacted['summary']:
+            system_prompt += f"Ringkasan percakapan sebelumnya:\n{compacted['summary']}\n---\n"
 
         history_text = ''
         for m in history:
@@ -152,9 +380,7 @@ class FinancialAdvisor:
             cached = self._get_cached_response(key, cache_ttl)
             if cached:
                 # append user message to session and return cached
-                session.setdefault('messages', []).append({'role': 'user', 'content': message})
-                session.setdefault('messages', []).append({'role': 'assistant', 'content': cached})
-                self._save_session(user_id, session)
+                self._append_session_turn(user_id, message, cached, **session_fields)
                 return cached
 
         # detect if user explicitly asks for more detail or asks for reasons
@@ -165,29 +391,101 @@ class FinancialAdvisor:
         if any(k in message.lower() for k in reason_keywords):
             with_reasoning = True
 
+        # Similar question already answered for this user and memory? (not
+        # for follow-ups such as "jelaskan lebih detail", whose meaning
+        # depends on the turns before them)
+        semantic_enabled = cache_enabled and not is_follow_up(message)
+        semantic_scope = (f"{user_id}:{self._cache_key(session.get('memory') or '')[:16]}:"
+                          f"{int(verbose)}{int(with_reasoning)}")
+        if semantic_enabled:
+            try:
+                similar = get_semantic_cache().lookup(semantic_scope, message)
+            except Exception as e:
+                print(f"Semantic cache error: {e}")
+                similar = None
+            if similar:
+                self._append_session_turn(user_id, message, similar, **session_fields)
+                return similar
+
         # call AI
-        response = self._get_ai_response(combined_prompt, verbose=verbose, with_reasoning=with_reasoning)
+        response = self._get_ai_response(combined_prompt, verbose=verbose, with_reasoning=with_reasoning, route='chat')
 
         # save to cache and session
         if cache_enabled:
             try:
                 self._set_cached_response(key, response)
+                if semantic_enabled:
+                    get_semantic_cache().add(semantic_scope, message, response)
             except Exception:
                 pass
 
-        session.setdefault('messages', []).append({'role': 'user', 'content': message})
-        session.setdefault('messages', []).append({'role': 'assistant', 'content': response})
-        # trim history before save
-        session['messages'] = session['messages'][-(max_history*2):]
-        self._save_session(user_id, session)
+        # the store keeps the newest messages; older ones are already in the summary
+        self._append_session_turn(user_id, message, response, **session_fields)
 
         return response
     
-    def get_transaction_advice(self, amount: float, category: str, description: str, user_data: Dict) -> str:
+    def get_transaction_advice(self, amount: float, category: str, description: str, user_data: Dict, deadline=None) -> str:
         """Get immediate advice when user inputs a transaction"""
-        # Prepare context from user's financial data
-        context = self._prepare_user_context(user_data)
+        figures = self._transaction_figures(amount, user_data)
+
+        # Jika provider Groq tersedia → gunakan
+        if self.selected_provider == 'groq' and requests:
+            profile = self._canonical_transaction_profile(amount, category, figures['total_income'],
+                                                          figures['month_balance_after'], figures['available_after_saving'])
+            template = self._get_transaction_advice_template(profile, deadline=deadline)
+            return self._splice_advice(template, self._advice_values(amount, description, profile, figures))
 
+        return self._local_transaction_advice(amount, category, figures)
+
+    def get_transaction_advice_batch(self, transactions: List[Dict], user_data: Dict, deadline=None) -> List[str]:
+        """Advice for many transactions at once, in input order.
+
+        Each transaction is a dict with amount, category and description and
+        gets the same advice get_transaction_advice would give it. Templates
+        that are not cached yet are generated TRANSACTION_BATCH_SIZE profiles
+        per LLM call (numbered JSON output); items the model skipped or
+        answered invalidly fall back to the local advice one by one.
+        """
+        items = []
+        for tx in transactions:
+            amount = float(tx.get('amount', 0) or 0)
+            items.append((amount, tx.get('category', ''), tx.get('description', ''),
+                          self._transaction_figures(amount, user_data)))
+
+        if not (self.selected_provider == 'groq' and requests):
+            return [self._local_transaction_advice(amount, category, figures)
+                    for amount, category, _, figures in items]
+
+        ttl = int(os.getenv('TRANSACTION_ADVICE_TTL_SECONDS', '21600'))
+        profiles, templates, missing = [], {}, {}
+        for amount, category, _, figures in items:
+            profile = self._canonical_transaction_profile(amount, category, figures['total_income'],
+                                                          figures['month_balance_after'], figures['available_after_saving'])
+            key = self._transaction_template_key(profile)
+            profiles.append((key, profile))
+            if key not in templates and key not in missing:
+                cached = self._get_cached_response(key, ttl)
+                if cached:
+                    templates[key] = cached
+                else:
+                    missing[key] = profile
+
+        batch_size = max(1, int(os.getenv('TRANSACTION_BATCH_SIZE', '20')))
+        pending = list(missing.items())
+        for start in range(0, len(pending), batch_size):
+            templates.update(self._generate_advice_templates(dict(pending[start:start + batch_size]), deadline=deadline))
+
+        results = []
+        for (amount, category, description, figures), (key, profile) in zip(items, profiles):
+            template = templates.get(key)
+            if template:
+                results.append(self._splice_advice(template, self._advice_values(amount, description, profile, figures)))
+            else:
+                results.append(self._local_transaction_advice(amount, category, figures))
+        return results
+
+    def _transaction_figures(self, amount: float, user_data: Dict) -> Dict:
+        """Balances after recording `amount` as an expense, raw and formatted"""
         carry_over = user_data.get('carry_over_balance', 0)
         total_income = user_data.get('total_income', 0)
         total_expense = user_data.get('total_expense', 0)
@@ -208,33 +506,40 @@ class FinancialAdvisor:
         formatted_saving_target = f"Rp {saving_target:,.0f}".replace(",", ".")
         formatted_available = f"Rp {available_after_saving:,.0f}".replace(",", ".")
 
-        # Prompt untuk provider Groq
-        prompt = f"""
-        Kamu adalah advisor keuangan yang ramah dan membantu. User baru saja input transaksi:
-
-        Transaksi: {formatted_amount} untuk {category} - {description}
-
-        Data keuangan user (sebelum transaksi ini):
-        {context}
-
-        Setelah mencatat transaksi ini:
-        - Sisa saldo bulan ini: {formatted_month_balance}
-        - Saldo total akumulatif: {formatted_cumulative}
-        - Target tabungan bulanan: {formatted_saving_target}
-        - Sisa yang aman digunakan setelah tabungan: {formatted_available}
+        return {
+            'total_income': total_income,
+            'month_balance_after': current_month_balance_after,
+            'available_after_saving': available_after_saving,
+            'formatted_amount': formatted_amount,
+            'formatted_month_balance': formatted_month_balance,
+            'formatted_cumulative': formatted_cumulative,
+            'formatted_saving_target': formatted_saving_target,
+            'formatted_available': formatted_available,
+        }
 
-        Berikan 2–3 saran singkat yang:
-        1. Positif, ramah, dan actionable
-        2. Relevan dengan kategori transaksi
-        3. Jika pengeluaran besar, beri peringatan
-        4. Jika pemasukan, sarankan alokasi ke tabungan/investasi
-        """
+    def _advice_values(self, amount: float, description: str, profile: Dict, figures: Dict) -> Dict:
+        """Values for the placeholders of an advice template"""
+        total_income = figures['total_income']
+        percent = (amount / total_income) * 100 if total_income else 0
+        return {
+            'jumlah': figures['formatted_amount'],
+            'kategori': profile['category'].title(),
+            'deskripsi': self._normalize_description(description),
+            'sisa_bulan': figures['formatted_month_balance'],
+            'saldo_total': figures['formatted_cumulative'],
+            'target_tabungan': figures['formatted_saving_target'],
+            'bisa_dipakai': figures['formatted_available'],
+            'persen_income': f"{percent:.1f}%",
+        }
 
-        # Jika provider Groq tersedia → gunakan
-        if self.selected_provider == 'groq' and requests:
-            return self._get_ai_response(prompt, with_reasoning=False)
+    def _local_transaction_advice(self, amount: float, category: str, figures: Dict) -> str:
+        """Local deterministic transaction advice (no AI provider)"""
+        total_income = figures['total_income']
+        formatted_month_balance = figures['formatted_month_balance']
+        formatted_cumulative = figures['formatted_cumulative']
+        formatted_saving_target = figures['formatted_saving_target']
+        formatted_available = figures['formatted_available']
 
-        # Local deterministic fallback
         advice_lines = []
         advice_lines.append("💡 Tips:")
 
@@ -265,67 +570,226 @@ class FinancialAdvisor:
 
         return "\n".join(advice_lines)
 
-def get_monthly_advice(self, user_data: Dict) -> str:
-    """Generate monthly financial advice based on trends and targets"""
-    try:
-        total_income = user_data.get('total_income', 0)
-        total_expense = user_data.get('total_expense', 0)
-        categories = user_data.get('categories', {})  # misal {"makanan": 1200000, "transport": 500000}
-        carry_over = user_data.get('carry_over_balance', 0)
+    # ---------------------------
+    # Transaction advice templates
+    # ---------------------------
+    # Advice is generated per (category, spend ratio band, balance band) with
+    # placeholders instead of exact figures, cached, and the real numbers are
+    # spliced in afterwards, so most transactions never need a fresh LLM call.
+    ADVICE_PLACEHOLDERS = ('jumlah', 'kategori', 'deskripsi', 'sisa_bulan', 'saldo_total',
+                           'target_tabungan', 'bisa_dipakai', 'persen_income')
+
+    def _canonical_transaction_profile(self, amount: float, category: str, total_income: float,
+                                       month_balance_after: float, available_after_saving: float) -> Dict:
+        """Bucket a transaction into the coarse features its advice depends on"""
+        category = ' '.join((category or 'lainnya').lower().split())
+
+        if not total_income:
+            spend_ratio = 'tanpa pemasukan'
+        else:
+            percent = (amount / total_income) * 100
+            if percent < 5:
+                spend_ratio = 'kecil (<5% income)'
+            elif percent < 15:
+                spend_ratio = 'sedang (5-15% income)'
+            elif percent <= 30:
+                spend_ratio = 'besar (15-30% income)'
+            else:
+                spend_ratio = 'sangat besar (>30% income)'
+
+        if month_balance_after < 0:
+            balance_band = 'saldo bulan ini minus'
+        elif available_after_saving <= 0:
+            balance_band = 'belum mencapai target tabungan'
+        elif available_after_saving < 500_000:
+            balance_band = 'sisa aman tipis (<Rp 500rb)'
+        elif available_after_saving < 2_000_000:
+            balance_band = 'sisa aman cukup (Rp 500rb-2jt)'
+        else:
+            balance_band = 'sisa aman longgar (>Rp 2jt)'
 
-        saving_target = 1_000_000
-        balance = total_income - total_expense
-        available_after_saving = max(0, balance - saving_target)
+        return {'category': category, 'spend_ratio': spend_ratio, 'balance_band': balance_band}
 
-        # Format angka
-        formatted_income = f"Rp {total_income:,.0f}".replace(",", ".")
-        formatted_expense = f"Rp {total_expense:,.0f}".replace(",", ".")
-        formatted_balance = f"Rp {balance:,.0f}".replace(",", ".")
-        formatted_saving = f"Rp {saving_target:,.0f}".replace(",", ".")
-        formatted_available = f"Rp {available_after_saving:,.0f}".replace(",", ".")
+    def _transaction_template_key(self, profile: Dict) -> str:
+        return self._cache_key(f"txn-advice:v1|{profile['category']}|{profile['spend_ratio']}|{profile['balance_band']}")
 
-        # Analisis proporsi kategori
-        insights = []
-        if total_expense > 0:
-            for cat, val in categories.items():
-                prop = (val / total_expense) * 100
-                if prop > 30:
-                    insights.append(f"⚠️ Pengeluaran {cat.title()} mencapai {prop:.1f}% dari total, cukup tinggi.")
-                elif prop > 20:
-                    insights.append(f"ℹ️ Pengeluaran {cat.title()} {prop:.1f}% — masih aman, tapi bisa dioptimalkan.")
-
-        # Tabungan
-        if balance < saving_target:
-            insights.append("⚠️ Saldo bulan ini belum mencapai target tabungan Rp 1.000.000. Prioritaskan kebutuhan pokok.")
-        else:
-            insights.append(f"✅ Kamu sudah bisa menabung Rp {saving_target:,} bulan ini.")
-
-        # Buat teks final
-        msg = [
-            "📅 **Laporan Bulanan**",
-            f"💰 Total Pemasukan: {formatted_income}",
-            f"💸 Total Pengeluaran: {formatted_expense}",
-            f"📊 Saldo Akhir: {formatted_balance}",
-            f"💎 Target Tabungan: {formatted_saving}",
-            f"💵 Bisa Dipakai: {formatted_available}",
-            "",
-            "🔎 Insight Bulanan:"
-        ]
+    def _get_transaction_advice_template(self, profile: Dict, deadline=None) -> str:
+        """Cached advice template for a canonical transaction profile"""
+        key = self._transaction_template_key(profile)
+        ttl = int(os.getenv('TRANSACTION_ADVICE_TTL_SECONDS', '21600'))
+        cached = self._get_cached_response(key, ttl)
+        if cached:
+            return cached
 
-        if insights:
-            msg.extend(insights)
-        else:
-            msg.append("✅ Pengeluaran bulan ini masih dalam batas sehat (tidak ada kategori >20%).")
+        placeholders = ', '.join('{' + name + '}' for name in self.ADVICE_PLACEHOLDERS)
+        prompt = f"""
+        Kamu adalah advisor keuangan yang ramah dan membantu. User baru saja input transaksi:
 
-        return "\n".join(msg)
+        - Kategori: {profile['category']}
+        - Besar transaksi dibanding pemasukan bulan ini: {profile['spend_ratio']}
+        - Kondisi saldo setelah transaksi: {profile['balance_band']}
 
-    except Exception as e:
-        return f"❌ Gagal membuat laporan bulanan: {str(e)}"
+        Berikan 2–3 saran singkat yang:
+        1. Positif, ramah, dan actionable
+        2. Relevan dengan kategori transaksi
+        3. Jika pengeluaran besar, beri peringatan
+        4. Jika pemasukan, sarankan alokasi ke tabungan/investasi
 
+        Jangan menulis angka rupiah sendiri. Jika perlu menyebut angka, pakai placeholder
+        berikut persis seperti tertulis (akan diganti otomatis): {placeholders}
+        """
+        template = self._get_ai_response(prompt, with_reasoning=False, deadline=deadline, route='transaction_advice')
 
-    def get_monthly_analysis(self, user_data: Dict) -> str:
-        """Generate comprehensive monthly financial analysis"""
-        
+        # Only cache real model output that followed the template instructions
+        if self._is_advice_template(template):
+            self._set_cached_response(key, template)
+        return template
+
+    def _is_advice_template(self, template) -> bool:
+        return isinstance(template, str) and any('{' + name + '}' in template for name in self.ADVICE_PLACEHOLDERS)
+
+    def _generate_advice_templates(self, profiles: Dict[str, Dict], deadline=None) -> Dict[str, str]:
+        """Advice templates for several profiles ({cache key: profile}) in one LLM call.
+
+        Returns only the templates that parsed and validated; they are cached
+        like single templates.
+        """
+        keys = list(profiles)
+        placeholders = ', '.join('{' + name + '}' for name in self.ADVICE_PLACEHOLDERS)
+        listing = '\n'.join(
+            f"{i}. Kategori: {profiles[key]['category']}; besar transaksi: {profiles[key]['spend_ratio']}; "
+            f"saldo setelah transaksi: {profiles[key]['balance_band']}"
+            for i, key in enumerate(keys, 1))
+        prompt = f"""
+        Kamu adalah advisor keuangan yang ramah dan membantu. Berikut {len(keys)} transaksi yang baru diinput user:
+
+{listing}
+
+        Untuk SETIAP transaksi, berikan 2–3 saran singkat yang positif, actionable, relevan dengan
+        kategorinya; beri peringatan jika pengeluaran besar, dan sarankan alokasi ke tabungan/investasi
+        jika pemasukan.
+
+        Jangan menulis angka rupiah sendiri. Jika perlu menyebut angka, pakai placeholder
+        berikut persis seperti tertulis (akan diganti otomatis): {placeholders}
+
+        Jawab HANYA dengan JSON array, satu objek per transaksi, tanpa teks lain:
+        [{{"id": 1, "saran": "..."}}, {{"id": 2, "saran": "..."}}]
+        """
+        answer = self._get_ai_response(prompt, with_reasoning=False, deadline=deadline, route='transaction_advice_batch',
+                                       max_tokens=max(self.groq_max_tokens, 150 * len(keys)))
+
+        templates = {}
+        for item_id, advice in self._parse_numbered_json(answer).items():
+            if 1 <= item_id <= len(keys) and self._is_advice_template(advice):
+                templates[keys[item_id - 1]] = advice.strip()
+                self._set_cached_response(keys[item_id - 1], advice.strip())
+        if len(templates) < len(keys):
+            print(f"Batched advice: {len(keys) - len(templates)} of {len(keys)} items invalid, using local advice")
+        return templates
+
+    def _parse_numbered_json(self, text: str) -> Dict[int, str]:
+        """{id: saran} from a JSON array answer (tolerates code fences and surrounding text)"""
+        if not isinstance(text, str):
+            return {}
+        start, end = text.find('['), text.rfind(']')
+        if start < 0 or end <= start:
+            return {}
+        try:
+            data = json.loads(text[start:end + 1])
+        except ValueError:
+            return {}
+
+        parsed = {}
+        for item in data if isinstance(data, list) else []:
+            if not isinstance(item, dict):
+                continue
+            try:
+                item_id = int(item.get('id'))
+            except (TypeError, ValueError):
+                continue
+            advice = item.get('saran', item.get('advice'))
+            if isinstance(advice, str) and advice.strip() and item_id not in parsed:
+                parsed[item_id] = advice
+        return parsed
+
+    def _normalize_description(self, description: str) -> str:
+        description = ' '.join((description or '').split())
+        return description[:60] or '-'
+
+    def _splice_advice(self, template: str, values: Dict) -> str:
+        """Fill the {placeholder} slots of a cached advice template"""
+        for name, value in values.items():
+            template = template.replace('{' + name + '}', str(value))
+        return template
+
+    def get_monthly_advice(self, user_data: Dict) -> str:
+        """Generate monthly financial advice based on trends and targets"""
+        try:
+            total_income = user_data.get('total_income', 0)
+            total_expense = user_data.get('total_expense', 0)
+            categories = user_data.get('categories', {})  # misal {"makanan": 1200000, "transport": 500000}
+            carry_over = user_data.get('carry_over_balance', 0)
+
+            saving_target = 1_000_000
+            balance = total_income - total_expense
+            available_after_saving = max(0, balance - saving_target)
+
+            # Format angka
+            formatted_income = f"Rp {total_income:,.0f}".replace(",", ".")
+            formatted_expense = f"Rp {total_expense:,.0f}".replace(",", ".")
+            formatted_balance = f"Rp {balance:,.0f}".replace(",", ".")
+            formatted_saving = f"Rp {saving_target:,.0f}".replace(",", ".")
+            formatted_available = f"Rp {available_after_saving:,.0f}".replace(",", ".")
+
+            # Analisis proporsi kategori
+            insights = []
+            if total_expense > 0:
+                for cat, val in categories.items():
+                    prop = (val / total_expense) * 100
+                    if prop > 30:
+                        insights.append(f"⚠️ Pengeluaran {cat.title()} mencapai {prop:.1f}% dari total, cukup tinggi.")
+                    elif prop > 20:
+                        insights.append(f"ℹ️ Pengeluaran {cat.title()} {prop:.1f}% — masih aman, tapi bisa dioptimalkan.")
+
+            # Tabungan
+            if balance < saving_target:
+                insights.append("⚠️ Saldo bulan ini belum mencapai target tabungan Rp 1.000.000. Prioritaskan kebutuhan pokok.")
+            else:
+                insights.append(f"✅ Kamu sudah bisa menabung Rp {saving_target:,} bulan ini.")
+
+            # Buat teks final
+            msg = [
+                "📅 **Laporan Bulanan**",
+                f"💰 Total Pemasukan: {formatted_income}",
+                f"💸 Total Pengeluaran: {formatted_expense}",
+                f"📊 Saldo Akhir: {formatted_balance}",
+                f"💎 Target Tabungan: {formatted_saving}",
+                f"💵 Bisa Dipakai: {formatted_available}",
+                "",
+                "🔎 Insight Bulanan:"
+            ]
+
+            if insights:
+                msg.extend(insights)
+            else:
+                msg.append("✅ Pengeluaran bulan ini masih dalam batas sehat (tidak ada kategori >20%).")
+
+            return "\n".join(msg)
+
+        except Exception as e:
+            return f"❌ Gagal membuat laporan bulanan: {str(e)}"
+
+
+    def get_monthly_analysis(self, user_data: Dict, on_update=None, deadline=None, cache_key: str = None) -> str:
+        """Generate comprehensive monthly financial analysis
+
+        on_update: optional callable receiving the partial text while the
+        answer is being streamed; cache_key: store the AI answer under this key
+        """
+        return self._get_ai_response(self._monthly_analysis_prompt(user_data), on_update=on_update,
+                                     deadline=deadline, cache_key=cache_key, route='monthly_analysis')
+
+    def _monthly_analysis_prompt(self, user_data: Dict) -> str:
         context = self._prepare_detailed_context(user_data)
         
         prompt = f"""
@@ -348,12 +812,16 @@ def get_monthly_advice(self, user_data: Dict) -> str:
         🎯 Target Hemat:
         [target realistis yang bisa dicapai]
         """
-        
-        return self._get_ai_response(prompt)
+        return prompt
     
-    def get_budget_recommendation(self, monthly_income: float, user_data: Dict) -> str:
+    def get_budget_recommendation(self, monthly_income: float, user_data: Dict, on_update=None, deadline=None,
+                                  cache_key: str = None) -> str:
         """Generate personalized budget recommendations with historical context"""
-        
+        return self._get_ai_response(self._budget_recommendation_prompt(monthly_income, user_data),
+                                     on_update=on_update, deadline=deadline, cache_key=cache_key,
+                                     route='budget_recommendation')
+
+    def _budget_recommendation_prompt(self, monthly_income: float, user_data: Dict) -> str:
         # Extract historical data for better recommendations
         carry_over_balance = user_data.get('carry_over_balance', 0)
         avg_monthly_expense = user_data.get('avg_monthly_expense', 0)
@@ -407,12 +875,14 @@ def get_monthly_advice(self, user_data: Dict) -> str:
         🎯 REKOMENDASI KHUSUS:
         [Saran spesifik berdasarkan trend pengeluaran dan saldo carry-over user]
         """
-        
-        return self._get_ai_response(prompt)
+        return prompt
     
-    def check_budget_feasibility(self, budget_amount: float, duration_days: int, user_data: Dict = None) -> str:
+    def check_budget_feasibility(self, budget_amount: float, duration_days: int, user_data: Dict = None, deadline=None) -> str:
         """Check if a budget is feasible for a specific duration and provide daily spending advice"""
-        
+        return self._get_ai_response(self._budget_feasibility_prompt(budget_amount, duration_days, user_data),
+                                     deadline=deadline, route='budget_feasibility')
+
+    def _budget_feasibility_prompt(self, budget_amount: float, duration_days: int, user_data: Dict = None) -> str:
         daily_budget = budget_amount / duration_days
         
         # Get user's typical spending pattern if available
@@ -451,10 +921,9 @@ def get_monthly_advice(self, user_data: Dict) -> str:
         ⚠️ PERINGATAN:
         [Hal-hal yang perlu diwaspadai dengan budget ini]
         """
-        
-        return self._get_ai_response(prompt)
+        return prompt
     
-    def get_daily_spending_plan(self, daily_budget: float, priorities: List[str] = None) -> str:
+    def get_daily_spending_plan(self, daily_budget: float, priorities: List[str] = None, deadline=None) -> str:
         """Generate daily spending plan based on budget"""
         
         if not priorities:
@@ -484,7 +953,7 @@ def get_monthly_advice(self, user_data: Dict) -> str:
         [Cara simple track pengeluaran per hari]
         """
         
-        return self._get_ai_response(prompt)
+        return self._get_ai_response(prompt, deadline=deadline, route='daily_plan')
 
     # ---------------------------
     # Advanced utility methods (Groq-first, local fallback)
@@ -530,22 +999,26 @@ def get_monthly_advice(self, user_data: Dict) -> str:
 
         Groq model will be used when available; otherwise produce deterministic plan.
         """
+        if self.selected_provider == 'groq' and requests:
+            try:
+                return self._call_groq_api(self._budget_plan_prompt(user_data), include_reasoning=with_reasoning)
+            except Exception as e:
+                print(f"Groq error: {e} - fallback ke rule-based plan")
+
+        return self._local_budget_plan(monthly_income, user_data, savings_goal)
+
+    def _budget_plan_prompt(self, user_data: Dict) -> str:
         # Build brief context
         ctx = self._prepare_detailed_context(user_data)
-        prompt = (
+        return (
             f"Anda adalah personal financial advisor untuk user tunggal. "
             f"Buatkan rencana budget bulanan yang sangat konkrit dan terukur.\n\n"
             f"DATA PENGGUNA:\n{ctx}\n\n"
             f"INSTRUKSI:\nBerikan: 1) Breakdown budget (kebutuhan/keinginan/tabungan) 2) Target tabungan mingguan dan bulanan 3) 3 langkah konkret untuk mencapai target 4) rekomendasi investasi (jika ada)"
         )
 
-        if self.selected_provider == 'groq' and requests:
-            try:
-                return self._call_groq_api(prompt, include_reasoning=with_reasoning)
-            except Exception as e:
-                print(f"Groq error: {e} - fallback ke rule-based plan")
-
-        # Local deterministic fallback
+    def _local_budget_plan(self, monthly_income: int, user_data: Dict, savings_goal: int = None) -> str:
+        """Deterministic 50/30/20 plan used when Groq is not available"""
         base_income = monthly_income
         needs = int(base_income * 0.5)
         wants = int(base_income * 0.3)
@@ -732,16 +1205,46 @@ def get_monthly_advice(self, user_data: Dict) -> str:
         # Implementation depends on your data structure
         return self._prepare_user_context(user_data)
     
-    def _get_ai_response(self, prompt: str, verbose: bool = False, with_reasoning: bool = False) -> str:
+    def _get_ai_response(self, prompt: str, verbose: bool = False, with_reasoning: bool = False, on_update=None, deadline=None,
+                         max_tokens: int = None, cache_key: str = None, route: str = None) -> str:
         """Get response from selected AI provider.
 
         with_reasoning=True requests a short, numbered rationale appended to the
         user-facing answer (not chain-of-thought). verbose=True requests more
-        detailed fallback output.
+        detailed fallback output. on_update, if given, switches the Groq call
+        to streaming and receives the accumulated text as tokens arrive.
+        deadline (api.resilience.Deadline) bounds the whole Groq attempt; the
+        rule-based answer is used once it has passed or the breaker is open.
+        max_tokens overrides GROQ_MAX_TOKENS (batched prompts need longer answers).
+        cache_key, if given, stores the answer in the AI cache, but only when it
+        is a real model answer (never a rule-based fallback). route names the
+        calling method and picks its routing profile (see DEFAULT_ROUTES).
         """
         try:
             if self.selected_provider == 'groq' and requests:
-                return self._call_groq_api(prompt, include_reasoning=with_reasoning)
+                if deadline is not None and deadline.expired():
+                    print("AI deadline passed, using rule-based advice")
+                elif not GROQ_BREAKER.allow():
+                    print("Groq circuit open, using rule-based advice")
+                else:
+                    profile = self._routing_profile(route)
+
+                    def call():
+                        _completion_outcome.ok = False
+                        text = self._call_groq_api(prompt, include_reasoning=with_reasoning, on_update=on_update,
+                                                   deadline=deadline, max_tokens=max_tokens, profile=profile)
+                        return text, _completion_outcome.ok
+
+                    key = f"{self._cache_key(prompt)}:{int(bool(with_reasoning))}:{profile['model']}"
+                    try:
+                        text, ok = AI_SINGLE_FLIGHT.do(key, call,
+                                                       timeout=None if deadline is None else deadline.remaining())
+                    except TimeoutError:
+                        print("Shared AI call still running at the deadline, using rule-based advice")
+                        return self._get_rule_based_advice(prompt, verbose=verbose, with_reasoning=with_reasoning)
+                    if ok and cache_key:
+                        self._set_cached_response(cache_key, text)
+                    return text
             # fallback to rule-based when no Groq key or requests not installed
             return self._get_rule_based_advice(prompt, verbose=verbose, with_reasoning=with_reasoning)
 
@@ -749,45 +1252,111 @@ def get_monthly_advice(self, user_data: Dict) -> str:
             print(f"AI API Error: {e}")
             return self._get_rule_based_advice(prompt, verbose=verbose, with_reasoning=with_reasoning)
     
-    def _call_groq_api(self, prompt: str, include_reasoning: bool = False) -> str:
-        """Call Groq API (Fast and Free)"""
-        # Prefer using the official Groq Python SDK when available (streaming optional)
+    def _call_groq_api(self, prompt: str, include_reasoning: bool = False, on_update=None, deadline=None,
+                       max_tokens: int = None, profile: Dict = None) -> str:
+        """Call Groq API (Fast and Free), bounded by AI_CALL_SLOTS"""
+        if not AI_CALL_SLOTS.acquire(timeout=None if deadline is None else deadline.remaining()):
+            print("No free AI slot before the deadline, using rule-based advice")
+            return self._get_rule_based_advice(prompt, verbose=True, with_reasoning=include_reasoning)
         try:
-            from groq import Groq
-        except Exception:
-            Groq = None
+            return self._request_groq_completion(prompt, include_reasoning=include_reasoning,
+                                                 on_update=on_update, deadline=deadline, max_tokens=max_tokens,
+                                                 profile=profile)
+        finally:
+            AI_CALL_SLOTS.release()
 
-        instruction = 'Berikan jawaban singkat dan tindakan yang dapat diambil.'
-        if include_reasoning or self.include_reasoning_default:
-            instruction += ' Sertakan 2-4 poin singkat yang menjelaskan alasan dan langkah rekomendasi (rangkuman, bukan chain-of-thought).'
+    def _read_stream(self, completion, on_update, deadline=None):
+        """Accumulate a streamed completion, reporting progress to on_update.
 
-        messages = [
-            {'role': 'system', 'content': 'Kamu adalah financial advisor yang ramah, ahli keuangan Indonesia, dan memberikan saran praktis dengan bahasa yang mudah dipahami.'},
-            {'role': 'user', 'content': instruction + '\n\n' + prompt}
-        ]
+        Chunks are read on a helper thread so a stalled connection can be
+        detected; returns (text, stalled).
+        """
+        chunks = queue.Queue()
+        done = object()
 
-        # Try SDK first
-        if Groq is not None:
+        def pump():
             try:
+                for chunk in completion:
+                    try:
+                        delta = chunk.choices[0].delta
+                        chunks.put(getattr(delta, 'content', None) or '')
+                    except Exception:
+                        pass
+            except Exception as e:
+                print(f"Groq stream error: {e}")
+            finally:
+                chunks.put(done)
+
+        threading.Thread(target=pump, name='groq-stream', daemon=True).start()
+
+        text_parts = []
+        while True:
+            try:
+                piece = chunks.get(timeout=deadline_timeout(deadline, self.stream_stall_seconds))
+            except queue.Empty:
+                print("Groq stream stalled or ran out of time")
+                close = getattr(completion, 'close', None)
+                if close:
+                    try:
+                        close()
+                    except Exception:
+                        pass
+                return ''.join(text_parts).strip(), True
+            if piece is done:
+                return ''.join(text_parts).strip(), False
+            if piece:
+                text_parts.append(piece)
                 try:
-                    client = Groq(api_key=self.groq_api_key) if self.groq_api_key else Groq()
-                except TypeError:
-                    # Some SDK versions use env var only
-                    client = Groq()
+                    on_update(''.join(text_parts))
+                except Exception as e:
+                    print(f"Stream update error: {e}")
+
+    def _request_groq_completion(self, prompt: str, include_reasoning: bool = False, on_update=None, deadline=None,
+                                 max_tokens: int = None, profile: Dict = None) -> str:
+        """Run a single Groq chat completion (SDK first, HTTP fallback).
+
+        profile (see _routing_profile) selects the model, reasoning effort,
+        token cap and timeout; max_tokens overrides its token cap. The
+        outcome is reported to GROQ_BREAKER.
+        """
+        profile = profile or self._routing_profile()
+        model = self._groq_model(profile)
+        max_tokens = int(max_tokens or profile['max_tokens'])
+
+        def succeeded(text):
+            GROQ_BREAKER.record_success()
+            _completion_outcome.ok = True
+            return text
+
+        def failed(text):
+            GROQ_BREAKER.record_failure()
+            return text
 
-                model_name = self.groq_model
-                if '/' not in model_name:
-                    model_name = f'openai/{model_name}'
+        # Prefer using the official Groq Python SDK when available (streaming optional)
+        client = get_groq_client(self.groq_api_key)
+        messages = self._groq_messages(prompt, include_reasoning)
 
-                completion = client.chat.completions.create(
-                    model=model_name,
+        # Try SDK first
+        if client is not None:
+            try:
+                completion = GROQ_RETRY.call(lambda: client.chat.completions.create(
+                    model=model,
                     messages=messages,
                     temperature=float(self.groq_temperature),
-                    max_completion_tokens=int(self.groq_max_tokens),
+                    max_completion_tokens=max_tokens,
                     top_p=float(self.groq_top_p),
-                    reasoning_effort='medium',
-                    stream=False
-                )
+                    reasoning_effort=profile['reasoning_effort'],
+                    stream=on_update is not None,
+                    timeout=deadline_timeout(deadline, profile['timeout'])
+                ), deadline=deadline)
+
+                if on_update is not None:
+                    text, stalled = self._read_stream(completion, on_update, deadline=deadline)
+                    if not stalled and text:
+                        return succeeded(text)
+                    fallback = self._get_rule_based_advice(prompt, verbose=True, with_reasoning=include_reasoning)
+                    # Keep whatever was already shown to the user
+                    return failed(f"{text}\n\n{fallback}" if text else fallback)
 
                 # SDK may return an iterator (if streaming) or a response object
                 if hasattr(completion, '__iter__') and not isinstance(completion, (str, bytes)):
@@ -803,16 +1372,19 @@ def get_monthly_advice(self, user_data: Dict) -> str:
                                 text_parts.append(getattr(chunk.choices[0], 'text', '') or '')
                         except Exception:
                             pass
-                    return ''.join(text_parts).strip() or self._get_rule_based_advice(prompt, verbose=True, with_reasoning=include_reasoning)
+                    text = ''.join(text_parts).strip()
+                    if text:
+                        return succeeded(text)
+                    return self._get_rule_based_advice(prompt, verbose=True, with_reasoning=include_reasoning)
                 else:
                     # Non-streaming response
                     try:
                         # Try OpenAI-like structure
-                        return completion.choices[0].message.content.strip()
+                        return succeeded(completion.choices[0].message.content.strip())
                     except Exception:
                         try:
                             # Other shape
-                            return str(completion)
+                            return succeeded(str(completion))
                         except Exception:
                             return self._get_rule_based_advice(prompt, verbose=True, with_reasoning=include_reasoning)
 
@@ -823,9 +1395,7 @@ def get_monthly_advice(self, user_data: Dict) -> str:
             sdk_err = 'Groq SDK not installed'
 
         # If SDK not available or failed, fallback to HTTP approach with configurable endpoint
-        base = os.getenv('GROQ_API_BASE', 'https://api.groq.com')
-        path = os.getenv('GROQ_API_PATH', '/openai/v1/chat/completions')
-        url = base.rstrip('/') + path
+        url = self.groq_api_url
 
         headers = {
             'Authorization': f'Bearer {self.groq_api_key}',
@@ -833,9 +1403,10 @@ def get_monthly_advice(self, user_data: Dict) -> str:
         }
 
         data = {
-            'model': (f'openai/{self.groq_model}' if '/' not in self.groq_model else self.groq_model),
+            'model': model,
             'messages': messages,
-            'max_completion_tokens': int(self.groq_max_tokens),
+            'max_completion_tokens': max_tokens,
+            'reasoning_effort': profile['reasoning_effort'],
             'temperature': float(self.groq_temperature),
             'top_p': float(self.groq_top_p),
         }
@@ -843,43 +1414,61 @@ def get_monthly_advice(self, user_data: Dict) -> str:
         if not requests:
             return self._get_rule_based_advice(prompt, verbose=True, with_reasoning=include_reasoning)
 
+        timeout = deadline_timeout(deadline, min(10, profile['timeout']))
+        if timeout < 0.5:
+            # Not enough time left for another round trip
+            return failed(self._get_rule_based_advice(prompt, verbose=True, with_reasoning=include_reasoning))
+
         try:
-            resp = requests.post(url, headers=headers, json=data, timeout=10)
+            resp = get_http_session().post(url, headers=headers, json=data, timeout=timeout)
         except Exception as e:
-            return (f"Groq request failed ({sdk_err if 'sdk_err' in locals() else ''}) - network error: {e}. Menggunakan fallback lokal.\n" +
-                    self._get_rule_based_advice(prompt, verbose=True, with_reasoning=include_reasoning))
+            return failed(f"Groq request failed ({sdk_err if 'sdk_err' in locals() else ''}) - network error: {e}. Menggunakan fallback lokal.\n" +
+                          self._get_rule_based_advice(prompt, verbose=True, with_reasoning=include_reasoning))
 
         if resp.status_code == 404:
             snippet = (resp.text or '')[:500]
-            return (f"Groq API returned 404 Not Found for URL {url}. Response snippet: {snippet}\n"
-                    "Falling back to local rule-based advice.\n" +
-                    self._get_rule_based_advice(prompt, verbose=True, with_reasoning=include_reasoning))
+            return failed(f"Groq API returned 404 Not Found for URL {url}. Response snippet: {snippet}\n"
+                          "Falling back to local rule-based advice.\n" +
+                          self._get_rule_based_advice(prompt, verbose=True, with_reasoning=include_reasoning))
 
         try:
             resp.raise_for_status()
         except Exception as e:
             snippet = (resp.text or '')[:500]
-            return (f"Groq API error {resp.status_code}: {e}. Response snippet: {snippet}\n"
-                    "Falling back to local rule-based advice.\n" +
-                    self._get_rule_based_advice(prompt, verbose=True, with_reasoning=include_reasoning))
+            return failed(f"Groq API error {resp.status_code}: {e}. Response snippet: {snippet}\n"
+                          "Falling back to local rule-based advice.\n" +
+                          self._get_rule_based_advice(prompt, verbose=True, with_reasoning=include_reasoning))
 
         try:
             result = resp.json()
         except Exception:
             body = (resp.text or '')[:1000]
-            return (f"Groq API returned non-JSON response (truncated): {body}\n"
-                    "Falling back to local rule-based advice.\n" +
-                    self._get_rule_based_advice(prompt, verbose=True, with_reasoning=include_reasoning))
+            return failed(f"Groq API returned non-JSON response (truncated): {body}\n"
+                          "Falling back to local rule-based advice.\n" +
+                          self._get_rule_based_advice(prompt, verbose=True, with_reasoning=include_reasoning))
 
         try:
             content = result.get('choices', [])[0].get('message', {}).get('content')
             if content:
-                return content.strip()
+                return succeeded(content.strip())
         except Exception:
             pass
 
-        return self._get_rule_based_advice(prompt, verbose=True, with_reasoning=include_reasoning)
+        return failed(self._get_rule_based_advice(prompt, verbose=True, with_reasoning=include_reasoning))
     
+    def _groq_model(self, profile: Dict) -> str:
+        return profile['model'] if '/' in profile['model'] else f"openai/{profile['model']}"
+
+    def _groq_messages(self, prompt: str, include_reasoning: bool = False) -> List[Dict]:
+        instruction = 'Berikan jawaban singkat dan tindakan yang dapat diambil.'
+        if include_reasoning or self.include_reasoning_default:
+            instruction += ' Sertakan 2-4 poin singkat yang menjelaskan alasan dan langkah rekomendasi (rangkuman, bukan chain-of-thought).'
+
+        return [
+            {'role': 'system', 'content': 'Kamu adalah financial advisor yang ramah, ahli keuangan Indonesia, dan memberikan saran praktis dengan bahasa yang mudah dipahami.'},
+            {'role': 'user', 'content': instruction + '\n\n' + prompt}
+        ]
+
     # Removed other provider helpers (Gemini/OpenAI) to enforce Groq-only design
     
     def _get_rule_based_advice(self, prompt: str, verbose: bool = False, with_reasoning: bool = False) -> str:
@@ -887,113 +1476,22 @@ def get_monthly_advice(self, user_data: Dict) -> str:
 
         If verbose=True return multi-point actionable guidance. If
         with_reasoning=True append a short numbered rationale and next steps.
+        See api/rule_engine.py.
         """
-
-        def short_for(category_hint: str):
-            if category_hint == 'makanan':
-                return "💡 Tips: Coba meal prep untuk hemat pengeluaran makanan! Masak sendiri bisa hemat 30-50%."
-            if category_hint == 'transport':
-                return "💡 Tips: Pertimbangkan transportasi umum atau carpooling untuk menghemat biaya transport."
-            if category_hint == 'hiburan':
-                return "💡 Tips: Set budget hiburan maksimal 10% dari income bulanan ya!"
-            return "💡 Tips: Catat pengeluaranmu dan review mingguan untuk menemukan penghematan."
-
-        text = prompt.lower()
-        category = None
-        if 'makanan' in text:
-            category = 'makanan'
-        elif 'transport' in text:
-            category = 'transport'
-        elif 'hiburan' in text or 'entertainment' in text:
-            category = 'hiburan'
-
-        if not verbose and not with_reasoning:
-            return short_for(category)
-
-        # Rich fallback reasoning: structured output with hypotheses, prioritized actions,
-        # estimated savings (conservative ranges), a 4-week experiment plan and KPIs.
-        lines = []
-        lines.append(short_for(category))
-
-        # Summary / hypothesis
-        lines.append('\n� Ringkasan & Hipotesis Penyebab:')
-        if category == 'makanan':
-            lines.append('- Anda kemungkinan besar menghabiskan banyak untuk makanan karena kombinasi: frekuensi makan di luar, harga per porsi yang relatif tinggi, dan minimnya perencanaan (meal prep).')
-        elif category == 'transport':
-            lines.append('- Pengeluaran transport bisa tinggi karena rute panjang, penggunaan kendaraan pribadi, atau seringnya perjalanan tidak esensial.')
-        else:
-            lines.append('- Pengeluaran besar mungkin karena beberapa pengeluaran berulang yang tidak terkontrol atau kebiasaan pembelian impulsif.')
-
-        # Attempt to extract a numeric context (e.g., an example amount) from the prompt
-        import re
-        amounts = re.findall(r"Rp\s*([0-9\.,]+)", prompt, flags=re.IGNORECASE)
-        parsed_amount = None
-        if amounts:
-            # take the first found number as a reference and normalize
-            a = amounts[0].replace('.', '').replace(',', '')
-            try:
-                parsed_amount = int(a)
-            except Exception:
-                parsed_amount = None
-
-        # Prioritized actions with conservative estimated savings
-        lines.append('\n✅ Rekomendasi Prioritas (urut berdasarkan dampak cepat):')
-        if category == 'makanan':
-            # Action 1: reduce frequency
-            lines.append('1) Kurangi frekuensi makan di luar: target -1 kali/minggu. Estimasi hemat: Rp 50.000 - Rp 150.000/bln (tergantung harga menu).')
-            # Action 2: meal prep
-            lines.append('2) Meal prep 3x/minggu (siapkan bekal): estimasi hemat: Rp 200.000 - Rp 600.000/bln jika menggantikan 3 makan luar/minggu.')
-            # Action 3: pake promo/loyalty
-            lines.append('3) Manfaatkan promo, paket hemat, dan loyalty: hemat variatif, estimasi konservatif Rp 30.000 - Rp 150.000/bln.')
-            if parsed_amount:
-                lines.append(f"(Referensi transaksi yang terdeteksi: Rp {parsed_amount:,})")
-        elif category == 'transport':
-            lines.append('1) Gunakan transportasi umum/berbagi tumpangan minimal 2x/minggu: estimasi hemat Rp 100.000 - Rp 400.000/bln.')
-            lines.append('2) Plan rute & gabungkan trip (kurangi perjalanan tidak esensial): hemat Rp 50.000 - Rp 200.000/bln.')
-            lines.append('3) Pertimbangkan kendaraan hemat bahan bakar / sepeda jika memungkinkan: penghematan jangka menengah.')
-        else:
-            lines.append('1) Audit 2 minggu: catat setiap pengeluaran dan tandai 3 terbesar. Potong 1 pos non-esensial. Estimasi hemat: variatif (Rp 50.000 - Rp 500.000/bln).')
-            lines.append('2) Terapkan aturan 24 jam untuk pembelian non-esensial (tunda keputusan).')
-            lines.append('3) Atur batas bulanan untuk kategori ini dan otomatisasi transfer ke tabungan.')
-
-        # 4-week experiment plan
-        lines.append('\n🗓️ Rencana Eksperimen 4 Minggu:')
-        lines.append('Minggu 1: Catat semua pengeluaran makanan/transport selama 7 hari. Ukur frekuensi & rata-rata biaya per kejadian.')
-        lines.append('Minggu 2: Terapkan 1 intervensi prioritas (mis. 1x pengurangan makan di luar / meal prep).')
-        lines.append('Minggu 3: Tambah intervensi kedua (promo/loyalty atau rute efisien).')
-        lines.append('Minggu 4: Review dan kuantifikasi penghematan; tetapkan target bulanan baru.')
-
-        # KPIs & monitoring
-        lines.append('\n📈 KPI & Monitoring:')
-        lines.append('- KPI 1: Jumlah hari makan di luar per minggu (target: turun X hari).')
-        lines.append('- KPI 2: Rata-rata biaya per makan (target: turun Y%).')
-        lines.append('- KPI 3: Total penghematan/bln (bandingkan baseline minggu 1 vs minggu 4).')
-
-        # Quick tracking template suggestion
-        lines.append('\n🧾 Template Tracking Singkat (copy):')
-        lines.append('Tanggal | Kategori | Deskripsi | Jumlah (Rp) | Catatan (mis. alasan pembelian)')
-
-        # Final short rationale summary
-        rationale = ('\n\nAlasan singkat dan prioritas:\n'
-                     '1. Terapkan langkah berbiaya rendah dan langsung berpengaruh (kurangi frekuensi / meal prep).\n'
-                     '2. Ukur dampak dengan eksperimen 4 minggu untuk mengetahui apa yang benar-benar bekerja.\n'
-                     '3. Automasi dan batasan membuat perubahan menjadi konsisten dan terukur.')
-
-        result = '\n'.join(lines) + rationale
-        return result
+        return rule_engine.advice_for_prompt(prompt, verbose=verbose, with_reasoning=with_reasoning)
 
 # Example usage functions
 def get_transaction_insight(amount: float, category: str, description: str, user_financial_data: Dict) -> str:
     """Get AI-powered insight for a transaction"""
-    advisor = FinancialAdvisor()
+    advisor = get_advisor()
     return advisor.get_transaction_advice(amount, category, description, user_financial_data)
 
 def get_monthly_financial_analysis(user_financial_data: Dict) -> str:
     """Get comprehensive monthly analysis"""
-    advisor = FinancialAdvisor()
+    advisor = get_advisor()
     return advisor.get_monthly_analysis(user_financial_data)
 
 def get_personalized_budget(monthly_income: float, user_financial_data: Dict) -> str:
     """Get personalized budget recommendations"""
-    advisor = FinancialAdvisor()
+    advisor = get_advisor()
     return advisor.get_budget_recommendation(monthly_income, user_financial_data)
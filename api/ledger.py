@@ -0,0 +1,42 @@
+"""
+Ledger version for the report API's ETag
+
+The version is a hash of every cell in the sheet, so any change gives a new
+one: a new row, an edit or delete through the bot, or a hand edit in Google
+Sheets. It is computed from one get_all_values() read, which works across
+serverless instances where an in-process write counter would not. The same
+read is turned into get_all_records()-style rows with records_from_values(),
+so building the report needs no second Sheets call.
+"""
+import hashlib
+import json
+from typing import Dict, List
+
+
+def ledger_version(values: List[List]) -> str:
+    """Version of a sheet from its get_all_values() rows"""
+    raw = json.dumps(values, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _numericise(value):
+    """int or float for numeric cells, like gspread's get_all_records()"""
+    if not isinstance(value, str) or '_' in value:
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def records_from_values(values: List[List]) -> List[Dict]:
+    """get_all_records() rows (dicts keyed by the header row) from get_all_values() rows"""
+    if not values:
+        return []
+    header = values[0]
+    return [dict(zip(header, [_numericise(v) for v in row] + [''] * (len(header) - len(row))))
+            for row in values[1:]]
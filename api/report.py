@@ -1,10 +1,13 @@
 import json
 import os
 import base64
+import hashlib
+import threading
+import time
 from datetime import datetime, timezone, timedelta
 from http.server import BaseHTTPRequestHandler
-import gspread
-from google.oauth2.service_account import Credentials
+
+from api.ledger import ledger_version, records_from_values
 
 # Jakarta timezone (UTC+7)
 JAKARTA_TZ = timezone(timedelta(hours=7))
@@ -12,6 +15,29 @@ JAKARTA_TZ = timezone(timedelta(hours=7))
 # Default saving target
 DEFAULT_SAVING_TARGET = 1_000_000  # Rp 1 juta per bulan
 
+# Dashboard polling is answered from caches while the ledger is unchanged:
+# - Vercel's edge serves a report for REPORT_CACHE_SECONDS (s-maxage) and up to
+#   REPORT_STALE_SECONDS longer while it revalidates in the background
+# - the ETag follows the ledger version (a hash of every cell, see
+#   api/ledger.py) and today's Jakarta date, so revalidations of an
+#   unchanged ledger get a 304 and any edit, including one made directly in
+#   the sheet, gives a new report. A 304 still costs one full Sheets read
+#   (the version needs it); it saves building and sending the report, not
+#   the upstream round trip. On a miss the report is built from that read.
+# - the ETag also rolls over every REPORT_ETAG_TTL_SECONDS, which bounds
+#   the age of the report's "generated at" timestamp
+REPORT_CACHE_SECONDS = int(os.getenv('REPORT_CACHE_SECONDS', '60'))
+REPORT_STALE_SECONDS = int(os.getenv('REPORT_STALE_SECONDS', '300'))
+REPORT_ETAG_TTL_SECONDS = int(os.getenv('REPORT_ETAG_TTL_SECONDS', '3600'))
+
+# Bump when the report JSON changes shape, so cached copies are dropped
+REPORT_FORMAT_VERSION = 'v1'
+
+# Authorized worksheet and the last report built, reused while the instance stays warm
+_sheet_cache = {}
+_last_report = {}
+_cache_lock = threading.Lock()
+
 
 def get_jakarta_time():
     """Get current time in Jakarta timezone (UTC+7)"""
@@ -20,10 +46,15 @@ def get_jakarta_time():
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
-        """Get expense report"""
+        """Get expense report (304 Not Modified if the client has the current version)"""
         try:
-            report_data = self._generate_report()
-            self._send_json_response(report_data)
+            values = self._read_ledger()
+            etag = self._report_etag(values) if values is not None else None
+            if etag and self._etag_matches(etag):
+                self._send_not_modified(etag)
+                return
+            report_data = self._generate_report(etag, values)
+            self._send_json_response(report_data, etag=etag if report_data.get('status') == 'success' else None)
         except Exception as e:
             self._send_error_response(500, f"Error generating report: {str(e)}")
 
@@ -35,28 +66,95 @@ class handler(BaseHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         self.end_headers()
 
-    def _generate_report(self):
-        """Generate expense report from Google Sheets"""
+    def _open_sheet(self):
+        """sheet1 of the configured spreadsheet (None if Sheets is not configured)"""
+        service_account_key = os.environ.get('GOOGLE_SERVICE_ACCOUNT_KEY')
+        sheets_id = os.environ.get('GOOGLE_SHEETS_ID')
+
+        if not service_account_key or not sheets_id:
+            return None
+
+        cache_key = (sheets_id, service_account_key)
+        with _cache_lock:
+            sheet = _sheet_cache.get(cache_key)
+        if sheet is not None:
+            return sheet
+
+        # Parse credentials
+        decoded_key = base64.b64decode(service_account_key).decode('utf-8')
+        credentials_info = json.loads(decoded_key)
+
+        scope = [
+            "https://spreadsheets.google.com/feeds",
+            "https://www.googleapis.com/auth/drive"
+        ]
+
+        # Imported here so CORS preflights and configuration errors skip loading them
+        import gspread
+        from google.oauth2.service_account import Credentials
+
+        credentials = Credentials.from_service_account_info(credentials_info, scopes=scope)
+        client = gspread.authorize(credentials)
+        sheet = client.open_by_key(sheets_id).sheet1
+        with _cache_lock:
+            _sheet_cache.clear()
+            _sheet_cache[cache_key] = sheet
+        return sheet
+
+    def _read_ledger(self):
+        """All cells of the ledger (get_all_values()), or None if it can't be read"""
         try:
-            service_account_key = os.environ.get('GOOGLE_SERVICE_ACCOUNT_KEY')
-            sheets_id = os.environ.get('GOOGLE_SHEETS_ID')
+            sheet = self._open_sheet()
+            if sheet is None:
+                return None
+            return sheet.get_all_values()
+        except Exception as e:
+            print(f"Error reading ledger: {e}")
+            _sheet_cache.clear()  # re-authorize on the next call
+            return None
+
+    def _report_etag(self, values):
+        """Weak ETag for the ledger `values` and the current day"""
+        raw = '|'.join([REPORT_FORMAT_VERSION, str(DEFAULT_SAVING_TARGET),
+                        get_jakarta_time().strftime('%Y-%m-%d'),
+                        str(int(time.time() // REPORT_ETAG_TTL_SECONDS)),
+                        ledger_version(values)])
+        return 'W/"' + hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32] + '"'
 
-            if not service_account_key or not sheets_id:
-                return {"status": "error", "message": "Google Sheets not configured"}
+    def _etag_matches(self, etag):
+        """Whether If-None-Match names `etag` (weak comparison)"""
+        header = self.headers.get('If-None-Match') if self.headers else None
+        if not header:
+            return False
+        if header.strip() == '*':
+            return True
+        opaque = etag[2:] if etag.startswith('W/') else etag
+        for candidate in header.split(','):
+            candidate = candidate.strip()
+            if (candidate[2:] if candidate.startswith('W/') else candidate) == opaque:
+                return True
+        return False
 
-            # Parse credentials
-            decoded_key = base64.b64decode(service_account_key).decode('utf-8')
-            credentials_info = json.loads(decoded_key)
+    def _generate_report(self, etag=None, values=None):
+        """Generate expense report from Google Sheets
 
-            scope = [
-                "https://spreadsheets.google.com/feeds",
-                "https://www.googleapis.com/auth/drive"
-            ]
+        etag: version of the ledger (see _report_etag); a report already
+        built for it in this instance is returned as is
+        values: the ledger as already read by _read_ledger() (read here if None)
+        """
+        if etag:
+            with _cache_lock:
+                if _last_report.get('etag') == etag:
+                    return _last_report['report']
+
+        try:
+            if values is None:
+                sheet = self._open_sheet()
+                if sheet is None:
+                    return {"status": "error", "message": "Google Sheets not configured"}
+                values = sheet.get_all_values()
 
-            credentials = Credentials.from_service_account_info(credentials_info, scopes=scope)
-            client = gspread.authorize(credentials)
-            sheet = client.open_by_key(sheets_id).sheet1
-            data = sheet.get_all_records()
+            data = records_from_values(values)
 
             # Generate summary
             summary = {}
@@ -123,7 +221,7 @@ class handler(BaseHTTPRequestHandler):
             advice["saving_target"] = DEFAULT_SAVING_TARGET
             advice["available_after_saving"] = max(0, available_after_saving)
 
-            return {
+            report = {
                 "status": "success",
                 "timestamp": get_jakarta_time().isoformat(),
                 "timezone": "WIB (UTC+7)",
@@ -140,15 +238,38 @@ class handler(BaseHTTPRequestHandler):
                 "advice": advice,
                 "message": f"Report generated with {len(data)} transactions at {get_jakarta_time().strftime('%d/%m/%Y %H:%M')} WIB"
             }
+            if etag:
+                with _cache_lock:
+                    _last_report.clear()
+                    _last_report.update(etag=etag, report=report)
+            return report
 
         except Exception as e:
+            _sheet_cache.clear()  # re-authorize on the next call
             return {"status": "error", "message": f"Error: {str(e)}"}
 
-    def _send_json_response(self, data):
-        """Send JSON response"""
+    def _send_cache_headers(self, etag):
+        """ETag plus caching rules: the edge keeps the report, browsers revalidate"""
+        if not etag:
+            self.send_header('Cache-Control', 'no-store')
+            return
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', f'public, max-age=0, s-maxage={REPORT_CACHE_SECONDS}, '
+                                          f'stale-while-revalidate={REPORT_STALE_SECONDS}')
+
+    def _send_not_modified(self, etag):
+        """304 for a client that already has the current report"""
+        self.send_response(304)
+        self._send_cache_headers(etag)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+
+    def _send_json_response(self, data, etag=None):
+        """Send JSON response (cacheable when `etag` is given)"""
         self.send_response(200)
         self.send_header('Content-type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
+        self._send_cache_headers(etag)
         self.end_headers()
         self.wfile.write(json.dumps(data, ensure_ascii=False).encode('utf-8'))
 
@@ -157,6 +278,7 @@ class handler(BaseHTTPRequestHandler):
         self.send_response(code)
         self.send_header('Content-type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Cache-Control', 'no-store')
         self.end_headers()
         error_response = {
             "status": "error",
@@ -0,0 +1,179 @@
+"""
+Deadlines and circuit breaking for calls to external providers (Groq)
+
+A Deadline is created once per incoming update and passed down to every AI
+call, so the time spent waiting for LLM slots, SDK calls and HTTP fallbacks
+never exceeds what is left of the request budget (Vercel kills functions at
+30s).
+
+The CircuitBreaker tracks the outcome of recent calls. When too many of them
+fail it opens and callers go straight to their local fallback; after a
+cooldown a limited number of probe calls are let through (half-open), and the
+breaker closes again as soon as one of them succeeds.
+
+A RetryPolicy retries transient provider errors (rate limits, 5xx,
+timeouts) with capped exponential backoff, and only while the deadline still
+leaves time for another attempt. The same policy object is used by the sync
+advisor and the async one (api/async_advisor.py).
+"""
+import random
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+
+class Deadline:
+    """Absolute point in time (monotonic clock) by which work must finish"""
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """Timeout for a blocking call: what is left, but at most `cap`"""
+        remaining = self.remaining()
+        return remaining if cap is None else min(cap, remaining)
+
+
+def deadline_timeout(deadline: Optional[Deadline], cap: float) -> float:
+    """`cap`, shortened to whatever is left of `deadline` (if any)"""
+    return cap if deadline is None else deadline.timeout(cap)
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name: str, window: int = 20, failure_rate: float = 0.5, min_calls: int = 5,
+                 cooldown: float = 30.0, half_open_probes: int = 1):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.half_open_probes = half_open_probes
+
+        self._outcomes = deque(maxlen=window)  # True = success
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self.stats = {'rejected': 0, 'opened': 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a call may go to the provider now"""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                self._opened_at = time.monotonic()  # lets a lost probe be retried after a cooldown
+                return True
+            self.stats['rejected'] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                print(f"Circuit '{self.name}' closed")
+                self._state = self.CLOSED
+                self._outcomes.clear()
+                self._probes = 0
+            self._outcomes.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._current_state(now) == self.HALF_OPEN:
+                self._open(now)  # probe failed: wait another cooldown
+                return
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if (self._state == self.CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate):
+                self._open(now)
+
+    def _open(self, now: float):
+        if self._state == self.CLOSED:
+            print(f"Circuit '{self.name}' opened")
+            self.stats['opened'] += 1
+        self._state = self.OPEN
+        self._opened_at = now
+        self._probes = 0
+
+    def _current_state(self, now: float) -> str:
+        if self._state != self.CLOSED and now - self._opened_at >= self.cooldown:
+            self._state = self.HALF_OPEN
+            self._probes = 0
+        return self._state
+
+
+class RetryPolicy:
+    """Retry transient errors: at most `attempts` tries in total, sleeping
+    base_delay * 2**n (capped at max_delay, with jitter) in between"""
+
+    RETRYABLE_NAMES = ('Timeout', 'Connection', 'RateLimit', 'InternalServer')
+
+    def __init__(self, attempts: int = 2, base_delay: float = 0.5, max_delay: float = 4.0):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def retryable(self, exc: Exception) -> bool:
+        """429 / 5xx responses and connection or timeout errors"""
+        status = getattr(exc, 'status_code', None)
+        if status is None:
+            status = getattr(getattr(exc, 'response', None), 'status_code', None)
+        if isinstance(status, int):
+            return status == 429 or status >= 500
+        return any(name in type(exc).__name__ for name in self.RETRYABLE_NAMES)
+
+    def _delay(self, attempt: int, exc: Exception, deadline: Optional[Deadline]) -> Optional[float]:
+        """Seconds to wait before the next try, or None to give up"""
+        if attempt + 1 >= self.attempts or not self.retryable(exc):
+            return None
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+        if deadline is not None and deadline.remaining() < delay + 0.5:
+            return None  # no time left for the retry itself
+        return delay
+
+    def call(self, fn, deadline: Optional[Deadline] = None):
+        attempt = 0
+        while True:
+            try:
+                return fn()
+            except Exception as e:
+                delay = self._delay(attempt, e, deadline)
+                if delay is None:
+                    raise
+                print(f"Retrying after {type(e).__name__} in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+
+    async def acall(self, fn, deadline: Optional[Deadline] = None):
+        """Like call(), for a function returning an awaitable"""
+        import asyncio  # only async callers pay for importing asyncio
+
+        attempt = 0
+        while True:
+            try:
+                return await fn()
+            except Exception as e:
+                delay = self._delay(attempt, e, deadline)
+                if delay is None:
+                    raise
+                print(f"Retrying after {type(e).__name__} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
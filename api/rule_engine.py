@@ -0,0 +1,152 @@
+"""
+Rule-based financial advice (no AI provider)
+
+This is the fallback whenever Groq is disabled, failing or out of time, and
+the whole answer path in fast mode (AI_FAST_MODE=true). Everything that does
+not depend on the request is built at import time:
+
+- one compiled regex matches every category keyword in a single pass
+- the answer for each (category, verbose, with_reasoning) is a prebuilt
+  string; only the food answer has a slot for the detected amount
+
+advice_for_prompt() detects the category and amount in the prompt, which
+is all the fallback callers have at hand.
+"""
+import re
+from typing import Optional
+
+# Category keywords, highest priority first (a prompt mentioning both
+# "makanan" and "transport" is about food)
+CATEGORY_KEYWORDS = (
+    ('makanan', ('makanan',)),
+    ('transport', ('transport',)),
+    ('hiburan', ('hiburan', 'entertainment')),
+)
+
+_KEYWORD_RANKS = {keyword: (rank, category)
+                  for rank, (category, keywords) in enumerate(CATEGORY_KEYWORDS)
+                  for keyword in keywords}
+_KEYWORD_RE = re.compile('|'.join(re.escape(k) for k in _KEYWORD_RANKS), re.IGNORECASE)
+_AMOUNT_RE = re.compile(r"Rp\s*([0-9\.,]+)", re.IGNORECASE)
+
+SHORT_TIPS = {
+    'makanan': "💡 Tips: Coba meal prep untuk hemat pengeluaran makanan! Masak sendiri bisa hemat 30-50%.",
+    'transport': "💡 Tips: Pertimbangkan transportasi umum atau carpooling untuk menghemat biaya transport.",
+    'hiburan': "💡 Tips: Set budget hiburan maksimal 10% dari income bulanan ya!",
+    None: "💡 Tips: Catat pengeluaranmu dan review mingguan untuk menemukan penghematan.",
+}
+
+_HYPOTHESES = {
+    'makanan': '- Anda kemungkinan besar menghabiskan banyak untuk makanan karena kombinasi: frekuensi makan di luar, harga per porsi yang relatif tinggi, dan minimnya perencanaan (meal prep).',
+    'transport': '- Pengeluaran transport bisa tinggi karena rute panjang, penggunaan kendaraan pribadi, atau seringnya perjalanan tidak esensial.',
+    None: '- Pengeluaran besar mungkin karena beberapa pengeluaran berulang yang tidak terkontrol atau kebiasaan pembelian impulsif.',
+}
+
+# Prioritized actions with conservative estimated savings
+_ACTIONS = {
+    'makanan': (
+        '1) Kurangi frekuensi makan di luar: target -1 kali/minggu. Estimasi hemat: Rp 50.000 - Rp 150.000/bln (tergantung harga menu).',
+        '2) Meal prep 3x/minggu (siapkan bekal): estimasi hemat: Rp 200.000 - Rp 600.000/bln jika menggantikan 3 makan luar/minggu.',
+        '3) Manfaatkan promo, paket hemat, dan loyalty: hemat variatif, estimasi konservatif Rp 30.000 - Rp 150.000/bln.',
+    ),
+    'transport': (
+        '1) Gunakan transportasi umum/berbagi tumpangan minimal 2x/minggu: estimasi hemat Rp 100.000 - Rp 400.000/bln.',
+        '2) Plan rute & gabungkan trip (kurangi perjalanan tidak esensial): hemat Rp 50.000 - Rp 200.000/bln.',
+        '3) Pertimbangkan kendaraan hemat bahan bakar / sepeda jika memungkinkan: penghematan jangka menengah.',
+    ),
+    None: (
+        '1) Audit 2 minggu: catat setiap pengeluaran dan tandai 3 terbesar. Potong 1 pos non-esensial. Estimasi hemat: variatif (Rp 50.000 - Rp 500.000/bln).',
+        '2) Terapkan aturan 24 jam untuk pembelian non-esensial (tunda keputusan).',
+        '3) Atur batas bulanan untuk kategori ini dan otomatisasi transfer ke tabungan.',
+    ),
+}
+
+_PLAN_AND_KPIS = (
+    # 4-week experiment plan
+    '\n🗓️ Rencana Eksperimen 4 Minggu:',
+    'Minggu 1: Catat semua pengeluaran makanan/transport selama 7 hari. Ukur frekuensi & rata-rata biaya per kejadian.',
+    'Minggu 2: Terapkan 1 intervensi prioritas (mis. 1x pengurangan makan di luar / meal prep).',
+    'Minggu 3: Tambah intervensi kedua (promo/loyalty atau rute efisien).',
+    'Minggu 4: Review dan kuantifikasi penghematan; tetapkan target bulanan baru.',
+    # KPIs & monitoring
+    '\n📈 KPI & Monitoring:',
+    '- KPI 1: Jumlah hari makan di luar per minggu (target: turun X hari).',
+    '- KPI 2: Rata-rata biaya per makan (target: turun Y%).',
+    '- KPI 3: Total penghematan/bln (bandingkan baseline minggu 1 vs minggu 4).',
+    # Quick tracking template suggestion
+    '\n🧾 Template Tracking Singkat (copy):',
+    'Tanggal | Kategori | Deskripsi | Jumlah (Rp) | Catatan (mis. alasan pembelian)',
+)
+
+_RATIONALE = ('\n\nAlasan singkat dan prioritas:\n'
+              '1. Terapkan langkah berbiaya rendah dan langsung berpengaruh (kurangi frekuensi / meal prep).\n'
+              '2. Ukur dampak dengan eksperimen 4 minggu untuk mengetahui apa yang benar-benar bekerja.\n'
+              '3. Automasi dan batasan membuat perubahan menjadi konsisten dan terukur.')
+
+
+def _build_rich(category):
+    """(head, tail) of the detailed answer; the food answer puts the detected
+    amount between the two"""
+    actions = _ACTIONS.get(category, _ACTIONS[None])
+    head = [SHORT_TIPS[category],
+            '\n� Ringkasan & Hipotesis Penyebab:',
+            _HYPOTHESES.get(category, _HYPOTHESES[None]),
+            '\n✅ Rekomendasi Prioritas (urut berdasarkan dampak cepat):']
+    head.extend(actions)
+    return '\n'.join(head), '\n' + '\n'.join(_PLAN_AND_KPIS) + _RATIONALE
+
+
+def _build_templates():
+    templates = {}
+    for category in SHORT_TIPS:
+        rich = _build_rich(category)
+        for verbose in (False, True):
+            for with_reasoning in (False, True):
+                detailed = verbose or with_reasoning
+                templates[(category, verbose, with_reasoning)] = rich if detailed else (SHORT_TIPS[category], None)
+    return templates
+
+
+# (category, verbose, with_reasoning) -> (text, tail); tail is None for short answers
+TEMPLATES = _build_templates()
+
+
+def detect_category(text: str) -> Optional[str]:
+    """Highest-priority category keyword mentioned in `text`, or None"""
+    best = None
+    for match in _KEYWORD_RE.finditer(text):
+        rank, category = _KEYWORD_RANKS[match.group(0).lower()]
+        if rank == 0:
+            return category
+        if best is None or rank < best[0]:
+            best = (rank, category)
+    return best[1] if best else None
+
+
+def detect_amount(text: str) -> Optional[int]:
+    """First "Rp <number>" amount in `text`, or None"""
+    match = _AMOUNT_RE.search(text)
+    if not match:
+        return None
+    try:
+        return int(match.group(1).replace('.', '').replace(',', ''))
+    except ValueError:
+        return None
+
+
+def advice_for_prompt(prompt: str, verbose: bool = False, with_reasoning: bool = False) -> str:
+    """Rule-based advice for a free-text prompt.
+
+    verbose or with_reasoning give the detailed answer (hypothesis, ranked
+    actions, a 4-week plan, KPIs and a short rationale); the detailed food
+    answer quotes the first "Rp" amount in the prompt. Prompts without a
+    known category get the generic answer.
+    """
+    category = detect_category(prompt)
+    text, tail = TEMPLATES[(category, bool(verbose), bool(with_reasoning))]
+    if tail is None:
+        return text
+    amount = detect_amount(prompt) if category == 'makanan' else None
+    if amount:
+        return f"{text}\n(Referensi transaksi yang terdeteksi: Rp {amount:,}){tail}"
+    return text + tail
@@ -0,0 +1,191 @@
+"""
+Offline semantic cache for chat_with_user
+
+Questions are compared with character n-gram TF-IDF vectors (3-5 chars of
+each word, no network models), which absorbs typos, word order and small
+rephrasings such as "berapa saldo saya?" / "saldo saya berapa". Common
+synonyms are folded first ("kenapa makan saya boros" / "kenapa pengeluaran
+makanan tinggi?"). Answers are only reused within a scope (user and memory),
+and never across questions that mention different numbers ("nabung 1 juta"
+vs "nabung 5 juta"). Follow-ups ("jelaskan lebih detail") depend on the
+turns before them, so chat skips the cache for those (is_follow_up).
+
+Entries are kept in memory per process (at most MAX_SCOPES scopes) and
+persisted through the session store, so a cold process can reload a user's
+scope with one query. Persisted rows are capped per scope and in total.
+"""
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Optional
+
+NGRAM_RANGE = (3, 5)
+MAX_ENTRIES_PER_SCOPE = 200
+MAX_SCOPES = 1000
+MAX_STORED_ANSWERS = 20000
+
+# How many adds between two prunes of the persisted answers
+PRUNE_EVERY_ADDS = 100
+
+# Messages this short, or with one of these words, lean on earlier turns
+MIN_QUESTION_WORDS = 3
+FOLLOW_UP_WORDS = {'itu', 'tadi', 'tersebut', 'gitu', 'begitu', 'sebelumnya', 'jelaskan', 'detail',
+                   'lanjut', 'lanjutkan', 'maksudnya', 'contohnya'}
+
+_NON_WORD = re.compile(r'[^\w\s]')
+_NUMBER = re.compile(r'\d+(?:[.,]\d+)*')
+
+# Word -> canonical form before comparing; '' drops filler words
+SYNONYMS = {
+    'makan': 'makanan', 'jajan': 'makanan', 'kuliner': 'makanan',
+    'transportasi': 'transport', 'entertainment': 'hiburan',
+    'tinggi': 'boros', 'besar': 'boros', 'mahal': 'boros', 'bengkak': 'boros',
+    'mengapa': 'kenapa', 'knp': 'kenapa',
+    'saya': '', 'aku': '', 'gue': '', 'gw': '', 'sih': '', 'dong': '', 'ya': '',
+}
+
+# "pengeluaran makanan" asks about the same thing as "makanan"
+SPENDING_WORDS = {'pengeluaran', 'biaya', 'spending'}
+CATEGORY_WORDS = {'makanan', 'transport', 'hiburan', 'belanja', 'tagihan', 'kesehatan', 'pendidikan'}
+
+
+def normalize_question(text: str) -> str:
+    return ' '.join(_NON_WORD.sub(' ', (text or '').lower()).split())
+
+
+def canonical_words(text: str) -> list:
+    words = [w for w in (SYNONYMS.get(w, w) for w in normalize_question(text).split()) if w]
+    return [w for i, w in enumerate(words)
+            if not (w in SPENDING_WORDS and i + 1 < len(words) and words[i + 1] in CATEGORY_WORDS)]
+
+
+def is_follow_up(text: str) -> bool:
+    """Whether `text` only makes sense with the conversation before it"""
+    words = normalize_question(text).split()
+    return len(words) < MIN_QUESTION_WORDS or any(w in FOLLOW_UP_WORDS for w in words)
+
+
+def char_ngrams(text: str) -> Counter:
+    grams = Counter()
+    for word in canonical_words(text):
+        padded = f" {word} "
+        for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+            for i in range(len(padded) - n + 1):
+                grams[padded[i:i + n]] += 1
+    return grams
+
+
+class _Scope:
+    """TF-IDF index over the questions cached for one scope"""
+
+    def __init__(self):
+        self.entries = []   # dicts: question, grams, numbers, answer, ts
+        self.df = Counter()
+        self.loaded = False
+
+    def add(self, question: str, answer: str, ts: float):
+        grams = char_ngrams(question)
+        self.entries.append({'question': question, 'grams': grams, 'answer': answer, 'ts': ts,
+                             'numbers': _NUMBER.findall(question)})
+        self.df.update(grams.keys())
+        if len(self.entries) > MAX_ENTRIES_PER_SCOPE:
+            self.df.subtract(self.entries.pop(0)['grams'].keys())
+
+    def vector(self, grams: Counter) -> Dict[str, float]:
+        n = len(self.entries)
+        vec = {g: (1 + math.log(tf)) * (math.log((1 + n) / (1 + self.df.get(g, 0))) + 1)
+               for g, tf in grams.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return {g: v / norm for g, v in vec.items()}
+
+
+class SemanticCache:
+    def __init__(self, threshold: float = 0.75, ttl: float = 24 * 3600, store=None):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.store = store  # SessionStore (or None for memory only)
+        self._scopes: Dict[str, _Scope] = OrderedDict()
+        self._adds = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def lookup(self, scope: str, question: str) -> Optional[str]:
+        """Answer cached for a similar question in `scope`, or None"""
+        now = time.time()
+        grams = char_ngrams(question)
+        numbers = _NUMBER.findall(question)
+        with self._lock:
+            index = self._scope(scope)
+            query = index.vector(grams)
+            best, best_score = None, 0.0
+            for entry in index.entries:
+                if now - entry['ts'] > self.ttl or entry['numbers'] != numbers:
+                    continue
+                candidate = index.vector(entry['grams'])
+                score = sum(w * candidate.get(g, 0.0) for g, w in query.items())
+                if score > best_score:
+                    best, best_score = entry, score
+
+            if best is not None and best_score >= self.threshold:
+                self.stats['hits'] += 1
+                return best['answer']
+            self.stats['misses'] += 1
+            return None
+
+    def add(self, scope: str, question: str, answer: str):
+        if not normalize_question(question) or not answer:
+            return
+        now = time.time()
+        with self._lock:
+            self._scope(scope).add(question, answer, now)
+            self._adds += 1
+            prune = self._adds % PRUNE_EVERY_ADDS == 0
+        if self.store is not None:
+            try:
+                self.store.add_cached_answer(scope, question, answer, now)
+                if prune:
+                    self.store.prune_cached_answers(before=now - self.ttl, max_rows=MAX_STORED_ANSWERS)
+            except Exception as e:
+                print(f"Semantic cache persist error: {e}")
+
+    def _scope(self, scope: str) -> _Scope:
+        """In-memory index for `scope`, loaded from the store on first use"""
+        index = self._scopes.get(scope)
+        if index is None:
+            index = self._scopes[scope] = _Scope()
+            while len(self._scopes) > MAX_SCOPES:
+                self._scopes.popitem(last=False)
+        self._scopes.move_to_end(scope)
+        if not index.loaded:
+            index.loaded = True
+            if self.store is not None:
+                try:
+                    rows = self.store.cached_answers(scope, since=time.time() - self.ttl,
+                                                     limit=MAX_ENTRIES_PER_SCOPE)
+                except Exception as e:
+                    print(f"Semantic cache load error: {e}")
+                    rows = []
+                for question, answer, ts in rows:
+                    index.add(question, answer, ts)
+        return index
+
+
+_semantic_cache = None
+_semantic_lock = threading.Lock()
+
+
+def get_semantic_cache() -> SemanticCache:
+    """Process-wide semantic cache persisted in the chat session database"""
+    global _semantic_cache
+    with _semantic_lock:
+        if _semantic_cache is None:
+            from api.session_store import get_session_store
+            _semantic_cache = SemanticCache(
+                threshold=float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.75')),
+                ttl=float(os.getenv('SEMANTIC_CACHE_TTL_SECONDS', str(24 * 3600))),
+                store=get_session_store(),
+            )
+        return _semantic_cache
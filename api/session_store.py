@@ -0,0 +1,270 @@
+"""
+Chat session store for FinancialAdvisor.chat_with_user
+
+Sessions live in a SQLite database (.cache/chat_sessions.db) in WAL mode:
+one row per message plus one row per user for the memory summary. A chat turn
+appends two rows and trims the user's history by id inside one transaction,
+so concurrent workers never overwrite each other's turns and per-turn I/O does
+not grow with the history length.
+
+The sessions row also carries the rolling conversation summary
+(`summary`, covering every message up to `summarized_through`) and the hash
+of the ledger the memory was built from (`memory_version`).
+
+Legacy .cache/chat_sessions/<user>.json files are imported the first time a
+user is loaded.
+"""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+DEFAULT_DB_PATH = Path('.cache') / 'chat_sessions.db'
+LEGACY_SESSION_DIR = Path('.cache') / 'chat_sessions'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    user_id TEXT PRIMARY KEY,
+    memory TEXT NOT NULL DEFAULT '',
+    updated REAL NOT NULL,
+    memory_version TEXT NOT NULL DEFAULT '',
+    summary TEXT NOT NULL DEFAULT '',
+    summarized_through INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_user_id ON messages (user_id, id);
+CREATE TABLE IF NOT EXISTS semantic_cache (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scope TEXT NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS semantic_cache_scope ON semantic_cache (scope, id);
+"""
+
+# Columns added to `sessions` after the first release (migrated on connect)
+SESSION_COLUMNS = {
+    'memory_version': "TEXT NOT NULL DEFAULT ''",
+    'summary': "TEXT NOT NULL DEFAULT ''",
+    'summarized_through': 'INTEGER NOT NULL DEFAULT 0',
+}
+
+# Session fields append() may update besides the messages
+SESSION_FIELDS = ('memory',) + tuple(SESSION_COLUMNS)
+
+
+class SessionStore:
+    def __init__(self, path=DEFAULT_DB_PATH, max_messages: int = 16, legacy_dir=LEGACY_SESSION_DIR):
+        self.path = Path(path)
+        self.max_messages = max_messages
+        self.max_cached_answers = 200
+        self.legacy_dir = Path(legacy_dir) if legacy_dir else None
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections are not shareable)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(SCHEMA)
+                    existing = {row[1] for row in conn.execute('PRAGMA table_info(sessions)')}
+                    for column, definition in SESSION_COLUMNS.items():
+                        if column not in existing:
+                            conn.execute(f'ALTER TABLE sessions ADD COLUMN {column} {definition}')
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+    def load(self, user_id: str, limit: Optional[int] = None) -> Dict:
+        """Return the session for `user_id`:
+
+        {'memory', 'memory_version', 'summary', 'summarized_through',
+         'messages': [{'role', 'content'}, ...] (oldest first, only those not
+         yet folded into the summary), 'message_ids': [...]}
+        """
+        conn = self._connect()
+        query = 'SELECT memory, memory_version, summary, summarized_through FROM sessions WHERE user_id = ?'
+        row = conn.execute(query, (user_id,)).fetchone()
+        if row is None:
+            if not self._import_legacy(conn, user_id):
+                return {'messages': [], 'message_ids': [], 'memory': '', 'memory_version': '',
+                        'summary': '', 'summarized_through': 0}
+            row = conn.execute(query, (user_id,)).fetchone()
+
+        memory, memory_version, summary, summarized_through = row
+        rows = conn.execute(
+            'SELECT id, role, content FROM messages WHERE user_id = ? AND id > ? ORDER BY id DESC LIMIT ?',
+            (user_id, summarized_through, limit or self.max_messages),
+        ).fetchall()
+        rows.reverse()
+        return {
+            'messages': [{'role': role, 'content': content} for _, role, content in rows],
+            'message_ids': [message_id for message_id, _, _ in rows],
+            'memory': memory,
+            'memory_version': memory_version,
+            'summary': summary,
+            'summarized_through': summarized_through,
+        }
+
+    def append(self, user_id: str, messages: List[Dict], memory: Optional[str] = None, **fields):
+        """Append messages atomically, then trim the user's history to the
+        newest max_messages rows. `memory` and the other SESSION_FIELDS
+        (memory_version, summary, summarized_through) are updated when given."""
+        if memory is not None:
+            fields['memory'] = memory
+        unknown = set(fields) - set(SESSION_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown session fields: {sorted(unknown)}")
+
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._upsert_session(conn, user_id, fields, now)
+            conn.executemany(
+                'INSERT INTO messages (user_id, role, content, ts) VALUES (?, ?, ?, ?)',
+                [(user_id, m.get('role', 'user'), m.get('content', ''), now) for m in messages],
+            )
+            self._trim(conn, user_id)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def set_memory(self, user_id: str, memory: str):
+        self.append(user_id, [], memory=memory)
+
+    def clear(self, user_id: str):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM messages WHERE user_id = ?', (user_id,))
+            conn.execute('DELETE FROM sessions WHERE user_id = ?', (user_id,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    # ---------------------------
+    # Semantic cache persistence (see api/semantic_cache.py)
+    # ---------------------------
+    def cached_answers(self, scope: str, since: float, limit: int):
+        """(question, answer, ts) rows for `scope` newer than `since`, oldest first"""
+        rows = self._connect().execute(
+            'SELECT question, answer, ts FROM semantic_cache WHERE scope = ? AND ts >= ? '
+            'ORDER BY id DESC LIMIT ?',
+            (scope, since, limit),
+        ).fetchall()
+        return list(reversed(rows))
+
+    def add_cached_answer(self, scope: str, question: str, answer: str, ts: float = None):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('INSERT INTO semantic_cache (scope, question, answer, ts) VALUES (?, ?, ?, ?)',
+                         (scope, question, answer, ts or time.time()))
+            conn.execute(
+                'DELETE FROM semantic_cache WHERE scope = ? AND id <= ('
+                ' SELECT id FROM semantic_cache WHERE scope = ? ORDER BY id DESC LIMIT 1 OFFSET ?)',
+                (scope, scope, self.max_cached_answers),
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def prune_cached_answers(self, before: float, max_rows: int):
+        """Drop answers older than `before`, then all but the newest `max_rows`"""
+        conn = self._connect()
+        conn.execute('DELETE FROM semantic_cache WHERE ts < ?', (before,))
+        conn.execute(
+            'DELETE FROM semantic_cache WHERE id <= ('
+            ' SELECT id FROM semantic_cache ORDER BY id DESC LIMIT 1 OFFSET ?)',
+            (max_rows,),
+        )
+
+    # ---------------------------
+    # Internals
+    # ---------------------------
+    def _upsert_session(self, conn, user_id, fields, now):
+        # Column names come from SESSION_FIELDS only, never from callers
+        columns = ['updated'] + [name for name in SESSION_FIELDS if fields.get(name) is not None]
+        values = [now] + [fields[name] for name in columns[1:]]
+        conn.execute(
+            f"INSERT INTO sessions (user_id, {', '.join(columns)}) VALUES (?{', ?' * len(columns)}) "
+            f"ON CONFLICT(user_id) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in columns)}",
+            [user_id] + values,
+        )
+
+    def _trim(self, conn, user_id):
+        conn.execute(
+            'DELETE FROM messages WHERE user_id = ? AND id <= ('
+            ' SELECT id FROM messages WHERE user_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)',
+            (user_id, user_id, self.max_messages),
+        )
+
+    def _import_legacy(self, conn, user_id) -> bool:
+        """Import a pre-SQLite JSON session file if one exists"""
+        if self.legacy_dir is None:
+            return False
+        legacy_file = self.legacy_dir / f"{user_id}.json"
+        try:
+            session = json.loads(legacy_file.read_text())
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"Skipping unreadable legacy session {legacy_file}: {e}")
+            return False
+
+        messages = session.get('messages', [])[-self.max_messages:]
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Another worker may have imported it while we were reading
+            if conn.execute('SELECT 1 FROM sessions WHERE user_id = ?', (user_id,)).fetchone() is None:
+                self._upsert_session(conn, user_id, {'memory': session.get('memory', '') or ''}, now)
+                conn.executemany(
+                    'INSERT INTO messages (user_id, role, content, ts) VALUES (?, ?, ?, ?)',
+                    [(user_id, m.get('role', 'user'), m.get('content', ''), now) for m in messages],
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        try:
+            legacy_file.rename(legacy_file.with_suffix('.json.imported'))
+        except Exception:
+            pass
+        return True
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Process-wide session store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SessionStore()
+        return _store
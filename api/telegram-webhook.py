@@ -1,31 +1,180 @@
 import json
 import os
 import base64
+import hashlib
+import importlib.util
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime, timezone, timedelta
 from http.server import BaseHTTPRequestHandler
-import gspread
-from google.oauth2.service_account import Credentials
-import requests
-
-# Load environment variables from .env file
-from dotenv import load_dotenv
-load_dotenv()
-
-# Import AI integration
-try:
-    from api.financial_advisor import FinancialAdvisor
-    AI_ENABLED = True
-except ImportError:
-    AI_ENABLED = False
+
+# Heavy dependencies (gspread, google-auth, the AI module and its HTTP
+# clients) are imported on first use, so health checks and commands that
+# never touch the sheet or the LLM start faster on a cold Vercel instance.
+
+# Load environment variables from .env file (local runs only; on Vercel,
+# where VERCEL is set, they come from the project settings)
+if not os.getenv('VERCEL'):
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+from api.telegram_sender import get_scheduler
+from api.resilience import Deadline, deadline_timeout
+from api.warmup import get_speculative_warmup
+
+# How long a request waits for its queued Telegram call to go out
+TELEGRAM_SEND_TIMEOUT = float(os.getenv('TELEGRAM_SEND_TIMEOUT', '20'))
+
+# Time budget for handling one update, passed down to every AI call
+# (Vercel stops the function at 30s)
+REQUEST_DEADLINE_SECONDS = float(os.getenv('REQUEST_DEADLINE_SECONDS', '25'))
+
+# Part of that budget kept for delivering the final reply: the AI calls
+# get REQUEST_DEADLINE_SECONDS minus this, and no Telegram send waits past
+# the request deadline
+REPLY_RESERVE_SECONDS = float(os.getenv('REPLY_RESERVE_SECONDS', '3'))
+
+# /advice and /budget answers are reused until a write changes the figures
+# they are built from (_analysis_cache_key); the TTL bounds how long one
+# answer is kept
+LEDGER_ANALYSIS_TTL = float(os.getenv('LEDGER_ANALYSIS_TTL_SECONDS', '21600'))
+
+# Time budget for one speculative /advice warm-up (see api/warmup.py)
+WARMUP_DEADLINE_SECONDS = float(os.getenv('SPECULATIVE_WARMUP_DEADLINE', '20'))
+
+# AI integration (api.financial_advisor is only located here, and imported
+# by the first AI path that runs)
+AI_ENABLED = importlib.util.find_spec('api.financial_advisor') is not None
+if not AI_ENABLED:
     print("AI integration not available, using standard responses")
 
+
+def get_financial_advisor():
+    """The process-wide FinancialAdvisor, importing the AI module on first use.
+
+    Settings are parsed once per process; tests swap or drop the instance
+    with api.financial_advisor.set_advisor() / reload_settings().
+    """
+    from api.financial_advisor import get_advisor
+    return get_advisor()
+
 # Jakarta timezone (UTC+7)
 JAKARTA_TZ = timezone(timedelta(hours=7))
 
+# Authorized Google Sheets worksheet, reused while the process stays warm
+_sheet_cache = {}
+_sheet_lock = threading.Lock()
+
+# Caps concurrent Sheets API calls when several updates are processed in
+# parallel (self-hosted server); Vercel runs one request per process anyway
+SHEETS_SLOTS = threading.BoundedSemaphore(int(os.getenv('SHEETS_MAX_CONCURRENCY', '4')))
+
+# Independent stages of an expense reply (balance refresh, daily pattern,
+# AI tip, personalized advice) run concurrently on a shared pool; the whole
+# reply has to be ready within EXPENSE_REPLY_DEADLINE seconds
+EXPENSE_REPLY_DEADLINE = float(os.getenv('EXPENSE_REPLY_DEADLINE', '12'))
+_stage_executor = None
+_stage_executor_lock = threading.Lock()
+
+
+def get_stage_executor():
+    """Bounded thread pool for the I/O stages of a single reply"""
+    global _stage_executor
+    with _stage_executor_lock:
+        if _stage_executor is None:
+            workers = int(os.getenv('EXPENSE_STAGE_WORKERS', '8'))
+            _stage_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='catatuang-stage')
+        return _stage_executor
+
+
+def stage_result(future, deadline, label, default=None):
+    """Result of a stage future, or `default` if it failed or missed the deadline"""
+    if future is None:
+        return default
+    try:
+        return future.result(timeout=deadline.remaining())
+    except FutureTimeoutError:
+        print(f"{label} missed the reply deadline")
+    except Exception as e:
+        print(f"{label} error: {e}")
+    return default
+
 def get_jakarta_time():
     """Get current time in Jakarta timezone (UTC+7)"""
     return datetime.now(JAKARTA_TZ)
 
+
+# Footer appended to placeholder replies while the AI section is still running
+AI_PENDING_FOOTER = "\n\n⏳ _Menyiapkan saran AI..._"
+
+# Streamed AI answers edit the placeholder at most once per interval
+# (Telegram allows about one message per second per chat)
+STREAM_EDIT_INTERVAL = float(os.getenv('STREAM_EDIT_INTERVAL', '1.0'))
+AI_STREAMING_FOOTER = "\n\n✍️ _AI sedang menulis..._"
+
+
+def progressive_replies_enabled():
+    """Whether slow replies should be sent early and edited in place"""
+    return os.getenv('PROGRESSIVE_REPLIES', 'true').lower() == 'true'
+
+
+def throttled_stream(progress):
+    """Adapt `progress` into an advisor on_update callback that shows the
+    partial AI text, at most once per STREAM_EDIT_INTERVAL seconds. The
+    complete answer is delivered by ProgressiveReply.finish()."""
+    if progress is None:
+        return None
+    last_update = [0.0]
+
+    def on_update(partial_text):
+        now = time.monotonic()
+        if now - last_update[0] < STREAM_EDIT_INTERVAL:
+            return
+        last_update[0] = now
+        progress(partial_text + AI_STREAMING_FOOTER)
+
+    return on_update
+
+
+class ProgressiveReply:
+    """A Telegram reply that is sent as soon as a first draft exists and
+    edited in place (editMessageText) as the remaining work completes."""
+
+    def __init__(self, bot, chat_id, deadline=None):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.deadline = deadline
+        self.message_id = None
+        self.last_text = None
+
+    def update(self, text):
+        """Show an intermediate version of the reply"""
+        if not text or text == self.last_text:
+            return
+        if self.message_id is None:
+            self.message_id = self.bot._send_telegram_message(self.chat_id, text, return_message_id=True,
+                                                              deadline=self.deadline)
+            if not self.message_id:
+                return
+        else:
+            # Intermediate edits don't block the work that produces the next one
+            self.bot._edit_telegram_message(self.chat_id, self.message_id, text, wait=False)
+        self.last_text = text
+
+    def finish(self, text):
+        """Deliver the final reply, editing the placeholder if one was sent"""
+        if self.message_id is None:
+            return self.bot._send_telegram_message(self.chat_id, text, deadline=self.deadline)
+        if text == self.last_text:
+            return True
+        self.last_text = text
+        return self.bot._edit_telegram_message(self.chat_id, self.message_id, text, deadline=self.deadline)
+
+
 class handler(BaseHTTPRequestHandler):
     # Class attribute for AI provider
     selected_provider = 'groq' if AI_ENABLED else None
@@ -70,14 +219,26 @@ class handler(BaseHTTPRequestHandler):
                 text = message.get('text', '')
                 
                 if text:
+                    reply_deadline = Deadline(REQUEST_DEADLINE_SECONDS)
+                    deadline = Deadline(max(0.0, REQUEST_DEADLINE_SECONDS - REPLY_RESERVE_SECONDS))
+
+                    # Slow (AI) flows send a placeholder first and edit it when done
+                    reply = ProgressiveReply(self, chat_id, deadline=reply_deadline)
+                    progress = reply.update if progressive_replies_enabled() else None
+
                     # Process the message
                     if text.startswith('/'):
-                        result = self._process_command(text, chat_id, username, first_name, user_id)
+                        result = self._process_command(text, chat_id, username, first_name, user_id,
+                                                       progress=progress, deadline=deadline)
                     else:
-                        result = self._process_expense_message(text, f"{username}_{user_id}")
+                        result = self._process_expense_message(text, f"{username}_{user_id}",
+                                                               progress=progress, deadline=deadline)
                     
                     # Send reply to Telegram
-                    self._send_telegram_message(chat_id, result)
+                    reply.finish(result)
+
+                    # If this update wrote to the ledger, precompute the likely /advice
+                    self._warm_up_advice(f"{username}_{user_id}")
                     
                     return {
                         "status": "success",
@@ -90,8 +251,13 @@ class handler(BaseHTTPRequestHandler):
         except Exception as e:
             return {"status": "error", "message": f"Processing error: {str(e)}"}
 
-    def _process_command(self, text, chat_id, username, first_name, user_id=None):
-        """Process Telegram bot commands"""
+    def _process_command(self, text, chat_id, username, first_name, user_id=None, progress=None, deadline=None):
+        """Process Telegram bot commands.
+
+        progress: optional callable receiving a draft reply for AI commands
+        (see ProgressiveReply)
+        deadline: optional api.resilience.Deadline bounding the AI calls
+        """
         try:
             command = text.lower().split()[0]
             
@@ -248,22 +414,23 @@ class handler(BaseHTTPRequestHandler):
 
             # AI Commands (if enabled)
             elif command == '/tips' and AI_ENABLED:
-                return self._get_ai_tips()
+                return self._get_ai_tips(f"{username}_{user_id}", deadline=deadline)
                 
             elif command == '/advice' and AI_ENABLED:
-                return self._get_ai_advice(f"{username}_{user_id}")
+                return self._get_ai_advice(f"{username}_{user_id}", progress=progress, deadline=deadline)
                 
             elif command == '/budget' and AI_ENABLED:
                 args = text.split()[1:] if len(text.split()) > 1 else []
                 monthly_income = float(args[0]) if args else None
-                return self._get_ai_budget(f"{username}_{user_id}", monthly_income)
+                return self._get_ai_budget(f"{username}_{user_id}", monthly_income, progress=progress, deadline=deadline)
                 
             elif command == '/goals' and AI_ENABLED:
                 args = text.split()[1:] if len(text.split()) > 1 else []
                 if len(args) >= 2:
                     goal_amount = float(args[0])
                     goal_desc = ' '.join(args[1:])
-                    return self._set_financial_goal(f"{username}_{user_id}", goal_amount, goal_desc)
+                    return self._set_financial_goal(f"{username}_{user_id}", goal_amount, goal_desc,
+                                                    progress=progress, deadline=deadline)
                 else:
                     return self._show_goals_help()
                     
@@ -272,7 +439,8 @@ class handler(BaseHTTPRequestHandler):
                 if len(args) >= 2:
                     budget_amount = float(args[0])
                     duration_days = int(args[1])
-                    return self._check_budget_feasibility(f"{username}_{user_id}", budget_amount, duration_days)
+                    return self._check_budget_feasibility(f"{username}_{user_id}", budget_amount, duration_days,
+                                                          deadline=deadline)
                 else:
                     return self._show_budgetcheck_help()
                     
@@ -280,7 +448,7 @@ class handler(BaseHTTPRequestHandler):
                 args = text.split()[1:] if len(text.split()) > 1 else []
                 if args:
                     daily_budget = float(args[0])
-                    return self._get_daily_spending_plan(daily_budget)
+                    return self._get_daily_spending_plan(daily_budget, deadline=deadline)
                 else:
                     return self._show_dailyplan_help()
                     
@@ -346,134 +514,249 @@ class handler(BaseHTTPRequestHandler):
         except Exception as e:
             return f"❌ Error processing command: {str(e)}"
 
-    def _process_expense_message(self, text, user_id):
-        """Process expense/income message and save to Google Sheets"""
-        try:
-            # Parse message: amount category description
-            parts = text.strip().split(' ', 2)
-
-            if len(parts) < 2:
-                return ("❌ Format salah!\n\n✅ Contoh yang benar:\n"
-                        "• `50000 makanan nasi padang`\n"
-                        "• `+1000000 gaji salary`\n\nKetik /help untuk panduan lengkap.")
-
-            amount_str = parts[0]
-            kategori_input = parts[1].lower()
-            deskripsi = parts[2] if len(parts) > 2 else ""
+    def _process_expense_message(self, text, user_id, progress=None, deadline=None):
+        """Process expense/income message and save to Google Sheets.
 
-            # Standardize category with fuzzy matching
-            kategori = self._standardize_category(kategori_input)
-            suggestion_text = self._get_category_suggestion(kategori_input, kategori)
-
-            # Parse amount (check for income with + prefix)
-            is_income = amount_str.startswith('+')
-            if is_income:
-                amount_str = amount_str[1:]  # Remove + prefix
-
-            try:
-                amount = int(amount_str.replace(',', '').replace('.', ''))
-            except ValueError:
-                return "❌ Jumlah harus berupa angka!\n\n✅ Contoh: `50000 makanan nasi padang`"
+        progress: optional callable receiving the saved transaction and
+        balance while the AI tips are still being generated
+        deadline: optional request Deadline; the reply stages never run past it
+        """
+        try:
+            entry = self._parse_expense_text(text)
+            if isinstance(entry, str):
+                return entry  # validation error message
 
-            if amount <= 0:
-                return "❌ Jumlah harus lebih dari 0!"
+            amount = entry['amount']
+            kategori = entry['kategori']
+            deskripsi = entry['deskripsi']
+            suggestion_text = entry['suggestion_text']
 
             # Get Jakarta time for the transaction
             jakarta_time = get_jakarta_time()
 
             # Save to Google Sheets
-            success = self._save_to_sheets({
-                'tanggal': jakarta_time.strftime('%Y-%m-%d %H:%M:%S'),
-                'kategori': kategori,
-                'deskripsi': deskripsi,
-                'jumlah': amount if is_income else -amount,  # Negative for expenses
-                'sumber': f"telegram_{user_id}",
-                'tipe': 'pemasukan' if is_income else 'pengeluaran'
-            })
+            success = self._save_to_sheets(self._build_sheet_record(entry, user_id, jakarta_time))
 
             if success:
+                get_speculative_warmup().note_write(user_id)
+                reply_deadline = Deadline(EXPENSE_REPLY_DEADLINE)
+                if deadline is not None and deadline.expires_at < reply_deadline.expires_at:
+                    reply_deadline = deadline
+                executor = get_stage_executor()
+                ai_wanted = AI_ENABLED and os.getenv('AI_INSIGHTS_ENABLED', 'true').lower() == 'true'
+
+                # Balance and daily pattern both read the sheet; start them together
+                user_data_future = executor.submit(self._get_user_financial_data, user_id)
+                pattern_future = executor.submit(self._calculate_daily_spending_pattern, user_id) if ai_wanted else None
+
                 # Hitung saldo user setelah transaksi ini
-                user_data = self._get_user_financial_data(user_id)
-                total_income = user_data.get("total_income", 0)
-                total_expense = user_data.get("total_expense", 0)
-                balance = total_income - total_expense
+                user_data = stage_result(user_data_future, reply_deadline, "Balance refresh")
+                if user_data is None:
+                    saldo_info, available_after_saving = "", 0
+                    ai_wanted = False
+                else:
+                    saldo_info, available_after_saving = self._format_balance_info(user_data)
 
-                saving_target = 1_000_000
-                available_after_saving = max(0, balance - saving_target)
+                # Deterministic part of the reply (also used as the fallback)
+                tipe_emoji = "💰" if entry['is_income'] else "💸"
+                tipe_text = "Pemasukan" if entry['is_income'] else "Pengeluaran"
+                formatted_amount = f"Rp {amount:,}".replace(',', '.')
 
-                # Build saldo info message
-                saldo_info = (
-                    f"\n\n📊 Saldo Saat Ini: Rp {balance:,}".replace(",", ".") +
-                    f"\n💎 Tabungan (default): Rp {saving_target:,}".replace(",", ".") +
-                    f"\n💵 Bisa Dipakai: Rp {available_after_saving:,}".replace(",", ".")
-                )
+                standard_response = (f"""{tipe_emoji} **{tipe_text} Tercatat!**
+
+💵 Jumlah: {formatted_amount}
+📂 Kategori: {kategori.title()}
+📝 Deskripsi: {deskripsi}
+📅 Waktu: {jakarta_time.strftime('%d/%m/%Y %H:%M')} WIB
+
+✅ Data tersimpan di Google Sheets!{saldo_info}""")
 
                 # Use AI-enhanced response if available
-                if AI_ENABLED and os.getenv('AI_INSIGHTS_ENABLED', 'true').lower() == 'true':
-                    try:
-                        advisor = FinancialAdvisor()
-                        
-                        # Get transaction advice
-                        ai_tip = advisor.get_transaction_advice(
+                if ai_wanted:
+                    # The LLM tip only needs user_data, so it starts right away
+                    ai_tip_future = executor.submit(
+                        lambda: get_financial_advisor().get_transaction_advice(
                             amount=amount,
                             category=kategori,
                             description=deskripsi,
-                            user_data=user_data
+                            user_data=user_data,
+                            deadline=reply_deadline
                         )
-                        
-                        # Get personalized advice based on spending patterns and remaining balance
-                        daily_spending_pattern = self._calculate_daily_spending_pattern(user_id)
+                    )
+                    if progress:
+                        progress(standard_response + suggestion_text + AI_PENDING_FOOTER)
+
+                    # Personalized advice based on spending patterns and remaining balance
+                    personalized_future = None
+                    daily_spending_pattern = stage_result(pattern_future, reply_deadline, "Daily pattern")
+                    if daily_spending_pattern is not None:
                         remaining_days = self._get_remaining_days_in_month()
                         daily_budget = self._calculate_daily_budget(available_after_saving, remaining_days)
-                        
-                        personalized_advice = self._generate_personalized_advice(
+                        personalized_future = executor.submit(
+                            self._generate_personalized_advice,
                             amount=amount,
                             category=kategori,
                             user_data=user_data,
                             daily_spending_pattern=daily_spending_pattern,
                             daily_budget=daily_budget,
-                            remaining_days=remaining_days
+                            remaining_days=remaining_days,
+                            deadline=reply_deadline
                         )
 
-                        tipe_emoji = "💰" if is_income else "💸"
-                        tipe_text = "Pemasukan" if is_income else "Pengeluaran"
-                        formatted_amount = f"Rp {amount:,}".replace(',', '.')
+                    # Whatever finished in time goes into the reply
+                    sections = [standard_response]
+                    for future, label in ((ai_tip_future, "AI tip"), (personalized_future, "Personalized advice")):
+                        section = stage_result(future, reply_deadline, label)
+                        if section:
+                            sections.append(section)
+                    return "\n\n".join(sections) + suggestion_text
+
+                # Standard response (fallback)
+                return f"{standard_response}{suggestion_text}"
+            else:
+                return "❌ Gagal menyimpan data. Coba lagi dalam beberapa saat."
 
-                        return (f"""{tipe_emoji} **{tipe_text} Tercatat!**
+        except Exception as e:
+            return f"❌ Error: {str(e)}\n\nKetik /help untuk format yang benar."
 
-💵 Jumlah: {formatted_amount}
-📂 Kategori: {kategori.title()}
-📝 Deskripsi: {deskripsi}
-📅 Waktu: {jakarta_time.strftime('%d/%m/%Y %H:%M')} WIB
+    def _process_expense_batch(self, texts, user_id):
+        """Record several expense/income messages from the same user at once.
 
-✅ Data tersimpan di Google Sheets!{saldo_info}
+        Valid entries are written with a single Sheets append and the balance
+        is refreshed once for the whole batch; the AI tip is generated for the
+        last entry only. Returns one combined reply.
+        """
+        if len(texts) == 1:
+            return self._process_expense_message(texts[0], user_id)
 
-{ai_tip}
+        try:
+            entries = []
+            errors = []
+            for text in texts:
+                entry = self._parse_expense_text(text)
+                if isinstance(entry, str):
+                    errors.append(f"• `{text}` → {entry.splitlines()[0]}")
+                else:
+                    entries.append(entry)
 
-{personalized_advice}{suggestion_text}""")
-                    except Exception as e:
-                        print(f"AI response error: {e}")
-                        # fallback ke standard response
+            error_text = "\n\n⚠️ **Tidak tercatat:**\n" + "\n".join(errors) if errors else ""
+            if not entries:
+                return "❌ Tidak ada transaksi yang valid." + error_text + "\n\nKetik /help untuk format yang benar."
 
-                # Standard response (fallback)
-                tipe_emoji = "💰" if is_income else "💸"
-                tipe_text = "Pemasukan" if is_income else "Pengeluaran"
-                formatted_amount = f"Rp {amount:,}".replace(',', '.')
+            jakarta_time = get_jakarta_time()
+            records = [self._build_sheet_record(entry, user_id, jakarta_time) for entry in entries]
+            if not self._save_rows_to_sheets(records):
+                return "❌ Gagal menyimpan data. Coba lagi dalam beberapa saat."
+            get_speculative_warmup().note_write(user_id)
 
-                return (f"""{tipe_emoji} **{tipe_text} Tercatat!**
+            # One aggregate refresh for the whole batch
+            user_data = self._get_user_financial_data(user_id)
+            saldo_info, _ = self._format_balance_info(user_data)
 
-💵 Jumlah: {formatted_amount}
-📂 Kategori: {kategori.title()}
-📝 Deskripsi: {deskripsi}
-📅 Waktu: {jakarta_time.strftime('%d/%m/%Y %H:%M')} WIB
+            lines = [f"🧾 **{len(entries)} Transaksi Tercatat!**", f"📅 Waktu: {jakarta_time.strftime('%d/%m/%Y %H:%M')} WIB", ""]
+            for entry in entries:
+                tipe_emoji = "💰" if entry['is_income'] else "💸"
+                formatted_amount = f"Rp {entry['amount']:,}".replace(',', '.')
+                line = f"{tipe_emoji} {formatted_amount} • {entry['kategori'].title()}"
+                if entry['deskripsi']:
+                    line += f" • {entry['deskripsi']}"
+                lines.append(line)
 
-✅ Data tersimpan di Google Sheets!{saldo_info}{suggestion_text}""")
-            else:
-                return "❌ Gagal menyimpan data. Coba lagi dalam beberapa saat."
+            result = "\n".join(lines) + f"\n\n✅ Data tersimpan di Google Sheets!{saldo_info}"
+
+            if AI_ENABLED and os.getenv('AI_INSIGHTS_ENABLED', 'true').lower() == 'true':
+                try:
+                    last = entries[-1]
+                    advisor = get_financial_advisor()
+                    ai_tip = advisor.get_transaction_advice(
+                        amount=last['amount'],
+                        category=last['kategori'],
+                        description=last['deskripsi'],
+                        user_data=user_data
+                    )
+                    result += f"\n\n{ai_tip}"
+                except Exception as e:
+                    print(f"AI response error: {e}")
+
+            return result + error_text
 
         except Exception as e:
             return f"❌ Error: {str(e)}\n\nKetik /help untuk format yang benar."
 
+    def _parse_expense_text(self, text):
+        """Parse `[+]amount kategori deskripsi`.
+
+        Returns a dict describing the entry, or an error message string.
+        """
+        # Parse message: amount category description
+        parts = text.strip().split(' ', 2)
+
+        if len(parts) < 2:
+            return ("❌ Format salah!\n\n✅ Contoh yang benar:\n"
+                    "• `50000 makanan nasi padang`\n"
+                    "• `+1000000 gaji salary`\n\nKetik /help untuk panduan lengkap.")
+
+        amount_str = parts[0]
+        kategori_input = parts[1].lower()
+        deskripsi = parts[2] if len(parts) > 2 else ""
+
+        # Standardize category with fuzzy matching
+        kategori = self._standardize_category(kategori_input)
+        suggestion_text = self._get_category_suggestion(kategori_input, kategori)
+
+        # Parse amount (check for income with + prefix)
+        is_income = amount_str.startswith('+')
+        if is_income:
+            amount_str = amount_str[1:]  # Remove + prefix
+
+        try:
+            amount = int(amount_str.replace(',', '').replace('.', ''))
+        except ValueError:
+            return "❌ Jumlah harus berupa angka!\n\n✅ Contoh: `50000 makanan nasi padang`"
+
+        if amount <= 0:
+            return "❌ Jumlah harus lebih dari 0!"
+
+        return {
+            'amount': amount,
+            'is_income': is_income,
+            'kategori': kategori,
+            'deskripsi': deskripsi,
+            'suggestion_text': suggestion_text
+        }
+
+    def _build_sheet_record(self, entry, user_id, jakarta_time):
+        """Sheets record for a parsed entry (see _parse_expense_text)"""
+        amount = entry['amount']
+        return {
+            'tanggal': jakarta_time.strftime('%Y-%m-%d %H:%M:%S'),
+            'kategori': entry['kategori'],
+            'deskripsi': entry['deskripsi'],
+            'jumlah': amount if entry['is_income'] else -amount,  # Negative for expenses
+            'sumber': f"telegram_{user_id}",
+            'tipe': 'pemasukan' if entry['is_income'] else 'pengeluaran'
+        }
+
+    def _format_balance_info(self, user_data):
+        """Balance lines shown after recording transactions.
+
+        Returns (saldo_info, available_after_saving).
+        """
+        total_income = user_data.get("total_income", 0)
+        total_expense = user_data.get("total_expense", 0)
+        balance = total_income - total_expense
+
+        saving_target = 1_000_000
+        available_after_saving = max(0, balance - saving_target)
+
+        # Build saldo info message
+        saldo_info = (
+            f"\n\n📊 Saldo Saat Ini: Rp {balance:,}".replace(",", ".") +
+            f"\n💎 Tabungan (default): Rp {saving_target:,}".replace(",", ".") +
+            f"\n💵 Bisa Dipakai: Rp {available_after_saving:,}".replace(",", ".")
+        )
+        return saldo_info, available_after_saving
+
     def _standardize_category(self, input_category):
         """Standardize category with fuzzy matching and English translation"""
         input_category = input_category.lower().strip()
@@ -567,42 +850,74 @@ class handler(BaseHTTPRequestHandler):
             return f"\n💡 *Kategori dikoreksi: '{original}' → '{corrected}'*"
         return ""
 
+    def _open_sheet(self):
+        """Open sheet1 of the configured spreadsheet.
+
+        The authorized client is cached per process so warm invocations skip
+        credential parsing and the OAuth handshake. Returns None when Google
+        Sheets is not configured.
+        """
+        service_account_key = os.environ.get('GOOGLE_SERVICE_ACCOUNT_KEY')
+        sheets_id = os.environ.get('GOOGLE_SHEETS_ID')
+
+        if not service_account_key or not sheets_id:
+            return None
+
+        cache_key = (sheets_id, service_account_key)
+        with _sheet_lock:
+            sheet = _sheet_cache.get(cache_key)
+            if sheet is None:
+                decoded_key = base64.b64decode(service_account_key).decode('utf-8')
+                credentials_info = json.loads(decoded_key)
+
+                scope = [
+                    "https://spreadsheets.google.com/feeds",
+                    "https://www.googleapis.com/auth/drive"
+                ]
+
+                import gspread
+                from google.oauth2.service_account import Credentials
+
+                credentials = Credentials.from_service_account_info(credentials_info, scopes=scope)
+                client = gspread.authorize(credentials)
+                sheet = client.open_by_key(sheets_id).sheet1
+                _sheet_cache.clear()
+                _sheet_cache[cache_key] = sheet
+        return sheet
+
     def _save_to_sheets(self, data):
         """Save data to Google Sheets"""
+        return self._save_rows_to_sheets([data])
+
+    def _save_rows_to_sheets(self, records):
+        """Append several records to Google Sheets in one API call"""
         try:
-            service_account_key = os.environ.get('GOOGLE_SERVICE_ACCOUNT_KEY')
-            sheets_id = os.environ.get('GOOGLE_SHEETS_ID')
-            
-            if not service_account_key or not sheets_id:
+            sheet = self._open_sheet()
+            if sheet is None:
                 return False
             
-            # Parse credentials
-            decoded_key = base64.b64decode(service_account_key).decode('utf-8')
-            credentials_info = json.loads(decoded_key)
-            
-            scope = [
-                "https://spreadsheets.google.com/feeds",
-                "https://www.googleapis.com/auth/drive"
-            ]
-            
-            credentials = Credentials.from_service_account_info(credentials_info, scopes=scope)
-            client = gspread.authorize(credentials)
-            sheet = client.open_by_key(sheets_id).sheet1
-            
             # Append data
-            row = [
-                data['tanggal'],
-                data['kategori'],
-                data['deskripsi'],
-                data['jumlah'],
-                data['sumber']
+            rows = [
+                [
+                    data['tanggal'],
+                    data['kategori'],
+                    data['deskripsi'],
+                    data['jumlah'],
+                    data['sumber']
+                ]
+                for data in records
             ]
             
-            sheet.append_row(row)
+            with SHEETS_SLOTS:
+                if len(rows) == 1:
+                    sheet.append_row(rows[0])
+                else:
+                    sheet.append_rows(rows)
             return True
             
         except Exception as e:
             print(f"Sheets error: {e}")
+            _sheet_cache.clear()  # re-authorize on the next call
             return False
 
     def _generate_report_summary(self, period):
@@ -695,31 +1010,55 @@ class handler(BaseHTTPRequestHandler):
         except Exception as e:
             return f"❌ Error generating report: {str(e)}"
 
+    def _warm_up_advice(self, user_id):
+        """Speculatively compute /advice for the new ledger version in the
+        background, if user_id wrote since the last warm-up (api/warmup.py).
+        Returns whether a warm-up was scheduled."""
+        warmup = get_speculative_warmup()
+        if not (AI_ENABLED and warmup.enabled):
+            return False
+
+        def job(still_current):
+            if not still_current():
+                return False
+            user_data = self._get_user_financial_data(user_id, include_historical=True)
+            if not still_current() or (user_data['total_income'] == 0 and user_data['total_expense'] == 0
+                                       and user_data['carry_over_balance'] == 0):
+                return False
+            advisor = get_financial_advisor()
+            cache_key = self._analysis_cache_key('advice', user_id, user_data)
+            if advisor._get_cached_response(cache_key, LEDGER_ANALYSIS_TTL):
+                return False
+            advisor.get_monthly_analysis(user_data, deadline=Deadline(WARMUP_DEADLINE_SECONDS), cache_key=cache_key)
+            return True
+
+        return warmup.schedule(user_id, job)
+
+    def _analysis_cache_key(self, kind, user_id, user_data, *args):
+        """AI cache key for an analysis of `user_data`, the user's figures from
+        _get_user_financial_data().
+
+        The figures come from the same sheet read the analysis needs anyway,
+        and any write, edit or delete that matters (through the bot or by
+        hand) changes them, so the key needs no extra Sheets call.
+        """
+        snapshot = json.dumps(user_data, sort_keys=True, default=str)
+        raw = '|'.join(['ledger-analysis:v3', kind, str(user_id), snapshot] + [str(a) for a in args])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
     def _get_sheets_data(self):
         """Get data from Google Sheets"""
         try:
-            service_account_key = os.environ.get('GOOGLE_SERVICE_ACCOUNT_KEY')
-            sheets_id = os.environ.get('GOOGLE_SHEETS_ID')
-            
-            if not service_account_key or not sheets_id:
+            sheet = self._open_sheet()
+            if sheet is None:
                 return None
             
-            decoded_key = base64.b64decode(service_account_key).decode('utf-8')
-            credentials_info = json.loads(decoded_key)
-            
-            scope = [
-                "https://spreadsheets.google.com/feeds",
-                "https://www.googleapis.com/auth/drive"
-            ]
-            
-            credentials = Credentials.from_service_account_info(credentials_info, scopes=scope)
-            client = gspread.authorize(credentials)
-            sheet = client.open_by_key(sheets_id).sheet1
-            
-            return sheet.get_all_records()
+            with SHEETS_SLOTS:
+                return sheet.get_all_records()
             
         except Exception as e:
             print(f"Error getting sheets data: {e}")
+            _sheet_cache.clear()  # re-authorize on the next call
             return None
 
     def _generate_trends_analysis(self):
@@ -1174,6 +1513,7 @@ class handler(BaseHTTPRequestHandler):
             })
             
             if success:
+                get_speculative_warmup().note_write(user_id)
                 formatted_amount = f"Rp {amount:,}".replace(',', '.')
                 
                 return f"""💰 **Pemasukan Tercatat!**
@@ -1335,52 +1675,61 @@ class handler(BaseHTTPRequestHandler):
         except Exception as e:
             return f"❌ Error generating expense report: {str(e)}"
 
-    def _send_telegram_message(self, chat_id, text):
-        """Send message to Telegram"""
+    def _send_telegram_message(self, chat_id, text, return_message_id=False, deadline=None):
+        """Send message to Telegram.
+
+        Returns True/False, or the sent message_id (None on failure) when
+        return_message_id=True. Waits at most TELEGRAM_SEND_TIMEOUT, and no
+        longer than `deadline` (api.resilience.Deadline) allows.
+        """
         try:
-            bot_token = os.environ.get('TELEGRAM_BOT_TOKEN')
-            if not bot_token:
-                return False
-            
-            url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-            
-            payload = {
-                'chat_id': chat_id,
-                'text': text,
-                'parse_mode': 'Markdown'
-            }
-            
-            response = requests.post(url, json=payload)
-            return response.status_code == 200
+            # Queued through the rate-limited scheduler (per-chat/global limits, 429 retry_after)
+            scheduler = get_scheduler()
+            if scheduler is None:
+                return None if return_message_id else False
+            
+            # A message whose id is returned gets edited later, so it must not be merged with other sends
+            response = scheduler.send_message(chat_id, text, coalesce=not return_message_id).result(
+                timeout=deadline_timeout(deadline, TELEGRAM_SEND_TIMEOUT))
+            if not return_message_id:
+                return bool(response)
+            if not response:
+                return None
+            return (response.get('result') or {}).get('message_id')
             
         except Exception as e:
             print(f"Error sending telegram message: {e}")
+            return None if return_message_id else False
+
+    def _edit_telegram_message(self, chat_id, message_id, text, wait=True, deadline=None):
+        """Replace the text of a message sent earlier (editMessageText).
+
+        With wait=False the edit is only queued; a later edit of the same
+        message that is queued before it goes out replaces it. The wait is
+        bounded like _send_telegram_message().
+        """
+        try:
+            scheduler = get_scheduler()
+            if scheduler is None:
+                return False
+
+            # Unchanged text and unbalanced Markdown are handled by the scheduler
+            future = scheduler.edit_message(chat_id, message_id, text)
+            if not wait:
+                return True
+            response = future.result(timeout=deadline_timeout(deadline, TELEGRAM_SEND_TIMEOUT))
+            return bool(response)
+
+        except Exception as e:
+            print(f"Error editing telegram message: {e}")
             return False
 
     # AI Command Handlers
-    def _get_ai_tips(self):
-        """Get general financial tips from AI"""
+    def _get_ai_tips(self, user_id, deadline=None):
+        """Next tips for this user from the pre-generated pool (api/tips_pool.py)"""
         try:
-            from api.financial_advisor import FinancialAdvisor
-            advisor = FinancialAdvisor()
-            
-            prompt = """
-            Berikan 5 tips keuangan umum yang praktis untuk orang Indonesia.
-            
-            Format:
-            💰 TIPS KEUANGAN SMART
-            
-            1. [tip pertama]
-            2. [tip kedua]
-            3. [tip ketiga]
-            4. [tip keempat]
-            5. [tip kelima]
-            
-            Setiap tip harus actionable dan mudah diterapkan.
-            """
-            
-            response = advisor._get_ai_response(prompt)
-            return response
+            from api.tips_pool import get_tips_pool
+            return get_tips_pool().tips_for(user_id, deadline=deadline)
             
         except Exception as e:
             return """💰 TIPS KEUANGAN SMART
@@ -1393,12 +1742,11 @@ class handler(BaseHTTPRequestHandler):
 
 💡 Konsistensi lebih penting daripada jumlah besar!"""
 
-    def _get_ai_advice(self, user_id):
+    def _get_ai_advice(self, user_id, progress=None, deadline=None):
         """Get AI-powered financial analysis with historical data"""
         try:
-            from api.financial_advisor import FinancialAdvisor
-            advisor = FinancialAdvisor()
-            
+            advisor = get_financial_advisor()
+
             # Get REAL user data with historical analysis
             user_data = self._get_user_financial_data(user_id, include_historical=True)
             
@@ -1418,17 +1766,32 @@ class handler(BaseHTTPRequestHandler):
 • Saldo carry-over dari bulan lalu
 • Trend spending historis
 • Rekomendasi budget yang realistis"""
+
+            # Nothing changed since the last /advice? Reuse that analysis
+            cache_key = self._analysis_cache_key('advice', user_id, user_data)
+            cached = advisor._get_cached_response(cache_key, LEDGER_ANALYSIS_TTL)
+            if cached:
+                return cached
+
+            if progress:
+                current_balance = user_data['total_income'] - user_data['total_expense']
+                progress((f"""🤖 **AI Financial Analysis**
+
+💰 Pemasukan bulan ini: Rp {user_data['total_income']:,.0f}
+💸 Pengeluaran bulan ini: Rp {user_data['total_expense']:,.0f}
+📊 Saldo bulan ini: Rp {current_balance:,.0f}
+💎 Saldo efektif: Rp {user_data['effective_balance']:,.0f}""").replace(',', '.') + AI_PENDING_FOOTER)
             
-            return advisor.get_monthly_analysis(user_data)
+            return advisor.get_monthly_analysis(user_data, on_update=throttled_stream(progress), deadline=deadline,
+                                                cache_key=cache_key)
             
         except Exception as e:
             return f"❌ Gagal menganalisis data keuangan: {str(e)}"
 
-    def _get_ai_budget(self, user_id, monthly_income):
+    def _get_ai_budget(self, user_id, monthly_income, progress=None, deadline=None):
         """Get AI budget recommendations with historical context"""
         try:
-            from api.financial_advisor import FinancialAdvisor
-            advisor = FinancialAdvisor()
+            advisor = get_financial_advisor()
             
             if monthly_income is None:
                 return """💰 SET BUDGET RECOMMENDATION
@@ -1440,21 +1803,33 @@ Gunakan format: `/budget [penghasilan_bulanan]`
 • `/budget 6500000` - Budget untuk penghasilan 6.5 juta
 
 💡 Saya akan berikan rekomendasi budget berdasarkan prinsip 50/30/20 dan pola pengeluaran historis Anda!"""
-            
+
             # Get real user data with historical context
             user_data = self._get_user_financial_data(user_id, include_historical=True)
             user_data['total_income'] = monthly_income  # Override with provided income
+
+            cache_key = self._analysis_cache_key('budget', user_id, user_data, monthly_income)
+            cached = advisor._get_cached_response(cache_key, LEDGER_ANALYSIS_TTL)
+            if cached:
+                return cached
+
+            if progress:
+                progress((f"""💰 REKOMENDASI BUDGET BULANAN
+
+🏠 Kebutuhan Pokok (50%): Rp {monthly_income*0.5:,.0f}
+🎯 Keinginan (30%): Rp {monthly_income*0.3:,.0f}
+💎 Tabungan & Investasi (20%): Rp {monthly_income*0.2:,.0f}""").replace(',', '.') + AI_PENDING_FOOTER)
             
-            return advisor.get_budget_recommendation(monthly_income, user_data)
+            return advisor.get_budget_recommendation(monthly_income, user_data, on_update=throttled_stream(progress),
+                                                     deadline=deadline, cache_key=cache_key)
             
         except Exception as e:
             return f"❌ Gagal membuat rekomendasi budget: {str(e)}"
 
-    def _set_financial_goal(self, user_id, goal_amount, goal_description):
+    def _set_financial_goal(self, user_id, goal_amount, goal_description, progress=None, deadline=None):
         """Set financial goals with AI recommendations"""
         try:
-            from api.financial_advisor import FinancialAdvisor
-            advisor = FinancialAdvisor()
+            advisor = get_financial_advisor()
             
             prompt = f"""
             User ingin menabung {goal_amount:,.0f} IDR untuk {goal_description}.
@@ -1477,8 +1852,18 @@ Gunakan format: `/budget [penghasilan_bulanan]`
             🚀 Action Plan:
             [langkah konkret yang bisa dimulai hari ini]
             """
+
+            if progress:
+                progress(f"""🎯 RENCANA MENCAPAI GOAL
+
+💰 Target: Rp {f'{goal_amount:,.0f}'.replace(',', '.')} - {goal_description}
+
+📅 Timeline Options:
+• 6 bulan: Rp {f'{goal_amount / 6:,.0f}'.replace(',', '.')}/bulan
+• 12 bulan: Rp {f'{goal_amount / 12:,.0f}'.replace(',', '.')}/bulan
+• 24 bulan: Rp {f'{goal_amount / 24:,.0f}'.replace(',', '.')}/bulan""" + AI_PENDING_FOOTER)
             
-            return advisor._get_ai_response(prompt)
+            return advisor._get_ai_response(prompt, deadline=deadline, route='goals')
             
         except Exception as e:
             # Fallback calculation
@@ -1515,16 +1900,15 @@ Gunakan format: `/goals [jumlah] [deskripsi]`
 
 💡 Goals yang clear dan terukur lebih mudah dicapai!"""
 
-    def _check_budget_feasibility(self, user_id: str, budget_amount: float, duration_days: int):
+    def _check_budget_feasibility(self, user_id: str, budget_amount: float, duration_days: int, deadline=None):
         """Check if budget is feasible for given duration"""
         try:
-            from api.financial_advisor import FinancialAdvisor
-            advisor = FinancialAdvisor()
+            advisor = get_financial_advisor()
             
             # Get user's spending data for context
             user_data = self._get_user_spending_data(user_id)
             
-            return advisor.check_budget_feasibility(budget_amount, duration_days, user_data)
+            return advisor.check_budget_feasibility(budget_amount, duration_days, user_data, deadline=deadline)
             
         except Exception as e:
             # Fallback calculation
@@ -1553,13 +1937,12 @@ Gunakan format: `/goals [jumlah] [deskripsi]`
 ⚠️ PERINGATAN:
 Sisihkan minimal 10% untuk emergency!"""
 
-    def _get_daily_spending_plan(self, daily_budget: float):
+    def _get_daily_spending_plan(self, daily_budget: float, deadline=None):
         """Get daily spending plan"""
         try:
-            from api.financial_advisor import FinancialAdvisor
-            advisor = FinancialAdvisor()
+            advisor = get_financial_advisor()
             
-            return advisor.get_daily_spending_plan(daily_budget)
+            return advisor.get_daily_spending_plan(daily_budget, deadline=deadline)
             
         except Exception as e:
             return f"""📅 RENCANA PENGELUARAN HARIAN
@@ -1781,12 +2164,12 @@ Gunakan format: `/dailyplan [budget_harian]`
             return 0
         return available_balance / remaining_days
     
-    def _generate_personalized_advice(self, amount, category, user_data, daily_spending_pattern, daily_budget, remaining_days):
+    def _generate_personalized_advice(self, amount, category, user_data, daily_spending_pattern, daily_budget, remaining_days, deadline=None):
         """Generate personalized advice based on spending patterns and remaining balance"""
         try:
             # If AI is available, use it for more sophisticated advice
-            if AI_ENABLED and self.selected_provider == 'groq' and requests:
-                advisor = FinancialAdvisor()
+            if AI_ENABLED and self.selected_provider == 'groq':
+                advisor = get_financial_advisor()
                 
                 # Prepare context for AI
                 avg_daily_expense = daily_spending_pattern.get('avg_daily_expense', 0)
@@ -1812,7 +2195,8 @@ Gunakan format: `/dailyplan [budget_harian]`
                 """
                 
                 try:
-                    return advisor._get_ai_response(prompt, with_reasoning=False)
+                    return advisor._get_ai_response(prompt, with_reasoning=False, deadline=deadline,
+                                                    route='personalized_advice')
                 except Exception as e:
                     print(f"Error getting AI advice: {e}")
                     # Fallback to rule-based advice
@@ -1844,27 +2228,13 @@ Gunakan format: `/dailyplan [budget_harian]`
     def _show_recent_transactions(self, user_id):
         """Show recent transactions for the user"""
         try:
-            # Get Google Sheets data
-            service_account_key = os.getenv('GOOGLE_SERVICE_ACCOUNT_KEY')
-            sheets_id = os.getenv('GOOGLE_SHEETS_ID')
-            
-            if not service_account_key or not sheets_id:
+            sheet = self._open_sheet()
+            if sheet is None:
                 return "❌ Konfigurasi Google Sheets tidak tersedia."
             
-            decoded_key = base64.b64decode(service_account_key).decode('utf-8')
-            credentials_info = json.loads(decoded_key)
-            
-            scope = [
-                "https://spreadsheets.google.com/feeds",
-                "https://www.googleapis.com/auth/drive"
-            ]
-            
-            credentials = Credentials.from_service_account_info(credentials_info, scopes=scope)
-            client = gspread.authorize(credentials)
-            sheet = client.open_by_key(sheets_id).sheet1
-            
             # Get all data
-            all_data = sheet.get_all_values()
+            with SHEETS_SLOTS:
+                all_data = sheet.get_all_values()
             if len(all_data) <= 1:  # Only header or empty
                 return "📝 Belum ada transaksi yang tercatat."
             
@@ -1905,33 +2275,20 @@ Gunakan format: `/dailyplan [budget_harian]`
             return response
             
         except Exception as e:
+            _sheet_cache.clear()  # re-authorize on the next call
             return f"❌ Error mengambil data transaksi: {str(e)}"
     
     def _delete_transaction(self, user_id, row_number):
         """Delete a specific transaction"""
         try:
-            # Get Google Sheets data
-            service_account_key = os.getenv('GOOGLE_SERVICE_ACCOUNT_KEY')
-            sheets_id = os.getenv('GOOGLE_SHEETS_ID')
-            
-            if not service_account_key or not sheets_id:
+            sheet = self._open_sheet()
+            if sheet is None:
                 return "❌ Konfigurasi Google Sheets tidak tersedia."
             
-            decoded_key = base64.b64decode(service_account_key).decode('utf-8')
-            credentials_info = json.loads(decoded_key)
-            
-            scope = [
-                "https://spreadsheets.google.com/feeds",
-                "https://www.googleapis.com/auth/drive"
-            ]
-            
-            credentials = Credentials.from_service_account_info(credentials_info, scopes=scope)
-            client = gspread.authorize(credentials)
-            sheet = client.open_by_key(sheets_id).sheet1
-            
             # Get specific row data to verify ownership
             try:
-                row_data = sheet.row_values(row_number)
+                with SHEETS_SLOTS:
+                    row_data = sheet.row_values(row_number)
                 if len(row_data) < 5:
                     return f"❌ Transaksi tidak ditemukan di row {row_number}."
                 
@@ -1946,7 +2303,9 @@ Gunakan format: `/dailyplan [budget_harian]`
                 date = row_data[0]
                 
                 # Delete the row
-                sheet.delete_rows(row_number)
+                with SHEETS_SLOTS:
+                    sheet.delete_rows(row_number)
+                get_speculative_warmup().note_write(user_id)
                 
                 amount_formatted = f"{float(amount):,.0f}" if amount.replace('-', '').replace('+', '').isdigit() else amount
                 
@@ -1961,36 +2320,24 @@ Gunakan format: `/dailyplan [budget_harian]`
 💡 Gunakan `/recent` untuk melihat transaksi terbaru."""
                 
             except Exception as e:
+                _sheet_cache.clear()  # re-authorize on the next call
                 return f"❌ Row {row_number} tidak ditemukan atau tidak valid: {str(e)}"
                 
         except Exception as e:
+            _sheet_cache.clear()  # re-authorize on the next call
             return f"❌ Error menghapus transaksi: {str(e)}"
     
     def _edit_transaction(self, user_id, row_number, new_amount, new_category, new_description):
         """Edit a specific transaction"""
         try:
-            # Get Google Sheets data
-            service_account_key = os.getenv('GOOGLE_SERVICE_ACCOUNT_KEY')
-            sheets_id = os.getenv('GOOGLE_SHEETS_ID')
-            
-            if not service_account_key or not sheets_id:
+            sheet = self._open_sheet()
+            if sheet is None:
                 return "❌ Konfigurasi Google Sheets tidak tersedia."
             
-            decoded_key = base64.b64decode(service_account_key).decode('utf-8')
-            credentials_info = json.loads(decoded_key)
-            
-            scope = [
-                "https://spreadsheets.google.com/feeds",
-                "https://www.googleapis.com/auth/drive"
-            ]
-            
-            credentials = Credentials.from_service_account_info(credentials_info, scopes=scope)
-            client = gspread.authorize(credentials)
-            sheet = client.open_by_key(sheets_id).sheet1
-            
             # Get specific row data to verify ownership
             try:
-                row_data = sheet.row_values(row_number)
+                with SHEETS_SLOTS:
+                    row_data = sheet.row_values(row_number)
                 if len(row_data) < 5:
                     return f"❌ Transaksi tidak ditemukan di row {row_number}."
                 
@@ -2020,11 +2367,13 @@ Gunakan format: `/dailyplan [budget_harian]`
                 current_date = get_jakarta_time().strftime('%Y-%m-%d %H:%M:%S')
                 
                 # Update specific cells
-                sheet.update_cell(row_number, 1, current_date)  # Update timestamp
-                sheet.update_cell(row_number, 2, standardized_category)  # Category
-                sheet.update_cell(row_number, 3, new_description)  # Description
-                sheet.update_cell(row_number, 4, final_amount)  # Amount
+                with SHEETS_SLOTS:
+                    sheet.update_cell(row_number, 1, current_date)  # Update timestamp
+                    sheet.update_cell(row_number, 2, standardized_category)  # Category
+                    sheet.update_cell(row_number, 3, new_description)  # Description
+                    sheet.update_cell(row_number, 4, final_amount)  # Amount
                 # Keep user_id (column 5) unchanged
+                get_speculative_warmup().note_write(user_id)
                 
                 old_amount_formatted = f"{float(old_amount):,.0f}" if old_amount.replace('-', '').replace('+', '').isdigit() else old_amount
                 new_amount_formatted = f"{float(final_amount):,.0f}" if final_amount.replace('-', '').replace('+', '').isdigit() else final_amount
@@ -2047,9 +2396,11 @@ Gunakan format: `/dailyplan [budget_harian]`
 💡 Gunakan `/recent` untuk melihat transaksi terbaru."""
                 
             except Exception as e:
+                _sheet_cache.clear()  # re-authorize on the next call
                 return f"❌ Row {row_number} tidak ditemukan atau tidak valid: {str(e)}"
                 
         except Exception as e:
+            _sheet_cache.clear()  # re-authorize on the next call
             return f"❌ Error mengedit transaksi: {str(e)}"
     
     def _count_months_with_data(self, data):
@@ -0,0 +1,343 @@
+"""
+Outbound Telegram send scheduler for CatatUang Bot
+
+Telegram allows roughly 30 messages/second per bot and about 1 message/second
+per chat, and answers 429 with `retry_after` when those limits are exceeded.
+All sendMessage/editMessageText calls go through one scheduler per process:
+
+- token buckets per chat and globally decide when a call may go out
+- calls are posted by a small worker pool (TELEGRAM_SEND_WORKERS), so one
+  slow chat doesn't hold up the others; each chat has at most one call in
+  flight, which keeps its messages in order
+- 429 responses pause the chat for `retry_after` seconds and the call is
+  retried; 429s from several chats at once are a bot-wide flood wait and
+  pause the global bucket as well
+- consecutive queued messages to the same chat are coalesced into one message
+  (except messages sent with coalesce=False, whose message_id is needed later)
+- a queued edit of a message that already has a pending edit replaces it
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+# Telegram's hard limit for a single message text
+MAX_MESSAGE_LENGTH = 4096
+
+# Separator used when coalescing several queued messages into one
+COALESCE_SEPARATOR = "\n\n"
+
+MAX_ATTEMPTS = 5
+
+# 429s from this many different chats within GLOBAL_FLOOD_WINDOW seconds
+# mean the bot as a whole is being throttled
+GLOBAL_FLOOD_CHATS = 2
+GLOBAL_FLOOD_WINDOW = 1.0
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float, now: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic() if now is None else now
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until one token is available (0 if available now)"""
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, seconds: float, now: float):
+        """Block the bucket (server asked us to back off); afterwards it
+        restarts with a single token instead of a full burst"""
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.tokens = min(self.capacity, 1.0)
+        self.updated = max(self.updated, self.paused_until)
+
+
+class _Job:
+    __slots__ = ('method', 'chat_id', 'payload', 'futures', 'attempts', 'coalesce')
+
+    def __init__(self, method: str, chat_id: Any, payload: Dict, coalesce: bool = True):
+        self.method = method
+        self.chat_id = chat_id
+        self.payload = payload
+        self.futures = [Future()]
+        self.attempts = 0
+        self.coalesce = coalesce
+
+
+class OutboundScheduler:
+    """Rate-limited dispatcher for Telegram Bot API calls.
+
+    send_message()/edit_message() return a Future resolving to the Telegram
+    response JSON (or None if the call ultimately failed).
+    """
+
+    def __init__(self, bot_token: str, *, global_rate: float = None, chat_rate: float = None,
+                 chat_burst: float = None, workers: int = None, api_base: str = None, http=None):
+        self.bot_token = bot_token
+        self.api_base = (api_base or os.getenv('TELEGRAM_API_BASE', 'https://api.telegram.org')).rstrip('/')
+        self.global_rate = global_rate if global_rate is not None else float(os.getenv('TELEGRAM_GLOBAL_RATE', '30'))
+        self.chat_rate = chat_rate if chat_rate is not None else float(os.getenv('TELEGRAM_CHAT_RATE', '1'))
+        self.chat_burst = chat_burst if chat_burst is not None else float(os.getenv('TELEGRAM_CHAT_BURST', '3'))
+        self.workers = workers or int(os.getenv('TELEGRAM_SEND_WORKERS', '8'))
+        self._http = http
+
+        self.global_bucket = TokenBucket(self.global_rate, self.global_rate)
+        self.chat_buckets: Dict[Any, TokenBucket] = {}
+        self.queues: Dict[Any, deque] = {}
+
+        self._cond = threading.Condition()
+        self._thread = None
+        self._executor = None
+        self._in_flight = 0
+        self._busy_chats = set()     # chats with a call in flight
+        self._recent_429 = deque()   # (time, chat_id)
+        self.stats = {'sent': 0, 'coalesced': 0, 'superseded': 0, 'rate_limited': 0, 'network_errors': 0,
+                      'failed': 0}
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+    def send_message(self, chat_id, text: str, parse_mode: Optional[str] = 'Markdown', coalesce: bool = True) -> Future:
+        """coalesce=False keeps the message on its own (its message_id is
+        edited later, so it must not be shared with other sends)"""
+        payload = {'chat_id': chat_id, 'text': text}
+        if parse_mode:
+            payload['parse_mode'] = parse_mode
+        return self._enqueue(_Job('sendMessage', chat_id, payload, coalesce=coalesce))
+
+    def edit_message(self, chat_id, message_id, text: str, parse_mode: Optional[str] = 'Markdown') -> Future:
+        payload = {'chat_id': chat_id, 'message_id': message_id, 'text': text}
+        if parse_mode:
+            payload['parse_mode'] = parse_mode
+        return self._enqueue(_Job('editMessageText', chat_id, payload))
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until every queued call has been dispatched"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._in_flight or any(self.queues.values()):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    # ---------------------------
+    # Queueing
+    # ---------------------------
+    def _enqueue(self, job: _Job) -> Future:
+        with self._cond:
+            queue = self.queues.setdefault(job.chat_id, deque())
+            if job.method == 'editMessageText':
+                for pending in queue:
+                    if (pending.method == 'editMessageText'
+                            and pending.payload.get('message_id') == job.payload.get('message_id')):
+                        # Only the latest text matters; share the pending slot
+                        pending.payload = job.payload
+                        pending.futures.extend(job.futures)
+                        self.stats['superseded'] += 1
+                        return job.futures[0]
+            queue.append(job)
+            self._ensure_worker()
+            self._cond.notify_all()
+        return job.futures[0]
+
+    def _ensure_worker(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='telegram-send')
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='telegram-sender', daemon=True)
+            self._thread.start()
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _next_job(self):
+        """Pick the next dispatchable job (called with the lock held).
+
+        Returns (job, 0) or (None, seconds_to_wait).
+        """
+        if self._in_flight >= self.workers:
+            return None, None  # a finishing call notifies
+        now = time.monotonic()
+        global_wait = self.global_bucket.wait_time(now)
+        best_wait = None
+        idle = []
+        for chat_id, queue in self.queues.items():
+            if chat_id in self._busy_chats:
+                continue
+            if not queue:
+                idle.append(chat_id)
+                continue
+            wait = max(global_wait, self._chat_bucket(chat_id).wait_time(now))
+            if wait <= 0:
+                job = queue.popleft()
+                if job.method == 'sendMessage':
+                    self._coalesce(job, queue)
+                self.global_bucket.consume(now)
+                self._chat_bucket(chat_id).consume(now)
+                self._in_flight += 1
+                self._busy_chats.add(chat_id)
+                # Round-robin: the served chat goes to the back of the line
+                self.queues[chat_id] = self.queues.pop(chat_id)
+                return job, 0
+            if best_wait is None or wait < best_wait:
+                best_wait = wait
+        self._forget_idle_chats(idle, now)
+        return None, best_wait
+
+    def _forget_idle_chats(self, chat_ids, now: float):
+        """Drop state for chats with nothing queued and a full bucket"""
+        for chat_id in chat_ids:
+            bucket = self.chat_buckets.get(chat_id)
+            if bucket is not None:
+                bucket._refill(now)
+                if bucket.tokens < bucket.capacity or now < bucket.paused_until:
+                    continue
+                del self.chat_buckets[chat_id]
+            del self.queues[chat_id]
+
+    def _coalesce(self, job: _Job, queue: deque):
+        """Merge following sendMessage jobs for the same chat into `job`"""
+        while job.coalesce and queue:
+            nxt = queue[0]
+            if (nxt.method != 'sendMessage' or not nxt.coalesce
+                    or nxt.payload.get('parse_mode') != job.payload.get('parse_mode')):
+                break
+            merged = job.payload['text'] + COALESCE_SEPARATOR + nxt.payload['text']
+            if len(merged) > MAX_MESSAGE_LENGTH:
+                break
+            queue.popleft()
+            job.payload = dict(job.payload, text=merged)
+            job.futures.extend(nxt.futures)
+            self.stats['coalesced'] += 1
+
+    # ---------------------------
+    # Dispatch
+    # ---------------------------
+    def _run(self):
+        """Pick jobs and spend tokens; the HTTP calls run on the worker pool"""
+        while True:
+            with self._cond:
+                job, wait = self._next_job()
+                while job is None:
+                    # wait=None means nothing dispatchable: sleep until notified
+                    self._cond.notify_all()
+                    self._cond.wait(wait)
+                    job, wait = self._next_job()
+            self._executor.submit(self._dispatch, job)
+
+    def _post(self, method: str, payload: Dict):
+        http = self._http
+        if http is None:
+            import requests
+            http = self._http = requests.Session()
+        return http.post(f"{self.api_base}/bot{self.bot_token}/{method}", json=payload, timeout=15)
+
+    def _dispatch(self, job: _Job):
+        job.attempts += 1
+        result = None
+        retry_after = None
+        reason = None
+        try:
+            response = self._post(job.method, job.payload)
+            try:
+                data = response.json()
+            except Exception:
+                data = {'ok': response.status_code == 200, 'description': getattr(response, 'text', '')}
+
+            description = str(data.get('description', ''))
+            if response.status_code == 200:
+                result = data
+            elif response.status_code == 429:
+                retry_after = float(data.get('parameters', {}).get('retry_after', 1))
+                reason = 'rate_limited'
+            elif response.status_code == 400 and 'not modified' in description:
+                result = {'ok': True, 'result': None}
+            elif response.status_code == 400 and "can't parse entities" in description and 'parse_mode' in job.payload:
+                # Generated text may contain unbalanced Markdown; resend as plain text
+                job.payload = {k: v for k, v in job.payload.items() if k != 'parse_mode'}
+                retry_after = 0
+            else:
+                print(f"Telegram {job.method} error {response.status_code}: {description[:200]}")
+        except Exception as e:
+            print(f"Error calling Telegram {job.method}: {e}")
+            retry_after = min(2 ** job.attempts, 10)
+            reason = 'network_errors'
+
+        if retry_after is not None and job.attempts < MAX_ATTEMPTS:
+            with self._cond:
+                now = time.monotonic()
+                if reason:
+                    self.stats[reason] += 1
+                if retry_after > 0:
+                    self._chat_bucket(job.chat_id).pause(retry_after, now)
+                if reason == 'rate_limited' and self._is_global_flood(job.chat_id, now):
+                    self.global_bucket.pause(retry_after, now)
+                self.queues.setdefault(job.chat_id, deque()).appendleft(job)
+                self._finished(job)
+            return
+
+        with self._cond:
+            self.stats['sent' if result else 'failed'] += 1
+            self._finished(job)
+        for future in job.futures:
+            if not future.done():
+                future.set_result(result)
+
+
+    def _finished(self, job: _Job):
+        """Release the worker slot and the chat (called with the lock held)"""
+        self._in_flight -= 1
+        self._busy_chats.discard(job.chat_id)
+        self._cond.notify_all()
+
+    def _is_global_flood(self, chat_id, now: float) -> bool:
+        """Record a 429 for `chat_id`; True if several chats got one together
+        (called with the lock held)"""
+        recent = self._recent_429
+        recent.append((now, chat_id))
+        while recent and now - recent[0][0] > GLOBAL_FLOOD_WINDOW:
+            recent.popleft()
+        return len({c for _, c in recent}) >= GLOBAL_FLOOD_CHATS
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler(bot_token: str = None) -> Optional[OutboundScheduler]:
+    """Process-wide scheduler for TELEGRAM_BOT_TOKEN (None if no token)"""
+    global _scheduler
+    token = bot_token or os.environ.get('TELEGRAM_BOT_TOKEN')
+    if not token:
+        return None
+    with _scheduler_lock:
+        if _scheduler is None or _scheduler.bot_token != token:
+            _scheduler = OutboundScheduler(token)
+        return _scheduler
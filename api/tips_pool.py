@@ -0,0 +1,138 @@
+"""
+Pre-generated pool of financial tips for /tips
+
+The LLM is asked once for a batch of tips (TIPS_POOL_SIZE); the pool is kept
+in the AI cache and every /tips call serves the next TIPS_PER_MESSAGE tips
+from it. Each user walks the pool from their own starting point and only sees
+a tip again after the whole pool has been shown to them.
+
+The pool is refreshed by tools/refresh_tips.py (run it on a schedule) or
+lazily by the first /tips call after it expired (TIPS_POOL_TTL_SECONDS). If
+generation fails the previous pool, or the built-in tips, are served.
+"""
+import hashlib
+import os
+import random
+import re
+import time
+from typing import Dict, List, Optional
+
+from api.ai_cache import SingleFlight, get_ai_cache
+
+POOL_KEY = 'tips-pool:v1'
+CURSOR_KEY = 'tips-cursor:v1'
+
+TIPS_PER_MESSAGE = 5
+
+DEFAULT_TIPS = [
+    '💎 Sisihkan 20% penghasilan untuk tabungan dan investasi',
+    '🏠 Batasi pengeluaran kebutuhan pokok maksimal 50% income',
+    '📊 Catat semua pengeluaran untuk kontrol yang lebih baik',
+    '🚨 Buat emergency fund minimal 6 bulan pengeluaran',
+    '📈 Mulai investasi dari sekarang, walau jumlah kecil',
+]
+
+POOL_PROMPT = """
+Berikan {count} tips keuangan umum yang praktis untuk orang Indonesia.
+
+Format: satu tip per baris, diberi nomor, diawali satu emoji yang relevan.
+1. [tip pertama]
+2. [tip kedua]
+...
+
+Setiap tip harus berbeda, actionable dan mudah diterapkan (maksimal 20 kata).
+"""
+
+_NUMBERED = re.compile(r'^\s*\d+\s*[.)]\s*(.+?)\s*$')
+
+_refresh_flight = SingleFlight()
+
+
+def parse_tips(text: str) -> List[str]:
+    """Numbered lines of an LLM answer, deduplicated, in order"""
+    tips, seen = [], set()
+    for line in (text or '').splitlines():
+        match = _NUMBERED.match(line)
+        if match:
+            tip = match.group(1).replace('**', '').strip('_ ')
+            if tip and tip.lower() not in seen:
+                seen.add(tip.lower())
+                tips.append(tip)
+    return tips
+
+
+def format_tips(tips: List[str]) -> str:
+    lines = ['💰 TIPS KEUANGAN SMART', '']
+    lines += [f"{i}. {tip}" for i, tip in enumerate(tips, 1)]
+    lines += ['', '💡 Konsistensi lebih penting daripada jumlah besar!']
+    return '\n'.join(lines)
+
+
+class TipsPool:
+    def __init__(self, cache=None, ttl: float = None, size: int = None):
+        self.cache = cache or get_ai_cache()
+        self.ttl = ttl if ttl is not None else float(os.getenv('TIPS_POOL_TTL_SECONDS', str(12 * 3600)))
+        self.size = size if size is not None else int(os.getenv('TIPS_POOL_SIZE', '20'))
+
+    def current(self) -> Optional[Dict]:
+        """The pool if it is still fresh, else None"""
+        return self.cache.get(POOL_KEY, self.ttl)
+
+    def refresh(self, advisor=None, deadline=None) -> Optional[Dict]:
+        """Generate a new pool with the LLM and store it; None if that failed"""
+        def generate():
+            from api.financial_advisor import get_advisor
+            source = advisor or get_advisor()
+            if source.selected_provider != 'groq':
+                return None
+            answer = source._get_ai_response(POOL_PROMPT.format(count=self.size), deadline=deadline, route='tips_pool')
+            tips = parse_tips(answer)
+            # a rule-based fallback answer has only a handful of numbered lines
+            if len(tips) < max(TIPS_PER_MESSAGE, self.size // 2):
+                print(f"Tips pool refresh produced {len(tips)} tips, keeping the previous pool")
+                return None
+            random.shuffle(tips)
+            pool = {'id': hashlib.sha256('\n'.join(tips).encode('utf-8')).hexdigest()[:16],
+                    'generated': time.time(), 'tips': tips}
+            self.cache.set(POOL_KEY, pool)
+            return pool
+
+        try:
+            return _refresh_flight.do(POOL_KEY, generate)
+        except Exception as e:
+            print(f"Tips pool refresh error: {e}")
+            return None
+
+    def tips_for(self, user_id: str, advisor=None, deadline=None) -> str:
+        """Next TIPS_PER_MESSAGE tips for `user_id`, formatted for Telegram"""
+        pool = self.current()
+        if pool is None:
+            # first call after expiry pays for the refresh; a stale pool beats the defaults
+            pool = self.refresh(advisor, deadline) or self.cache.get(POOL_KEY, float('inf'))
+        if not pool or not pool.get('tips'):
+            return format_tips(DEFAULT_TIPS)
+
+        tips = pool['tips']
+        cursor_key = f"{CURSOR_KEY}:{hashlib.sha256(str(user_id).encode('utf-8')).hexdigest()[:16]}"
+        cursor = self.cache.get(cursor_key, float('inf'))
+        if not cursor or cursor.get('pool') != pool['id']:
+            # new pool: start each user at a different spot
+            start = int(hashlib.sha256(f"{user_id}:{pool['id']}".encode('utf-8')).hexdigest(), 16) % len(tips)
+            cursor = {'pool': pool['id'], 'next': start}
+
+        position = cursor['next']
+        count = min(TIPS_PER_MESSAGE, len(tips))
+        picked = [tips[(position + i) % len(tips)] for i in range(count)]
+        self.cache.set(cursor_key, {'pool': pool['id'], 'next': (position + count) % len(tips)})
+        return format_tips(picked)
+
+
+_pool = None
+
+
+def get_tips_pool() -> TipsPool:
+    """Process-wide tips pool backed by the AI cache"""
+    global _pool
+    if _pool is None:
+        _pool = TipsPool()
+    return _pool
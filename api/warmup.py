@@ -0,0 +1,160 @@
+"""
+Speculative warm-up of AI answers after a ledger write
+
+Users usually follow a new transaction with /balance or /advice. When
+SPECULATIVE_WARMUP is enabled, the webhook notes every write here and, once
+the reply is sent, schedules a background job that computes the next likely
+answer and stores it in the AI cache, so the follow-up command is a cache hit.
+
+- jobs wait SPECULATIVE_WARMUP_DELAY seconds first, so a burst of writes
+  ends up as a single warm-up for the last one
+- every write bumps the user's generation; a job checks it before each
+  expensive step and gives up once a newer write arrived
+- each user gets at most SPECULATIVE_WARMUP_PER_HOUR jobs that actually
+  reach the LLM; jobs that stop early are refunded
+- users with nothing pending, running or spent in the last window are
+  forgotten, so the bookkeeping stays bounded in a long-lived process
+
+Background threads only keep running in a long-lived process (tools/
+async_server.py, tools/poll_worker.py); on Vercel leave it disabled.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SpeculativeWarmup:
+    def __init__(self, enabled: bool = True, max_per_window: int = 6, window: float = 3600.0,
+                 delay: float = 2.0, workers: int = 2):
+        self.enabled = enabled
+        self.max_per_window = max_per_window
+        self.window = window
+        self.delay = delay
+        self.workers = workers
+
+        self._generations = {}  # user -> write counter
+        self._pending = set()   # users with a write that has not been warmed up yet
+        self._spent = {}        # user -> deque of job start times (monotonic)
+        self._running = {}      # user -> jobs scheduled and not finished yet
+        self._last_prune = time.monotonic()
+        self._executor = None
+        self._lock = threading.Lock()
+        self.stats = {'scheduled': 0, 'completed': 0, 'cancelled': 0, 'over_budget': 0, 'errors': 0}
+
+    def note_write(self, user_id: str) -> int:
+        """Record a ledger write; cancels warm-ups started for older writes"""
+        if not self.enabled:
+            return 0
+        with self._lock:
+            generation = self._generations.get(user_id, 0) + 1
+            self._generations[user_id] = generation
+            self._pending.add(user_id)
+            return generation
+
+    def is_current(self, user_id: str, generation: int) -> bool:
+        with self._lock:
+            return self._generations.get(user_id, 0) == generation
+
+    def schedule(self, user_id: str, job) -> bool:
+        """Run job(still_current) in the background if `user_id` wrote since
+        the last warm-up and has budget left.
+
+        still_current() turns False once a newer write arrives; the job
+        returns True if it did real (LLM) work, False if it stopped early.
+        """
+        if not self.enabled:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            self._prune_locked(now)
+            if user_id not in self._pending:
+                return False
+            self._pending.discard(user_id)
+            spent = self._spent.setdefault(user_id, deque())
+            while spent and now - spent[0] > self.window:
+                spent.popleft()
+            if len(spent) >= self.max_per_window:
+                self.stats['over_budget'] += 1
+                return False
+            spent.append(now)
+            generation = self._generations.get(user_id, 0)
+            self._running[user_id] = self._running.get(user_id, 0) + 1
+            self.stats['scheduled'] += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='catatuang-warmup')
+            executor = self._executor
+
+        executor.submit(self._run, user_id, generation, job, now)
+        return True
+
+    def _run(self, user_id, generation, job, started):
+        try:
+            self._run_job(user_id, generation, job, started)
+        finally:
+            with self._lock:
+                running = self._running.get(user_id, 0) - 1
+                if running > 0:
+                    self._running[user_id] = running
+                else:
+                    self._running.pop(user_id, None)
+
+    def _run_job(self, user_id, generation, job, started):
+        if self.delay > 0:
+            time.sleep(self.delay)
+
+        def still_current():
+            return self.is_current(user_id, generation)
+
+        did_work = False
+        try:
+            if still_current():
+                did_work = bool(job(still_current))
+        except Exception as e:
+            print(f"Speculative warm-up error: {e}")
+            with self._lock:
+                self.stats['errors'] += 1
+            return
+
+        with self._lock:
+            if did_work:
+                self.stats['completed'] += 1
+                return
+            self.stats['cancelled'] += 1
+            spent = self._spent.get(user_id)
+            if spent and started in spent:
+                spent.remove(started)  # nothing was spent, refund the budget
+
+    def _prune_locked(self, now: float):
+        """Forget expired budget and users with no pending or running warm-up
+        (at most once per window)"""
+        if now - self._last_prune < self.window:
+            return
+        self._last_prune = now
+        for user_id in list(self._spent):
+            spent = self._spent[user_id]
+            while spent and now - spent[0] > self.window:
+                spent.popleft()
+            if not spent:
+                del self._spent[user_id]
+        for user_id in list(self._generations):
+            if user_id not in self._pending and user_id not in self._running:
+                del self._generations[user_id]
+
+
+_warmup = None
+_warmup_lock = threading.Lock()
+
+
+def get_speculative_warmup() -> SpeculativeWarmup:
+    """Process-wide warm-up scheduler configured from the environment"""
+    global _warmup
+    with _warmup_lock:
+        if _warmup is None:
+            _warmup = SpeculativeWarmup(
+                enabled=os.getenv('SPECULATIVE_WARMUP', 'false').lower() in ('1', 'true', 'yes'),
+                max_per_window=int(os.getenv('SPECULATIVE_WARMUP_PER_HOUR', '6')),
+                delay=float(os.getenv('SPECULATIVE_WARMUP_DELAY', '2')),
+            )
+        return _warmup
@@ -0,0 +1,38 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Add the project directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api import financial_advisor
+from api.bot_runtime import load_webhook_module
+
+
+class TestAdvisorSingleton(unittest.TestCase):
+
+    def tearDown(self):
+        financial_advisor.reload_settings()
+
+    def test_handlers_share_one_advisor(self):
+        webhook = load_webhook_module()
+        advisor = webhook.get_financial_advisor()
+        self.assertIs(advisor, financial_advisor.get_advisor())
+        self.assertIs(advisor, webhook.get_financial_advisor())
+
+    def test_set_advisor_injects_and_resets(self):
+        fake = object()
+        financial_advisor.set_advisor(fake)
+        self.assertIs(load_webhook_module().get_financial_advisor(), fake)
+
+        financial_advisor.set_advisor(None)
+        with patch.dict(os.environ, {'GROQ_MODEL': 'llama-3.3-70b-versatile'}):
+            financial_advisor.reload_settings()
+            advisor = financial_advisor.get_advisor()
+        self.assertIsNot(advisor, fake)
+        self.assertEqual(advisor.routing_profiles['default']['model'], 'llama-3.3-70b-versatile')
+
+
+if __name__ == '__main__':
+    unittest.main()
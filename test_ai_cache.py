@@ -0,0 +1,160 @@
+import unittest
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+# Add the project directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api import financial_advisor
+from api.ai_cache import SingleFlight, TwoTierCache
+from api.resilience import Deadline
+
+
+class TestTwoTierCache(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_file_written_by_another_process_is_found(self):
+        cache = TwoTierCache(self.dir)
+        self.assertIsNone(cache.get('k', ttl=60))
+        TwoTierCache(self.dir).set('k', 'dari proses lain')
+        self.assertEqual(cache.get('k', ttl=60), 'dari proses lain')
+        self.assertEqual(cache.stats['disk_hits'], 1)
+
+    def test_memory_hit_skips_disk(self):
+        cache = TwoTierCache(self.dir)
+        cache.set('k', 'jawaban')
+        os.remove(os.path.join(self.dir, 'k.json'))
+        self.assertEqual(cache.get('k', ttl=60), 'jawaban')
+        self.assertEqual(cache.stats['memory_hits'], 1)
+
+    def test_disk_hit_in_new_process(self):
+        TwoTierCache(self.dir).set('k', {'a': 1})
+        cache = TwoTierCache(self.dir)
+        self.assertEqual(cache.get('k', ttl=60), {'a': 1})
+        self.assertEqual(cache.get('k', ttl=60), {'a': 1})
+        self.assertEqual(cache.stats['disk_hits'], 1)
+        self.assertEqual(cache.stats['memory_hits'], 1)
+
+    def test_ttl_is_respected(self):
+        with open(os.path.join(self.dir, 'old.json'), 'w') as f:
+            json.dump({'ts': time.time() - 120, 'response': 'basi'}, f)
+        cache = TwoTierCache(self.dir)
+        self.assertIsNone(cache.get('old', ttl=60))
+        self.assertEqual(cache.get('old', ttl=300), 'basi')
+
+    def test_memory_tier_is_lru(self):
+        cache = TwoTierCache(self.dir, memory_entries=2)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+        self.assertEqual(list(cache._memory), ['b', 'c'])
+
+    def test_disk_size_cap_evicts_oldest(self):
+        cache = TwoTierCache(self.dir, max_disk_bytes=300)
+        for i in range(10):
+            cache.set(f'k{i}', 'x' * 50)
+        self.assertLessEqual(cache._disk_bytes, 300)
+        self.assertGreater(cache.stats['evicted'], 0)
+        self.assertTrue(os.path.exists(os.path.join(self.dir, 'k9.json')))
+        self.assertFalse(os.path.exists(os.path.join(self.dir, 'k0.json')))
+
+    def test_sweep_removes_expired_files(self):
+        with open(os.path.join(self.dir, 'old.json'), 'w') as f:
+            json.dump({'ts': 0, 'response': 'basi'}, f)
+        os.utime(os.path.join(self.dir, 'old.json'), (0, 0))
+        cache = TwoTierCache(self.dir, max_age=3600)
+        cache.sweep()
+        self.assertFalse(os.path.exists(os.path.join(self.dir, 'old.json')))
+        self.assertEqual(cache.stats['expired'], 1)
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def generate():
+            calls.append(1)
+            release.wait(2)
+            return 'saran'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do('k', generate))) for _ in range(5)]
+        for t in threads:
+            t.start()
+        while flight.stats['followers'] < 4:
+            time.sleep(0.005)
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['saran'] * 5)
+        # the key is released once the leader finishes
+        self.assertEqual(flight.do('k', lambda: 'baru'), 'baru')
+
+    def test_follower_gives_up_after_timeout(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        leader = threading.Thread(target=lambda: flight.do('k', lambda: release.wait(2)))
+        leader.start()
+        while 'k' not in flight._calls:
+            time.sleep(0.005)
+        with self.assertRaises(TimeoutError):
+            flight.do('k', lambda: 'tidak dipanggil', timeout=0.01)
+        release.set()
+        leader.join()
+
+    def test_leader_error_releases_key(self):
+        flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            flight.do('k', lambda: (_ for _ in ()).throw(ValueError('gagal')))
+        self.assertEqual(flight._calls, {})
+
+
+class TestSharedCallDeadline(unittest.TestCase):
+
+    def tearDown(self):
+        financial_advisor.reload_settings()
+
+    def test_follower_past_deadline_gets_rule_based_advice(self):
+        with patch.dict(os.environ, {'GROQ_API_KEY': 'x'}):
+            financial_advisor.reload_settings()
+            advisor = financial_advisor.FinancialAdvisor()
+        release = threading.Event()
+
+        def slow_completion(*args, **kwargs):
+            release.wait(2)
+            financial_advisor._completion_outcome.ok = True
+            return 'jawaban model'
+
+        prompt = 'Analisis keuangan bulan ini'
+        with patch.object(financial_advisor, 'requests', object()), \
+                patch.object(advisor, '_request_groq_completion', slow_completion):
+            answers = []
+            leader = threading.Thread(target=lambda: answers.append(advisor._get_ai_response(prompt)))
+            leader.start()
+            while not financial_advisor.AI_SINGLE_FLIGHT._calls:
+                time.sleep(0.005)
+            answer = advisor._get_ai_response(prompt, deadline=Deadline(0.05))
+            release.set()
+            leader.join()
+
+        self.assertEqual(answer, advisor._get_rule_based_advice(prompt))
+        self.assertEqual(answers, ['jawaban model'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Add the project directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api.bot_runtime import load_webhook_module
+
+HEADER = ['Tanggal', 'Kategori', 'Deskripsi', 'Jumlah', 'Sumber']
+
+
+class FakeSheet:
+    def __init__(self, month):
+        self.rows = [[f'{month}-01 08:00:00', 'gaji', 'gaji', 5000000, 'telegram_u_1'],
+                     [f'{month}-02 12:00:00', 'makanan', 'nasi padang', -25000, 'telegram_u_1']]
+        self.reads = 0
+
+    def get_all_records(self):
+        self.reads += 1
+        return [dict(zip(HEADER, r)) for r in self.rows]
+
+
+class FakeAdvisor:
+    def __init__(self):
+        self.cache = {}
+        self.analyses = 0
+
+    def _get_cached_response(self, key, ttl):
+        return self.cache.get(key)
+
+    def get_monthly_analysis(self, user_data, on_update=None, deadline=None, cache_key=None):
+        self.analyses += 1
+        self.cache[cache_key] = f"analisis #{self.analyses}"
+        return self.cache[cache_key]
+
+
+class TestAnalysisCache(unittest.TestCase):
+
+    def setUp(self):
+        webhook = load_webhook_module()
+        self.sheet = FakeSheet(webhook.get_jakarta_time().strftime('%Y-%m'))
+        self.advisor = FakeAdvisor()
+        for patcher in (patch.object(webhook.handler, '_open_sheet', lambda _self: self.sheet),
+                        patch.object(webhook, 'get_financial_advisor', lambda: self.advisor)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.bot = webhook.handler.__new__(webhook.handler)
+
+    def test_repeat_reads_the_sheet_once_and_reuses_the_answer(self):
+        first = self.bot._get_ai_advice('u_1')
+        self.assertEqual(self.bot._get_ai_advice('u_1'), first)
+        self.assertEqual((self.advisor.analyses, self.sheet.reads), (1, 2))
+
+    def test_edit_of_older_row_is_recomputed(self):
+        self.bot._get_ai_advice('u_1')
+        self.sheet.rows[0][3] = 4500000
+        self.assertEqual(self.bot._get_ai_advice('u_1'), 'analisis #2')
+
+    def test_description_edit_keeps_the_answer(self):
+        first = self.bot._get_ai_advice('u_1')
+        self.sheet.rows[1][2] = 'nasi padang + es teh'
+        self.assertEqual(self.bot._get_ai_advice('u_1'), first)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+import sys
+import os
+
+# Add the project directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api import financial_advisor
+from api.async_advisor import AsyncFinancialAdvisor
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class FakeAsyncGroq:
+    """Stands in for groq.AsyncGroq; records concurrency and calls"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise RateLimitError()
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        prompt = kwargs['messages'][-1]['content']
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f" answer {len(prompt)} "))])
+
+
+class TestAsyncFinancialAdvisor(unittest.TestCase):
+
+    def tearDown(self):
+        financial_advisor.reload_settings()
+
+    def advisor(self, env):
+        with patch.dict(os.environ, env):
+            financial_advisor.reload_settings()
+            return financial_advisor.FinancialAdvisor()
+
+    def test_concurrency_is_capped(self):
+        client = FakeAsyncGroq()
+        advisor = AsyncFinancialAdvisor(self.advisor({'GROQ_API_KEY': 'x'}), max_concurrency=3, client=client)
+
+        async def run():
+            return await asyncio.gather(*[
+                advisor.check_budget_feasibility(100000 * (i + 1), 7) for i in range(10)])
+
+        answers = asyncio.run(run())
+        self.assertEqual(client.calls, 10)
+        self.assertEqual(client.max_active, 3)
+        self.assertTrue(all(a.startswith('answer ') for a in answers))
+
+    def test_identical_prompts_share_one_call(self):
+        client = FakeAsyncGroq()
+        advisor = AsyncFinancialAdvisor(self.advisor({'GROQ_API_KEY': 'x'}), client=client)
+        user_data = {'total_income': 5000000, 'total_expense': 3000000}
+
+        async def run():
+            return await asyncio.gather(*[advisor.get_monthly_analysis(user_data) for _ in range(5)])
+
+        answers = asyncio.run(run())
+        self.assertEqual(client.calls, 1)
+        self.assertEqual(len(set(answers)), 1)
+
+    def test_rate_limit_is_retried(self):
+        client = FakeAsyncGroq(failures=1)
+        advisor = AsyncFinancialAdvisor(self.advisor({'GROQ_API_KEY': 'x'}), client=client)
+        with patch.object(financial_advisor.GROQ_RETRY, 'base_delay', 0.001):
+            answer = asyncio.run(advisor.check_budget_feasibility(700000, 7))
+        self.assertEqual(client.calls, 2)
+        self.assertTrue(answer.startswith('answer '))
+
+    def test_without_groq_uses_local_plan(self):
+        sync_advisor = self.advisor({'GROQ_API_KEY': ''})
+        advisor = AsyncFinancialAdvisor(sync_advisor, client=FakeAsyncGroq())
+        plan = asyncio.run(advisor.advanced_budget_plan(10000000, {}, savings_goal=6000000))
+        self.assertEqual(plan, sync_advisor._local_budget_plan(10000000, {}, 6000000))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import io
+import json
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Add the project directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api import report
+
+HEADER = ['Tanggal', 'Kategori', 'Deskripsi', 'Jumlah', 'Sumber']
+
+
+class FakeSheet:
+    def __init__(self):
+        self.rows = [['2024-05-01 08:00:00', 'gaji', 'gaji', 5000000, 'bot'],
+                     ['2024-05-02 12:00:00', 'makanan', 'nasi padang', -25000, 'bot']]
+        self.reads = 0
+
+    def get_all_values(self):
+        self.reads += 1
+        return [HEADER] + [[str(v) for v in r] for r in self.rows]
+
+
+class TestReportCaching(unittest.TestCase):
+
+    def setUp(self):
+        report._last_report.clear()
+        self.sheet = FakeSheet()
+        patcher = patch.object(report.handler, '_open_sheet', lambda _self: self.sheet)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, if_none_match=None):
+        """Run do_GET; returns (status, headers, body)"""
+        h = report.handler.__new__(report.handler)
+        h.headers = {'If-None-Match': if_none_match} if if_none_match else {}
+        h.request_version = 'HTTP/1.1'
+        h.requestline = 'GET /api/report HTTP/1.1'
+        h.command = 'GET'
+        h.client_address = ('127.0.0.1', 0)
+        h.wfile = io.BytesIO()
+        with patch.object(report.handler, 'log_message'):
+            h.do_GET()
+        head, _, body = h.wfile.getvalue().decode('utf-8').partition('\r\n\r\n')
+        lines = head.split('\r\n')
+        headers = dict(line.split(': ', 1) for line in lines[1:])
+        return int(lines[0].split()[1]), headers, body
+
+    def test_etag_and_not_modified(self):
+        status, headers, body = self.get()
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)['summary']['balance'], 4975000)
+        self.assertIn('s-maxage=', headers['Cache-Control'])
+        etag = headers['ETag']
+
+        status, headers, body = self.get(if_none_match=f'"other", {etag}')
+        self.assertEqual((status, body), (304, ''))
+        self.assertEqual(headers['ETag'], etag)
+        self.assertEqual(self.sheet.reads, 2)  # one read per request, 304 or not
+
+    def test_new_row_changes_etag(self):
+        etag = self.get()[1]['ETag']
+        self.sheet.rows.append(['2024-05-03 09:00:00', 'transport', 'ojek', -15000, 'bot'])
+        status, headers, body = self.get(if_none_match=etag)
+        self.assertEqual(status, 200)
+        self.assertNotEqual(headers['ETag'], etag)
+        self.assertEqual(json.loads(body)['summary']['total_transactions'], 3)
+
+    def test_edit_of_older_row_changes_etag(self):
+        etag = self.get()[1]['ETag']
+        self.sheet.rows[0][3] = 4500000
+        status, headers, body = self.get(if_none_match=etag)
+        self.assertEqual(status, 200)
+        self.assertNotEqual(headers['ETag'], etag)
+        self.assertEqual(json.loads(body)['summary']['balance'], 4475000)
+
+    def test_new_day_changes_etag(self):
+        etag = self.get()[1]['ETag']
+        tomorrow = report.get_jakarta_time() + report.timedelta(days=1)
+        with patch.object(report, 'get_jakarta_time', lambda: tomorrow):
+            self.assertEqual(self.get(if_none_match=etag)[0], 200)
+
+    def test_report_reused_for_unchanged_ledger(self):
+        self.get()
+        with patch('api.report.records_from_values') as build:
+            self.assertEqual(self.get()[0], 200)
+        build.assert_not_called()
+        self.assertEqual(self.sheet.reads, 2)
+
+    def test_records_keep_numbers(self):
+        body = json.loads(self.get()[2])
+        self.assertEqual(body['recent_transactions'][0]['Jumlah'], -25000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import os
+import sys
+import time
+
+# Add the project directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api.resilience import CircuitBreaker, Deadline, RetryPolicy, deadline_timeout
+
+
+class TestDeadline(unittest.TestCase):
+
+    def test_timeout_is_capped_by_remaining_time(self):
+        deadline = Deadline(0.5)
+        self.assertLessEqual(deadline.timeout(10), 0.5)
+        self.assertEqual(deadline_timeout(None, 10), 10)
+
+    def test_expired(self):
+        deadline = Deadline(0)
+        self.assertTrue(deadline.expired())
+        self.assertEqual(deadline.remaining(), 0)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_after_failure_rate_is_reached(self):
+        breaker = CircuitBreaker('test', window=10, failure_rate=0.5, min_calls=4, cooldown=60)
+        for _ in range(2):
+            breaker.record_success()
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_half_open_probe_closes_or_reopens(self):
+        breaker = CircuitBreaker('test', window=4, failure_rate=0.5, min_calls=2, cooldown=0.05)
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())   # the single probe
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow())
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def test_retries_transient_errors_only(self):
+        policy = RetryPolicy(attempts=3, base_delay=0.001)
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise RateLimitError()
+            return 'ok'
+
+        self.assertEqual(policy.call(flaky), 'ok')
+        self.assertEqual(len(calls), 3)
+
+        calls.clear()
+        with self.assertRaises(ValueError):
+            policy.call(lambda: calls.append(1) or int('x'))
+        self.assertEqual(len(calls), 1)
+
+    def test_no_retry_without_time_left(self):
+        policy = RetryPolicy(attempts=3, base_delay=0.001)
+        calls = []
+
+        def failing():
+            calls.append(1)
+            raise RateLimitError()
+
+        with self.assertRaises(RateLimitError):
+            policy.call(failing, deadline=Deadline(0.1))
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Add the project directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api import financial_advisor
+
+
+class TestModelRouting(unittest.TestCase):
+
+    def tearDown(self):
+        financial_advisor.reload_settings()
+
+    def advisor(self, env):
+        with patch.dict(os.environ, env):
+            financial_advisor.reload_settings()
+            return financial_advisor.FinancialAdvisor()
+
+    def test_default_routes(self):
+        advisor = self.advisor({})
+        self.assertEqual(advisor._routing_profile('transaction_advice')['reasoning_effort'], 'low')
+        self.assertEqual(advisor._routing_profile('monthly_analysis'), advisor.routing_profiles['deep'])
+        self.assertEqual(advisor._routing_profile('chat'), advisor.routing_profiles['default'])
+
+    def test_routes_and_profiles_from_env(self):
+        advisor = self.advisor({'GROQ_ROUTES': 'chat=fast, tips_pool = deep,broken',
+                                'GROQ_PROFILE_FAST_MODEL': 'llama-3.1-8b-instant',
+                                'GROQ_PROFILE_FAST_TIMEOUT_SECONDS': '3'})
+        self.assertEqual(advisor._routing_profile('chat')['model'], 'llama-3.1-8b-instant')
+        self.assertEqual(advisor._routing_profile('chat')['timeout'], 3.0)
+        self.assertEqual(advisor._routing_profile('tips_pool'), advisor.routing_profiles['deep'])
+
+    def test_unknown_profile_falls_back_to_default(self):
+        advisor = self.advisor({'GROQ_ROUTES': 'chat=turbo'})
+        self.assertEqual(advisor._routing_profile('chat'), advisor.routing_profiles['default'])
+
+
+if __name__ == '__main__':
+    unittest.main()
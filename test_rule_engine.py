@@ -0,0 +1,35 @@
+import unittest
+import sys
+import os
+
+# Add the project directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api import rule_engine
+
+
+class TestRuleEngine(unittest.TestCase):
+
+    def test_category_priority_follows_keyword_order(self):
+        self.assertEqual(rule_engine.detect_category('transport lalu MAKANAN'), 'makanan')
+        self.assertEqual(rule_engine.detect_category('Entertainment dan transport'), 'transport')
+        self.assertEqual(rule_engine.detect_category('nonton, entertainment'), 'hiburan')
+        self.assertIsNone(rule_engine.detect_category('belanja bulanan'))
+
+    def test_short_answer_unless_verbose_or_reasoning(self):
+        prompt = 'budget hiburan bulan ini'
+        self.assertEqual(rule_engine.advice_for_prompt(prompt), rule_engine.SHORT_TIPS['hiburan'])
+        detailed = rule_engine.advice_for_prompt(prompt, with_reasoning=True)
+        self.assertTrue(detailed.startswith(rule_engine.SHORT_TIPS['hiburan']))
+        self.assertIn('Rencana Eksperimen 4 Minggu', detailed)
+        self.assertEqual(detailed, rule_engine.advice_for_prompt(prompt, verbose=True))
+        self.assertEqual(rule_engine.advice_for_prompt('belanja bulanan'), rule_engine.SHORT_TIPS[None])
+
+    def test_food_answer_quotes_detected_amount(self):
+        text = rule_engine.advice_for_prompt('Pengeluaran makanan Rp 1.250.000', verbose=True)
+        self.assertIn('(Referensi transaksi yang terdeteksi: Rp 1,250,000)', text)
+        self.assertNotIn('Referensi', rule_engine.advice_for_prompt('transport Rp 50.000', verbose=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
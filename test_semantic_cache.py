@@ -0,0 +1,102 @@
+import unittest
+from unittest.mock import patch
+import os
+import shutil
+import sys
+import tempfile
+
+# Add the project directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api import financial_advisor
+from api.semantic_cache import SemanticCache, is_follow_up
+from api.session_store import SessionStore
+
+
+class TestSemanticCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = SemanticCache(threshold=0.75)
+        self.cache.add('u1', 'berapa saldo saya?', 'Saldo kamu Rp 1.000.000')
+        self.cache.add('u1', 'tips hemat transport', 'Naik KRL')
+
+    def test_rephrased_question_hits(self):
+        self.assertEqual(self.cache.lookup('u1', 'saldo saya berapa'), 'Saldo kamu Rp 1.000.000')
+        self.assertEqual(self.cache.lookup('u1', 'Tips hemat transportasi!'), 'Naik KRL')
+
+    def test_paraphrased_spending_question_hits(self):
+        self.cache.add('u1', 'kenapa makan saya boros', 'Kurangi makan di luar')
+        self.assertEqual(self.cache.lookup('u1', 'kenapa pengeluaran makanan tinggi?'), 'Kurangi makan di luar')
+        self.assertIsNone(self.cache.lookup('u1', 'kenapa transport saya boros'))
+
+    def test_income_and_spending_totals_do_not_match(self):
+        self.cache.add('u1', 'total pemasukan bulan ini', 'Rp 5.000.000')
+        self.assertIsNone(self.cache.lookup('u1', 'total pengeluaran bulan ini'))
+
+    def test_unrelated_question_misses(self):
+        self.assertIsNone(self.cache.lookup('u1', 'gimana cara investasi reksadana'))
+
+    def test_scopes_are_isolated(self):
+        self.assertIsNone(self.cache.lookup('u2', 'berapa saldo saya?'))
+
+    def test_follow_ups_are_detected(self):
+        self.assertTrue(is_follow_up('jelaskan lebih detail dong'))
+        self.assertTrue(is_follow_up('kalau yang itu?'))
+        self.assertTrue(is_follow_up('kenapa?'))
+        self.assertFalse(is_follow_up('berapa saldo saya?'))
+        self.assertFalse(is_follow_up('pengeluaran bulan ini'))
+
+    def test_different_numbers_never_match(self):
+        self.cache.add('u1', 'cara nabung 1 juta', 'Sisihkan 100rb per minggu')
+        self.assertIsNone(self.cache.lookup('u1', 'cara nabung 5 juta'))
+        self.assertEqual(self.cache.lookup('u1', 'cara nabung 1 juta?'), 'Sisihkan 100rb per minggu')
+
+
+
+class TestChatSemanticScope(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.store = SessionStore(os.path.join(self.dir, 'sessions.db'), legacy_dir=None)
+        self.cache = SemanticCache(threshold=0.75, store=self.store)
+        self.advisor = financial_advisor.FinancialAdvisor()
+        self.calls = []
+        for target, kwargs in [(financial_advisor, {'get_semantic_cache': lambda: self.cache,
+                                                    'get_session_store': lambda: self.store}),
+                               (self.advisor, {'_get_cached_response': lambda key, ttl: None,
+                                               '_set_cached_response': lambda key, response: None,
+                                               '_get_ai_response': self.fake_ai})]:
+            patcher = patch.multiple(target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def fake_ai(self, prompt, **kwargs):
+        self.calls.append(prompt)
+        return f"jawaban #{len(self.calls)}"
+
+    def test_repeated_question_hits_across_turns(self):
+        first = self.advisor.chat_with_user('u1', 'kenapa makan saya boros')
+        self.advisor.chat_with_user('u1', 'tips hemat transport dong')
+        self.assertEqual(self.advisor.chat_with_user('u1', 'kenapa makan saya boros'), first)
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(self.cache.stats['hits'], 1)
+
+    def test_follow_up_is_always_answered_fresh(self):
+        self.advisor.chat_with_user('u1', 'tips hemat makan')
+        self.advisor.chat_with_user('u1', 'jelaskan lebih detail')
+        self.advisor.chat_with_user('u1', 'cara mulai investasi')
+        self.advisor.chat_with_user('u1', 'jelaskan lebih detail')
+        self.assertEqual(len(self.calls), 4)
+        self.assertIn('investasi', self.calls[-1])
+
+    def test_stored_answers_are_capped(self):
+        for i in range(5):
+            self.store.add_cached_answer(f'u{i}', 'berapa saldo saya', 'Rp 1', ts=1000 + i)
+        self.store.prune_cached_answers(before=1001, max_rows=2)
+        self.assertEqual([self.store.cached_answers(f'u{i}', 0, 10) != [] for i in range(5)],
+                         [False, False, False, True, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+# Add the project directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api.session_store import SessionStore
+
+
+class TestSessionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.legacy_dir = os.path.join(self.dir, 'chat_sessions')
+        self.store = SessionStore(os.path.join(self.dir, 'sessions.db'), max_messages=4,
+                                  legacy_dir=self.legacy_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_unknown_user_is_empty_and_not_written(self):
+        self.assertEqual(self.store.load('baru'), {'messages': [], 'message_ids': [], 'memory': '',
+                                                   'memory_version': '', 'summary': '',
+                                                   'summarized_through': 0})
+        conn = self.store._connect()
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM sessions').fetchone()[0], 0)
+
+    def test_append_and_trim(self):
+        for i in range(3):
+            self.store.append('u', [{'role': 'user', 'content': f'q{i}'},
+                                    {'role': 'assistant', 'content': f'a{i}'}])
+        session = self.store.load('u')
+        self.assertEqual([m['content'] for m in session['messages']], ['q1', 'a1', 'q2', 'a2'])
+        self.assertEqual([m['content'] for m in self.store.load('u', limit=2)['messages']], ['q2', 'a2'])
+
+    def test_memory_is_kept_until_replaced(self):
+        self.store.append('u', [{'role': 'user', 'content': 'hai'}], memory='gaji 5jt')
+        self.store.append('u', [{'role': 'assistant', 'content': 'halo'}])
+        self.assertEqual(self.store.load('u')['memory'], 'gaji 5jt')
+
+    def test_summarized_messages_are_not_reloaded(self):
+        self.store.append('u', [{'role': 'user', 'content': 'q0'}, {'role': 'assistant', 'content': 'a0'}])
+        first_ids = self.store.load('u')['message_ids']
+        self.store.append('u', [{'role': 'user', 'content': 'q1'}],
+                          summary='- q0 -> a0', summarized_through=first_ids[-1], memory_version='v1')
+        session = self.store.load('u')
+        self.assertEqual([m['content'] for m in session['messages']], ['q1'])
+        self.assertEqual((session['summary'], session['memory_version']), ('- q0 -> a0', 'v1'))
+        with self.assertRaises(ValueError):
+            self.store.append('u', [], updated=0)
+
+    def test_concurrent_turns_are_not_lost(self):
+        store = SessionStore(os.path.join(self.dir, 'sessions.db'), max_messages=100, legacy_dir=None)
+
+        def turn(i):
+            store.append('u', [{'role': 'user', 'content': f'q{i}'}, {'role': 'assistant', 'content': f'a{i}'}])
+
+        threads = [threading.Thread(target=turn, args=(i,)) for i in range(10)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(store.load('u')['messages']), 20)
+
+    def test_legacy_json_is_imported(self):
+        os.makedirs(self.legacy_dir)
+        with open(os.path.join(self.legacy_dir, 'lama.json'), 'w') as f:
+            json.dump({'memory': 'profil', 'messages': [{'role': 'user', 'content': 'halo'}]}, f)
+        session = self.store.load('lama')
+        self.assertEqual(session['memory'], 'profil')
+        self.assertEqual(session['messages'], [{'role': 'user', 'content': 'halo'}])
+        self.assertFalse(os.path.exists(os.path.join(self.legacy_dir, 'lama.json')))
+
+
+if __name__ == '__main__':
+    unittest.main()
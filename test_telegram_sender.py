@@ -0,0 +1,206 @@
+import unittest
+import threading
+import time
+import sys
+import os
+from concurrent.futures import Future
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add the project directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api.bot_runtime import load_webhook_module
+from api.resilience import Deadline
+from api.telegram_sender import OutboundScheduler, TokenBucket
+
+
+class FakeResponse:
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self._data = data
+        self.text = str(data)
+
+    def json(self):
+        return self._data
+
+
+class FakeHTTP:
+    """Records Bot API calls; optionally answers the first N with 429"""
+
+    def __init__(self, rate_limited=0, retry_after=0.05):
+        self.calls = []
+        self.rate_limited = rate_limited
+        self.retry_after = retry_after
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def post(self, url, json=None, timeout=None):
+        self.gate.wait()
+        self.calls.append((url.rsplit('/', 1)[1], dict(json)))
+        if self.rate_limited:
+            self.rate_limited -= 1
+            return FakeResponse(429, {'ok': False, 'parameters': {'retry_after': self.retry_after}})
+        return FakeResponse(200, {'ok': True, 'result': {'message_id': len(self.calls)}})
+
+
+class SlowChatHTTP(FakeHTTP):
+    """Holds calls for chat 1 until released; fails the first call once if asked"""
+
+    def __init__(self, fail_first=False):
+        super().__init__()
+        self.release = threading.Event()
+        self.fail_first = fail_first
+
+    def post(self, url, json=None, timeout=None):
+        if self.fail_first:
+            self.fail_first = False
+            raise ConnectionError('reset')
+        if json['chat_id'] == 1:
+            self.release.wait(2)
+        return super().post(url, json=json, timeout=timeout)
+
+
+def wait_in_flight(scheduler):
+    """Wait until the dispatcher has picked up a call"""
+    deadline = time.monotonic() + 2
+    while not scheduler._in_flight and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_bucket_refills_at_rate(self):
+        bucket = TokenBucket(rate=1, capacity=2, now=0.0)
+        self.assertEqual(bucket.wait_time(0.0), 0)
+        bucket.consume(0.0)
+        bucket.consume(0.0)
+        self.assertAlmostEqual(bucket.wait_time(0.0), 1.0)
+        self.assertEqual(bucket.wait_time(1.0), 0)
+
+    def test_pause_blocks_until_retry_after(self):
+        bucket = TokenBucket(rate=10, capacity=10, now=0.0)
+        bucket.pause(3, now=0.0)
+        self.assertAlmostEqual(bucket.wait_time(1.0), 2.0)
+        self.assertEqual(bucket.wait_time(3.0), 0)
+        bucket.consume(3.0)
+        self.assertGreater(bucket.wait_time(3.0), 0)  # no burst right after a 429
+
+
+class TestOutboundScheduler(unittest.TestCase):
+
+    def test_send_returns_message_id(self):
+        http = FakeHTTP()
+        scheduler = OutboundScheduler('token', http=http)
+        response = scheduler.send_message(1, 'halo').result(timeout=2)
+        self.assertEqual(response['result']['message_id'], 1)
+        self.assertEqual(http.calls[0][0], 'sendMessage')
+
+    def test_consecutive_messages_to_same_chat_are_coalesced(self):
+        http = FakeHTTP()
+        http.gate.clear()  # hold the first call so the rest pile up
+        scheduler = OutboundScheduler('token', http=http)
+        first = scheduler.send_message(1, 'satu')
+        wait_in_flight(scheduler)
+        futures = [scheduler.send_message(1, text) for text in ('dua', 'tiga')]
+        http.gate.set()
+        first.result(timeout=2)
+        results = [f.result(timeout=2) for f in futures]
+
+        self.assertEqual(len(http.calls), 2)
+        self.assertEqual(http.calls[1][1]['text'], 'dua\n\ntiga')
+        self.assertIs(results[0], results[1])
+        self.assertEqual(scheduler.stats['coalesced'], 1)
+
+    def test_placeholders_keep_their_own_message_id(self):
+        http = FakeHTTP()
+        http.gate.clear()
+        scheduler = OutboundScheduler('token', http=http)
+        scheduler.send_message(1, 'satu')
+        wait_in_flight(scheduler)
+        placeholders = [scheduler.send_message(1, text, coalesce=False) for text in ('⏳ a', '⏳ b')]
+        plain = scheduler.send_message(1, 'dua')
+        http.gate.set()
+        ids = [f.result(timeout=2)['result']['message_id'] for f in placeholders]
+        plain.result(timeout=2)
+
+        self.assertEqual(len(set(ids)), 2)
+        self.assertEqual([payload['text'] for _, payload in http.calls], ['satu', '⏳ a', '⏳ b', 'dua'])
+        self.assertEqual(scheduler.stats['coalesced'], 0)
+
+    def test_pending_edit_is_superseded(self):
+        http = FakeHTTP()
+        http.gate.clear()
+        scheduler = OutboundScheduler('token', http=http)
+        scheduler.send_message(1, 'placeholder')
+        wait_in_flight(scheduler)
+        old = scheduler.edit_message(1, 7, 'draft')
+        new = scheduler.edit_message(1, 7, 'final')
+        http.gate.set()
+        self.assertTrue(new.result(timeout=2))
+        self.assertTrue(old.result(timeout=2))
+
+        edits = [payload['text'] for method, payload in http.calls if method == 'editMessageText']
+        self.assertEqual(edits, ['final'])
+
+    def test_retry_after_is_honoured(self):
+        http = FakeHTTP(rate_limited=1, retry_after=0.05)
+        scheduler = OutboundScheduler('token', http=http)
+        response = scheduler.send_message(1, 'halo').result(timeout=2)
+        self.assertTrue(response['ok'])
+        self.assertEqual(len(http.calls), 2)
+        self.assertEqual(scheduler.stats['rate_limited'], 1)
+
+    def test_per_chat_rate_limit(self):
+        http = FakeHTTP()
+        scheduler = OutboundScheduler('token', http=http, chat_rate=20, chat_burst=1)
+        # different parse modes are never coalesced, so each is its own call
+        futures = [scheduler.send_message(1, str(i), parse_mode=None if i % 2 else 'Markdown') for i in range(3)]
+        for future in futures:
+            future.result(timeout=2)
+        self.assertTrue(scheduler.flush(timeout=2))
+        self.assertEqual(len(http.calls), 3)
+
+    def test_slow_chat_does_not_block_others(self):
+        http = SlowChatHTTP()
+        scheduler = OutboundScheduler('token', http=http)
+        slow = scheduler.send_message(1, 'lambat')
+        wait_in_flight(scheduler)
+        self.assertTrue(scheduler.send_message(2, 'cepat').result(timeout=1)['ok'])
+        self.assertFalse(slow.done())
+        http.release.set()
+        self.assertTrue(slow.result(timeout=2)['ok'])
+
+    def test_rate_limits_across_chats_pause_everyone(self):
+        http = FakeHTTP(rate_limited=2, retry_after=0.05)
+        scheduler = OutboundScheduler('token', http=http)
+        futures = [scheduler.send_message(chat_id, 'halo') for chat_id in (1, 2)]
+        self.assertTrue(all(f.result(timeout=2)['ok'] for f in futures))
+        self.assertEqual(scheduler.stats['rate_limited'], 2)
+        self.assertGreater(scheduler.global_bucket.paused_until, 0)
+
+    def test_network_errors_are_counted_separately(self):
+        http = SlowChatHTTP(fail_first=True)
+        http.release.set()
+        scheduler = OutboundScheduler('token', http=http)
+        scheduler.send_message(1, 'halo')
+        deadline = time.monotonic() + 2
+        while not scheduler.stats['network_errors'] and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.assertEqual((scheduler.stats['network_errors'], scheduler.stats['rate_limited']), (1, 0))
+
+
+class TestWebhookSendWait(unittest.TestCase):
+
+    def test_send_wait_is_bounded_by_the_deadline(self):
+        webhook = load_webhook_module()
+        stuck = SimpleNamespace(send_message=lambda *args, **kwargs: Future())
+        bot = webhook.handler.__new__(webhook.handler)
+        started = time.monotonic()
+        with patch.object(webhook, 'get_scheduler', lambda: stuck), patch('builtins.print'):
+            self.assertFalse(bot._send_telegram_message(1, 'halo', deadline=Deadline(0.05)))
+        self.assertLess(time.monotonic() - started, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+
+# Add the project directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api.ai_cache import TwoTierCache
+from api.tips_pool import DEFAULT_TIPS, TipsPool, format_tips, parse_tips
+
+
+class FakeAdvisor:
+    selected_provider = 'groq'
+
+    def __init__(self, count):
+        self.count = count
+        self.calls = 0
+
+    def _get_ai_response(self, prompt, deadline=None, route=None):
+        self.calls += 1
+        return '\n'.join(f"{i}. Tip nomor {i}" for i in range(1, self.count + 1))
+
+
+def numbers(message):
+    return [line.split('Tip nomor ')[1] for line in message.splitlines() if 'Tip nomor' in line]
+
+
+class TestTipsPool(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.pool = TipsPool(TwoTierCache(self.dir), ttl=3600, size=12)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_parse_tips_keeps_numbered_lines(self):
+        text = 'Berikut tipsnya:\n1. **Hemat** listrik\n2) Masak sendiri\n3. masak sendiri\n- bukan tip'
+        self.assertEqual(parse_tips(text), ['Hemat listrik', 'Masak sendiri'])
+
+    def test_pool_is_generated_once_and_rotated_without_repeats(self):
+        advisor = FakeAdvisor(12)
+        seen = []
+        for _ in range(3):
+            message = self.pool.tips_for('u1', advisor=advisor)
+            seen += numbers(message)
+        self.assertEqual(advisor.calls, 1)
+        self.assertEqual(len(set(seen[:12])), 12)  # whole pool before any repeat
+
+    def test_short_answer_keeps_default_tips(self):
+        message = self.pool.tips_for('u1', advisor=FakeAdvisor(3))
+        self.assertEqual(message, format_tips(DEFAULT_TIPS))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from unittest.mock import patch
+import json
+import sys
+import os
+
+# Add the project directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api import financial_advisor
+from api.financial_advisor import FinancialAdvisor
+
+USER_DATA = {'total_income': 5000000, 'total_expense': 2000000, 'carry_over_balance': 1000000}
+
+TRANSACTIONS = [
+    {'amount': 50000, 'category': 'makanan', 'description': 'nasi padang'},
+    {'amount': 60000, 'category': 'makanan', 'description': 'bakso'},
+    {'amount': 200000, 'category': 'transport', 'description': 'bensin'},
+]
+
+
+class TestTransactionAdviceBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.advisor = FinancialAdvisor()
+        self.advisor.selected_provider = 'groq'
+        self.cache = {}
+        patches = [
+            patch.object(financial_advisor, 'requests', object()),
+            patch.object(self.advisor, '_get_cached_response', side_effect=lambda key, ttl: self.cache.get(key)),
+            patch.object(self.advisor, '_set_cached_response', side_effect=self.cache.__setitem__),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_one_call_for_all_profiles(self):
+        answer = json.dumps([
+            {'id': 1, 'saran': 'Makan {deskripsi} seharga {jumlah}, sisa {sisa_bulan}.'},
+            {'id': 2, 'saran': 'Transport {jumlah}; bisa dipakai {bisa_dipakai}.'},
+        ])
+        with patch.object(self.advisor, '_get_ai_response', return_value=f"```json\n{answer}\n```") as ai:
+            results = self.advisor.get_transaction_advice_batch(TRANSACTIONS, USER_DATA)
+
+        self.assertEqual(ai.call_count, 1)  # both makanan rows share one profile
+        self.assertEqual(results[0], 'Makan nasi padang seharga Rp 50.000, sisa Rp 2.950.000.')
+        self.assertEqual(results[1], 'Makan bakso seharga Rp 60.000, sisa Rp 2.940.000.')
+        self.assertTrue(results[2].startswith('Transport Rp 200.000'))
+        self.assertEqual(len(self.cache), 2)
+
+    def test_invalid_items_fall_back_to_local_advice(self):
+        answer = json.dumps([{'id': 1, 'saran': 'tanpa placeholder'}, {'id': 9, 'saran': '{jumlah}'}])
+        with patch.object(self.advisor, '_get_ai_response', return_value=answer):
+            results = self.advisor.get_transaction_advice_batch(TRANSACTIONS, USER_DATA)
+
+        expected = self.advisor._local_transaction_advice(
+            200000, 'transport', self.advisor._transaction_figures(200000, USER_DATA))
+        self.assertEqual(results[2], expected)
+        self.assertTrue(all(r.startswith('💡 Tips:') for r in results))
+        self.assertEqual(self.cache, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
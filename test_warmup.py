@@ -0,0 +1,80 @@
+import unittest
+import sys
+import os
+import threading
+import time
+
+# Add the project directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api.warmup import SpeculativeWarmup
+
+
+class TestSpeculativeWarmup(unittest.TestCase):
+
+    def run_job(self, warmup, user_id, did_work=True):
+        """Schedule a job and wait until it ran; returns (scheduled, ran)"""
+        done = threading.Event()
+        ran = []
+
+        def job(still_current):
+            ran.append(still_current())
+            done.set()
+            return did_work
+
+        scheduled = warmup.schedule(user_id, job)
+        if scheduled:
+            done.wait(2)
+            warmup._executor.shutdown(wait=True)
+            warmup._executor = None
+        return scheduled, ran
+
+    def test_only_runs_after_a_write(self):
+        warmup = SpeculativeWarmup(delay=0)
+        self.assertEqual(self.run_job(warmup, 'u'), (False, []))
+        warmup.note_write('u')
+        self.assertEqual(self.run_job(warmup, 'u'), (True, [True]))
+        self.assertEqual(self.run_job(warmup, 'u'), (False, []))  # already warmed up
+
+    def test_newer_write_cancels_job(self):
+        warmup = SpeculativeWarmup(delay=0.1)
+        warmup.note_write('u')
+        ran = []
+        self.assertTrue(warmup.schedule('u', lambda still_current: ran.append(1) or True))
+        warmup.note_write('u')
+        warmup._executor.shutdown(wait=True)
+        self.assertEqual(ran, [])
+        self.assertEqual(warmup.stats['cancelled'], 1)
+
+    def test_budget_per_user_with_refund(self):
+        warmup = SpeculativeWarmup(delay=0, max_per_window=1)
+        warmup.note_write('u')
+        self.assertTrue(self.run_job(warmup, 'u', did_work=False)[0])  # refunded
+        warmup.note_write('u')
+        self.assertTrue(self.run_job(warmup, 'u')[0])
+        warmup.note_write('u')
+        self.assertFalse(self.run_job(warmup, 'u')[0])
+        self.assertEqual(warmup.stats['over_budget'], 1)
+        warmup.note_write('other')
+        self.assertTrue(self.run_job(warmup, 'other')[0])
+
+    def test_idle_users_are_forgotten(self):
+        warmup = SpeculativeWarmup(delay=0, window=0.05)
+        warmup.note_write('u')
+        self.assertTrue(self.run_job(warmup, 'u')[0])
+        time.sleep(0.1)
+        warmup.note_write('other')
+        self.assertTrue(self.run_job(warmup, 'other')[0])
+        self.assertNotIn('u', warmup._generations)
+        self.assertNotIn('u', warmup._spent)
+        self.assertEqual(warmup._running, {})
+
+    def test_disabled_keeps_no_state(self):
+        warmup = SpeculativeWarmup(enabled=False)
+        warmup.note_write('u')
+        self.assertEqual(warmup._generations, {})
+        self.assertEqual(warmup._pending, set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+"""Self-hosted asyncio server for the CatatUang Telegram webhook
+
+Runs the same command/expense logic as api/telegram-webhook.py, but inside one
+long-lived process: modules, the Google Sheets client and the AI caches stay
+warm, and many updates are processed concurrently. Blocking work (Sheets and
+LLM calls) runs on a bounded thread pool; an asyncio semaphore applies
+backpressure once that pool is saturated.
+
+Usage:
+  python tools/async_server.py --host 0.0.0.0 --port 8080
+
+Then point the bot at it:
+  https://api.telegram.org/bot<TOKEN>/setWebhook?url=https://your.host/api/telegram-webhook
+
+Environment variables:
+  SERVER_UPDATE_WORKERS   threads processing updates (default 16)
+  SERVER_MAX_PENDING      updates accepted at once before callers wait (default 64)
+  SHEETS_MAX_CONCURRENCY  concurrent Google Sheets calls (default 4)
+  AI_MAX_CONCURRENCY      concurrent LLM calls (default 8)
+  TELEGRAM_WEBHOOK_SECRET if set, required in X-Telegram-Bot-Api-Secret-Token
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+# Ensure project root is in path when running directly
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from api import bot_runtime
+
+MAX_BODY_BYTES = 1_000_000
+WEBHOOK_PATHS = ('/', '/api/telegram-webhook')
+
+REASONS = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found',
+           405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class WebhookServer:
+    def __init__(self, max_pending: int):
+        self.pending = asyncio.Semaphore(max_pending)
+        self.secret = os.getenv('TELEGRAM_WEBHOOK_SECRET')
+        self.processed = 0
+        self.in_flight = 0
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self._dispatch(method, path, headers, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await self._write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError as e:
+            await self._write_response(writer, 400, {"status": "error", "message": str(e)}, False)
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            raise ValueError('Malformed request line')
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length', '0') or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError('Request body too large')
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target.split('?', 1)[0], headers, body
+
+    async def _dispatch(self, method, path, headers, body):
+        if path not in WEBHOOK_PATHS:
+            return 404, {"status": "error", "message": "Not found"}
+
+        if method == 'GET':
+            return 200, {
+                "status": "success",
+                "message": "🤖 CatatUang Telegram Bot is running!",
+                "mode": "self-hosted",
+                "processed_updates": self.processed,
+                "in_flight": self.in_flight,
+            }
+
+        if method != 'POST':
+            return 405, {"status": "error", "message": "Method not allowed"}
+
+        if self.secret and headers.get('x-telegram-bot-api-secret-token') != self.secret:
+            return 403, {"status": "error", "message": "Invalid secret token"}
+
+        try:
+            update = json.loads(body.decode('utf-8'))
+        except Exception as e:
+            return 400, {"status": "error", "message": f"Webhook error: {e}"}
+
+        async with self.pending:
+            self.in_flight += 1
+            try:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(bot_runtime.get_update_executor(), bot_runtime.process_update, update)
+            except Exception as e:
+                return 500, {"status": "error", "message": f"Webhook error: {e}"}
+            finally:
+                self.in_flight -= 1
+                self.processed += 1
+        return 200, result
+
+    async def _write_response(self, writer: asyncio.StreamWriter, status, payload, keep_alive):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, 'OK')}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+async def serve(host: str, port: int):
+    # Import the webhook (and its dependencies) before accepting traffic
+    bot_runtime.load_webhook_module()
+    app = WebhookServer(int(os.getenv('SERVER_MAX_PENDING', '64')))
+    server = await asyncio.start_server(app.handle_connection, host, port)
+    print(f"CatatUang server listening on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the CatatUang webhook as a self-hosted asyncio server")
+    parser.add_argument("--host", default=os.getenv('SERVER_HOST', '0.0.0.0'))
+    parser.add_argument("--port", type=int, default=int(os.getenv('PORT', '8080')))
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""Cold-start benchmark for the Vercel entry points
+
+Every measurement runs in a fresh Python subprocess (and a fresh working
+directory, so the .cache AI/session stores start empty), like a cold
+function instance:
+
+- imports: time to import api/telegram-webhook.py, api/report.py and
+  api/financial_advisor.py, with the slowest modules from `-X importtime`
+- first response: time from the start of the process to the first reply
+  for representative updates (GET health check, /start, an expense, /advice).
+  Telegram and Google Sheets are replaced by in-process stubs and Groq is
+  disabled, so only local work is measured.
+
+Children run with VERCEL=1 (no .env lookup), like production.
+
+Usage:
+  python tools/bench_cold_start.py
+  python tools/bench_cold_start.py --repeat 7 --top 15 --json bench.json
+  python tools/bench_cold_start.py --baseline bench.json --tolerance 0.25
+
+With --baseline the script exits with status 1 when a median got slower than
+the baseline by more than the tolerance (and by at least --min-delta seconds).
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Entry points measured by the import benchmark: name -> (module name, file)
+IMPORT_TARGETS = {
+    'telegram-webhook': ('api.telegram_webhook', PROJECT_ROOT / 'api' / 'telegram-webhook.py'),
+    'report': ('api.report', PROJECT_ROOT / 'api' / 'report.py'),
+    'financial_advisor': ('api.financial_advisor', PROJECT_ROOT / 'api' / 'financial_advisor.py'),
+}
+
+
+def _message(text):
+    return {'update_id': 1, 'message': {'message_id': 1, 'chat': {'id': 1001},
+                                        'from': {'id': 1001, 'username': 'bench', 'first_name': 'Bench'},
+                                        'text': text}}
+
+
+# Updates replayed by the first-response benchmark (None = GET health check)
+SCENARIOS = {
+    'health': None,
+    'start': _message('/start'),
+    'expense': _message('25000 makanan nasi goreng'),
+    'advice': _message('/advice'),
+}
+
+IMPORT_CODE = r'''
+import importlib.util, json, sys, time
+t0 = time.perf_counter()
+root, name, path = sys.argv[1:4]
+sys.path.insert(0, root)
+spec = importlib.util.spec_from_file_location(name, path)
+module = importlib.util.module_from_spec(spec)
+sys.modules[name] = module
+spec.loader.exec_module(module)
+print('BENCH ' + json.dumps({'import': time.perf_counter() - t0, 'modules': len(sys.modules)}))
+'''
+
+FIRST_RESPONSE_CODE = r'''
+import json, sys, time
+t0 = time.perf_counter()
+root, update = sys.argv[1], json.loads(sys.argv[2])
+sys.path.insert(0, root)
+from api.bot_runtime import new_handler
+bot = new_handler()
+imported = time.perf_counter()
+
+from datetime import datetime, timedelta
+
+HEADER = ['Tanggal', 'Kategori', 'Deskripsi', 'Jumlah', 'Sumber']
+
+
+class StubSheet:
+    """In-memory stand-in for the gspread worksheet (60 days of ledger rows)"""
+
+    def __init__(self):
+        now = datetime.now()
+        categories = ['makanan', 'transport', 'hiburan', 'belanja', 'tagihan']
+        self.rows = []
+        for i in range(300, 0, -1):
+            when = (now - timedelta(hours=4 * i)).strftime('%Y-%m-%d %H:%M:%S')
+            amount = 5000000 if i % 180 == 0 else -(10000 + (i * 7919) % 90000)
+            self.rows.append([when, categories[i % 5], f'transaksi {i}', amount, 'bench'])
+
+    def get_all_values(self):
+        return [HEADER] + [list(r) for r in self.rows]
+
+    def get_all_records(self):
+        return [dict(zip(HEADER, r)) for r in self.rows]
+
+    def col_values(self, col):
+        return [HEADER[col - 1]] + [r[col - 1] for r in self.rows]
+
+    def row_values(self, row):
+        return self.get_all_values()[row - 1]
+
+    def append_row(self, row):
+        self.rows.append(list(row))
+
+    def append_rows(self, rows):
+        self.rows.extend(list(r) for r in rows)
+
+
+first_reply = []
+
+
+def reply(*args, **kwargs):
+    if not first_reply:
+        first_reply.append(time.perf_counter())
+    return 1 if kwargs.get('return_message_id') else True
+
+
+sheet = StubSheet()
+handler = type(bot)
+handler._send_telegram_message = reply
+handler._edit_telegram_message = reply
+handler._send_json_response = reply
+handler._open_sheet = lambda self: sheet
+
+if update is None:
+    bot.do_GET()
+else:
+    bot._process_telegram_webhook(update)
+done = time.perf_counter()
+print('BENCH ' + json.dumps({'import': imported - t0, 'first_reply': (first_reply[0] if first_reply else done) - t0,
+                             'total': done - t0, 'modules': len(sys.modules)}))
+'''
+
+
+def _child_env():
+    env = dict(os.environ)
+    env.update({'VERCEL': '1', 'GROQ_API_KEY': '', 'SPECULATIVE_WARMUP': 'false', 'PYTHONDONTWRITEBYTECODE': '1'})
+    env.pop('PYTHONPATH', None)
+    return env
+
+
+def run_child(code, args, importtime=False):
+    """Run `code` in a fresh interpreter and temp dir; returns (result, stderr, wall seconds)"""
+    cmd = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code] + [str(a) for a in args]
+    with tempfile.TemporaryDirectory(prefix='catatuang-bench-') as cwd:
+        started = time.perf_counter()
+        proc = subprocess.run(cmd, cwd=cwd, env=_child_env(), capture_output=True, text=True)
+        wall = time.perf_counter() - started
+    lines = [l for l in proc.stdout.splitlines() if l.startswith('BENCH ')]
+    if proc.returncode != 0 or not lines:
+        raise RuntimeError(f"benchmark child failed ({proc.returncode}):\n{proc.stderr[-2000:]}")
+    return json.loads(lines[-1][len('BENCH '):]), proc.stderr, wall
+
+
+def parse_importtime(stderr, top):
+    """Slowest modules (by cumulative time) from `-X importtime` output"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # header line
+        entries.append({'module': parts[2].strip(), 'self_us': int(parts[0]), 'cumulative_us': int(parts[1])})
+    entries.sort(key=lambda e: e['cumulative_us'], reverse=True)
+    return entries[:top]
+
+
+def _summary(samples, key):
+    values = [s[key] for s in samples]
+    return {'median_s': round(statistics.median(values), 4), 'min_s': round(min(values), 4)}
+
+
+def bench_imports(repeat, top):
+    results = {}
+    for name, (module, path) in IMPORT_TARGETS.items():
+        samples = []
+        for _ in range(repeat):
+            result, _, wall = run_child(IMPORT_CODE, [PROJECT_ROOT, module, path])
+            samples.append(dict(result, process=wall))
+        result, stderr, _ = run_child(IMPORT_CODE, [PROJECT_ROOT, module, path], importtime=True)
+        results[name] = {
+            'import': _summary(samples, 'import'),
+            'process': _summary(samples, 'process'),
+            'modules': result['modules'],
+            'importtime': parse_importtime(stderr, top),
+        }
+    return results
+
+
+def bench_first_response(repeat):
+    results = {}
+    for name, update in SCENARIOS.items():
+        samples = []
+        for _ in range(repeat):
+            result, _, wall = run_child(FIRST_RESPONSE_CODE, [PROJECT_ROOT, json.dumps(update)])
+            samples.append(dict(result, process=wall))
+        results[name] = {
+            'import': _summary(samples, 'import'),
+            'first_reply': _summary(samples, 'first_reply'),
+            'total': _summary(samples, 'total'),
+            'process': _summary(samples, 'process'),
+            'modules': samples[-1]['modules'],
+        }
+    return results
+
+
+def find_regressions(results, baseline, tolerance, min_delta):
+    """(label, baseline, current) for every median that got slower"""
+    checks = [('imports', name, 'import') for name in results['imports']]
+    checks += [('first_response', name, 'first_reply') for name in results['first_response']]
+    regressions = []
+    for section, name, metric in checks:
+        try:
+            before = baseline[section][name][metric]['median_s']
+        except (KeyError, TypeError):
+            continue
+        now = results[section][name][metric]['median_s']
+        if now - before >= min_delta and now > before * (1 + tolerance):
+            regressions.append((f"{section}.{name}.{metric}", before, now))
+    return regressions
+
+
+def print_report(results):
+    print(f"Python {results['python']}, {results['repeat']} runs per measurement (median / min, ms)\n")
+    print('Imports')
+    for name, r in results['imports'].items():
+        print(f"  {name:<18} import {r['import']['median_s'] * 1000:7.1f} / {r['import']['min_s'] * 1000:7.1f}"
+              f"   process {r['process']['median_s'] * 1000:7.1f}   {r['modules']} modules")
+        for entry in r['importtime']:
+            print(f"      {entry['cumulative_us'] / 1000:7.1f} cumulative {entry['self_us'] / 1000:7.1f} self  {entry['module']}")
+    print('\nFirst response')
+    for name, r in results['first_response'].items():
+        print(f"  {name:<18} first reply {r['first_reply']['median_s'] * 1000:7.1f} / {r['first_reply']['min_s'] * 1000:7.1f}"
+              f"   import {r['import']['median_s'] * 1000:7.1f}   process {r['process']['median_s'] * 1000:7.1f}"
+              f"   {r['modules']} modules")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import and first-response times")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh processes per measurement (default 5)")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports listed per entry point (default 10)")
+    parser.add_argument("--json", metavar="PATH", help="write the results as JSON ('-' for stdout)")
+    parser.add_argument("--baseline", metavar="PATH", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown against the baseline, as a fraction (default 0.25)")
+    parser.add_argument("--min-delta", type=float, default=0.005,
+                        help="ignore slowdowns smaller than this many seconds (default 0.005)")
+    args = parser.parse_args()
+
+    results = {
+        'python': sys.version.split()[0],
+        'repeat': args.repeat,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'imports': bench_imports(args.repeat, args.top),
+        'first_response': bench_first_response(args.repeat),
+    }
+
+    if args.json == '-':
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+        if args.json:
+            Path(args.json).write_text(json.dumps(results, indent=2))
+            print(f"\nResults written to {args.json}")
+
+    if args.baseline:
+        regressions = find_regressions(results, json.loads(Path(args.baseline).read_text()),
+                                       args.tolerance, args.min_delta)
+        for label, before, now in regressions:
+            print(f"REGRESSION {label}: {before * 1000:.1f} ms -> {now * 1000:.1f} ms", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""Long-polling worker for the CatatUang Telegram bot
+
+Pulls updates with getUpdates instead of receiving webhooks, so no public
+ingress is needed. Updates are processed in batches:
+
+- consecutive expense/income messages from the same user are grouped and
+  recorded with one Sheets append and one balance refresh
+  (handler._process_expense_batch), with a single combined reply
+- commands go through the regular webhook path (handler._process_command)
+- different chats are processed in parallel; order within a chat is kept
+
+Usage:
+  python tools/poll_worker.py
+  python tools/poll_worker.py --batch-window 2 --delete-webhook
+
+getUpdates does not work while a webhook is set; pass --delete-webhook once
+(or call deleteWebhook yourself) before starting the worker.
+
+Environment variables:
+  TELEGRAM_BOT_TOKEN     required
+  SERVER_UPDATE_WORKERS  threads processing chats in parallel (default 16)
+"""
+from __future__ import annotations
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is in path when running directly
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import requests
+
+from api import bot_runtime
+
+POLL_TIMEOUT_SECONDS = 30
+MAX_UPDATES_PER_CALL = 100
+
+
+def get_updates(session, api_url, offset, timeout):
+    """Call getUpdates; returns a list of updates (empty on error)"""
+    params = {'timeout': timeout, 'limit': MAX_UPDATES_PER_CALL, 'allowed_updates': '["message"]'}
+    if offset is not None:
+        params['offset'] = offset
+    try:
+        resp = session.get(f"{api_url}/getUpdates", params=params, timeout=timeout + 10)
+    except Exception as e:
+        print(f"getUpdates failed: {e}")
+        time.sleep(3)
+        return []
+
+    if resp.status_code == 409:
+        print("getUpdates conflict: a webhook is still set. Run with --delete-webhook.")
+        time.sleep(10)
+        return []
+    try:
+        data = resp.json()
+    except Exception:
+        data = {}
+    if not data.get('ok'):
+        retry_after = data.get('parameters', {}).get('retry_after', 3)
+        print(f"getUpdates error {resp.status_code}: {data.get('description', resp.text[:200])}")
+        time.sleep(retry_after)
+        return []
+    return data.get('result', [])
+
+
+def collect_batch(session, api_url, offset, window):
+    """Long-poll for updates, then keep collecting for `window` seconds so
+    bursts from the same user end up in one batch"""
+    updates = get_updates(session, api_url, offset, POLL_TIMEOUT_SECONDS)
+    if not updates or window <= 0:
+        return updates
+
+    deadline = time.monotonic() + window
+    while time.monotonic() < deadline:
+        next_offset = updates[-1]['update_id'] + 1
+        more = get_updates(session, api_url, next_offset, max(1, int(deadline - time.monotonic())))
+        if not more:
+            break
+        updates.extend(more)
+    return updates
+
+
+def plan_chat_jobs(updates):
+    """Group updates per chat into an ordered list of jobs.
+
+    A job is ('update', update) for commands/other updates, or
+    ('expenses', chat_id, user_key, [texts]) for a run of consecutive
+    expense messages from the same user.
+    """
+    jobs_by_chat = {}
+    for update in updates:
+        message = update.get('message') or {}
+        chat_id = message.get('chat', {}).get('id', '')
+        text = message.get('text', '')
+        jobs = jobs_by_chat.setdefault(chat_id, [])
+
+        if not text or text.startswith('/'):
+            jobs.append(('update', update))
+            continue
+
+        sender = message.get('from', {})
+        user_key = f"{sender.get('username', 'unknown')}_{sender.get('id', '')}"
+        if jobs and jobs[-1][0] == 'expenses' and jobs[-1][2] == user_key:
+            jobs[-1][3].append(text)
+        else:
+            jobs.append(('expenses', chat_id, user_key, [text]))
+    return jobs_by_chat
+
+
+def run_chat_jobs(jobs):
+    """Process one chat's jobs in order"""
+    for job in jobs:
+        try:
+            if job[0] == 'update':
+                bot_runtime.process_update(job[1])
+            else:
+                _, chat_id, user_key, texts = job
+                handler = bot_runtime.new_handler()
+                reply = handler._process_expense_batch(texts, user_key)
+                handler._send_telegram_message(chat_id, reply)
+                handler._warm_up_advice(user_key)
+        except Exception as e:
+            print(f"Error processing update batch: {e}")
+
+
+def process_batch(updates):
+    """Process a batch: chats in parallel, each chat sequentially"""
+    jobs_by_chat = plan_chat_jobs(updates)
+    executor = bot_runtime.get_update_executor()
+    futures = [executor.submit(run_chat_jobs, jobs) for jobs in jobs_by_chat.values()]
+    for future in futures:
+        future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the CatatUang bot with getUpdates long-polling")
+    parser.add_argument("--batch-window", type=float, default=1.0,
+                        help="seconds to keep collecting updates after the first one arrives")
+    parser.add_argument("--delete-webhook", action="store_true", default=False,
+                        help="call deleteWebhook before polling")
+    args = parser.parse_args()
+
+    bot_token = os.environ.get('TELEGRAM_BOT_TOKEN')
+    if not bot_token:
+        print('Missing TELEGRAM_BOT_TOKEN in environment.')
+        return
+
+    api_url = f"https://api.telegram.org/bot{bot_token}"
+    session = requests.Session()
+    bot_runtime.load_webhook_module()
+
+    if args.delete_webhook:
+        session.post(f"{api_url}/deleteWebhook", timeout=10)
+
+    print("CatatUang poll worker started")
+    offset = None
+    while True:
+        try:
+            updates = collect_batch(session, api_url, offset, args.batch_window)
+            if not updates:
+                continue
+            process_batch(updates)
+            offset = updates[-1]['update_id'] + 1
+        except KeyboardInterrupt:
+            break
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Regenerate the /tips pool ahead of time
+
+Asks the LLM for a fresh batch of tips and stores it in the AI cache
+(api/tips_pool.py), so /tips never waits for a generation. Run it on a
+schedule shorter than TIPS_POOL_TTL_SECONDS, e.g. from cron:
+
+  0 */6 * * *  cd /path/to/catatuang && python tools/refresh_tips.py
+
+Usage:
+  python tools/refresh_tips.py
+  python tools/refresh_tips.py --size 30 --if-older-than 3600
+
+Environment variables:
+  GROQ_API_KEY           required (without it the pool is left untouched)
+  TIPS_POOL_SIZE         tips per pool (default 20)
+  TIPS_POOL_TTL_SECONDS  how long /tips uses a pool before regenerating it
+"""
+from __future__ import annotations
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is in path when running directly
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from api.tips_pool import TipsPool
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate the pre-generated /tips pool")
+    parser.add_argument("--size", type=int, default=None,
+                        help="number of tips to generate (default TIPS_POOL_SIZE)")
+    parser.add_argument("--if-older-than", type=float, default=0,
+                        help="skip the refresh when the current pool is younger than this many seconds")
+    args = parser.parse_args()
+
+    pool = TipsPool(size=args.size)
+    current = pool.current()
+    if current and time.time() - current.get('generated', 0) < args.if_older_than:
+        print(f"Tips pool is fresh ({len(current['tips'])} tips), nothing to do")
+        return 0
+
+    refreshed = pool.refresh()
+    if refreshed is None:
+        print("Tips pool refresh failed; /tips keeps serving the previous pool")
+        return 1
+    print(f"Tips pool refreshed with {len(refreshed['tips'])} tips")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
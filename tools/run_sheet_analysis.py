@@ -1,4 +1,5 @@
 import os
+import asyncio
 import base64
 import json
 import sys
@@ -18,6 +19,7 @@ except Exception:
     GOOGLE_LIBS_AVAILABLE = False
 
 from api.financial_advisor import FinancialAdvisor
+from api.async_advisor import AsyncFinancialAdvisor
 
 
 def safe_int(v):
@@ -31,6 +33,16 @@ def safe_int(v):
             return 0
 
 
+async def run_analyses(advisor, user_data):
+    """Monthly analysis and budget recommendation, requested concurrently"""
+    async_advisor = AsyncFinancialAdvisor(advisor)
+    return await asyncio.gather(
+        async_advisor.get_monthly_analysis(user_data),
+        async_advisor.get_budget_recommendation(user_data['total_income'], user_data),
+        return_exceptions=True,
+    )
+
+
 def main():
     if not GOOGLE_LIBS_AVAILABLE:
         print('Missing Google API libraries (gspread/google-auth).')
@@ -100,21 +112,30 @@ def main():
 
     advisor = FinancialAdvisor()
 
-    print('\n=== MONTHLY ANALYSIS ===\n')
-    try:
-        print(advisor.get_monthly_analysis(user_data))
-    except Exception as e:
-        print('Error running monthly analysis:', e)
-
-    if transactions:
-        last = transactions[-1]
-        amt = abs(last['jumlah'])
-        cat = last['kategori'] or 'lainnya'
-        desc = last['des'] or last['tanggal'] or 'transaksi terbaru'
-
-        print('\n=== ADVICE FOR LAST TRANSACTION ===\n')
+    analysis, budget = asyncio.run(run_analyses(advisor, user_data))
+    for title, result in (('MONTHLY ANALYSIS', analysis), ('BUDGET RECOMMENDATION', budget)):
+        print(f'\n=== {title} ===\n')
+        if isinstance(result, Exception):
+            print(f'Error running {title.lower()}:', result)
+        else:
+            print(result)
+
+    # Advice for the most recent rows, generated in batched LLM calls
+    advice_rows = max(1, safe_int(os.environ.get('ADVICE_ROWS', 10)))
+    recent = transactions[-advice_rows:]
+    if recent:
+        batch = [{
+            'amount': abs(t['jumlah']),
+            'category': t['kategori'] or 'lainnya',
+            'description': t['des'] or t['tanggal'] or 'transaksi terbaru',
+        } for t in recent]
+
+        print(f'\n=== ADVICE FOR LAST {len(batch)} TRANSACTIONS ===\n')
         try:
-            print(advisor.get_transaction_advice(amt, cat, desc, user_data))
+            for tx, advice in zip(batch, advisor.get_transaction_advice_batch(batch, user_data)):
+                print(f"--- {tx['category']} • Rp {tx['amount']:,} • {tx['description']}".replace(',', '.'))
+                print(advice)
+                print()
         except Exception as e:
             print('Error running transaction advice:', e)
 